@@ -1,228 +1,134 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import os
 import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import random
-import re
+from streaming_batch import OUTPUT_FORMATS
+from batch_jobs import UNFINISHED, JobScheduler, JobStore, QueueFull, load_result, valid_job_id
+from sentiment_backends import CASCADE_STAGES, cascade_router, make_backend
+from sentiment_cache import get_cache
+from chat_history import CHAT_CSS, HistoryBuffer, chat_html
+import instrumentation
+from instrumentation import REGISTRY, SessionLog, stage, use_session_log
+from movie_catalog import load_catalog
+from movie_chatbot import MovieChatbot
 
 # Set page title and configuration
 st.set_page_config(page_title="Movie Chat & Sentiment App", layout="wide")
 
-# Download NLTK data if not already available
-try:
-    nltk.data.find('sentiment/vader_lexicon')
-    st.success("✅ NLTK vader_lexicon found!")
-except LookupError:
-    st.info("Downloading NLTK vader_lexicon...")
-    nltk.download('vader_lexicon')
-    st.success("✅ NLTK vader_lexicon downloaded successfully!")
+# Stage timings of this session feed the debug panel at the bottom of the page
+if "stage_log" not in st.session_state:
+    st.session_state.stage_log = SessionLog()
+use_session_log(st.session_state.stage_log)
+
+# Sentiment backend: vader, transformer, transformer-int8, transformer-torchscript
+# or cascade (VADER, escalating ambiguous texts to the transformer; see SENTIMENT_CASCADE_*)
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "vader")
+
+# Optional movie catalog (CSV, Parquet or prebuilt .catalog index) for the chatbot
+MOVIE_CATALOG = os.environ.get("MOVIE_CATALOG")
+
+# Movie Chat backend: rules (MovieChatbot) or generative (DialoGPT-style model, see CHAT_MODEL)
+CHAT_BACKEND = os.environ.get("CHAT_BACKEND", "rules")
+
+# Chat turns kept in memory per session (older ones spill to a temp file) and shown per page
+CHAT_HISTORY_MAXLEN = 200
+CHAT_WINDOW = 20
+
+# Batch result rows sent to the browser per page; the full results stay on disk
+BATCH_PAGE_SIZE = 100
+
+# Seconds between progress updates of a running batch job
+BATCH_POLL_SECONDS = float(os.environ.get("BATCH_POLL_SECONDS", 1))
+
+# Serve Prometheus metrics on this port (e.g. 9100); unset to disable
+METRICS_PORT = os.environ.get("METRICS_PORT")
 
-# Initialize sentiment analysis with VADER
+@st.cache_resource
+def start_metrics_server(port):
+    return instrumentation.start_metrics_server(int(port))
+
+if METRICS_PORT and instrumentation.ENABLED:
+    start_metrics_server(METRICS_PORT)
+
+# Models are loaded once per server process and shared by all sessions and reruns
+@st.cache_resource(show_spinner="Loading sentiment model...")
+def load_sentiment_backend(name):
+    downloaded = False
+    if name in ("vader", "cascade"):
+        # Download NLTK data if not already available
+        try:
+            nltk.data.find('sentiment/vader_lexicon')
+        except LookupError:
+            nltk.download('vader_lexicon')
+            downloaded = True
+    with stage("model_load"):
+        return make_backend(name), downloaded
+
+# Batch jobs run on a scheduler shared by all sessions; jobs interrupted by a restart resume here
+@st.cache_resource
+def load_job_scheduler(backend_name, _backend):
+    scheduler = JobScheduler(JobStore(), backend=_backend)
+    scheduler.resume_unfinished()
+    return scheduler
+
+@st.cache_resource(show_spinner="Loading movie catalog...")
+def load_chatbot(catalog_path):
+    # The catalog index is memory-mapped, so its pages are shared between processes
+    return MovieChatbot(catalog=load_catalog(catalog_path) if catalog_path else None)
+
+@st.cache_resource(show_spinner="Loading chat model...")
+def load_generative_chatbot():
+    from chat_generation import GenerativeChatbot
+    return GenerativeChatbot()
+
+# Initialize sentiment analysis
 try:
-    # Create VADER sentiment analyzer
-    sentiment_analyzer = SentimentIntensityAnalyzer()
+    sentiment_backend, lexicon_downloaded = load_sentiment_backend(SENTIMENT_BACKEND)
+    if lexicon_downloaded:
+        st.success("✅ NLTK vader_lexicon downloaded successfully!")
+    elif SENTIMENT_BACKEND in ("vader", "cascade"):
+        st.success("✅ NLTK vader_lexicon found!")
+    
+    # Results are shared across sessions through the process-wide cache
+    result_cache = get_cache(sentiment_backend.name, sentiment_backend.revision)
+    
+    # The cascade also reports which stage decided; only VADER runs for that, so cached results get it too
+    cascade = cascade_router(sentiment_backend)
     
     # Function to analyze sentiment
+    # Every backend maps its polarity to POSITIVE / NEUTRAL / NEGATIVE with a 0-1 score
     def analyze_sentiment(text):
-        scores = sentiment_analyzer.polarity_scores(text)
-        compound = scores['compound']
-        
-        if compound >= 0.05:
-            return {"label": "POSITIVE", "score": (compound + 1) / 2}  # Scale to 0-1
-        elif compound <= -0.05:
-            return {"label": "NEGATIVE", "score": (1 - compound) / 2}  # Scale to 0-1
-        else:
-            return {"label": "NEUTRAL", "score": 0.5}
+        with stage("analyze_sentiment"):
+            result = result_cache.get_or_compute(text, sentiment_backend.analyze)
+            if cascade is not None:
+                result = {**result, "stage": CASCADE_STAGES[cascade.stages([text])[0]]}
+            return result
+    
+    job_scheduler = load_job_scheduler(sentiment_backend.name, sentiment_backend)
     
     st.success("✅ Sentiment analysis model loaded successfully!")
 except Exception as e:
     st.error(f"❌ Error loading sentiment analyzer: {str(e)}")
     st.stop()
 
-# Simple rule-based movie chatbot
-class MovieChatbot:
-    def __init__(self):
-        self.movie_genres = ["action", "comedy", "drama", "horror", "sci-fi", "thriller", 
-                            "romance", "animation", "documentary", "fantasy", "adventure"]
-        
-        self.popular_movies = {
-            "action": ["Die Hard", "The Matrix", "John Wick", "Mad Max: Fury Road", "The Dark Knight"],
-            "comedy": ["Superbad", "Anchorman", "Bridesmaids", "The Hangover", "Step Brothers"],
-            "drama": ["The Shawshank Redemption", "The Godfather", "Schindler's List", "Forrest Gump", "The Green Mile"],
-            "horror": ["The Shining", "Hereditary", "Get Out", "The Exorcist", "A Quiet Place"],
-            "sci-fi": ["Blade Runner", "Interstellar", "The Martian", "Arrival", "Dune"],
-            "thriller": ["Silence of the Lambs", "Se7en", "Parasite", "Gone Girl", "Shutter Island"],
-            "romance": ["The Notebook", "Pride and Prejudice", "La La Land", "Before Sunrise", "Eternal Sunshine of the Spotless Mind"],
-            "animation": ["Toy Story", "Spirited Away", "Spider-Man: Into the Spider-Verse", "The Lion King", "WALL-E"],
-            "documentary": ["March of the Penguins", "Free Solo", "13th", "Won't You Be My Neighbor?", "My Octopus Teacher"],
-            "fantasy": ["The Lord of the Rings", "Harry Potter", "Pan's Labyrinth", "The Princess Bride", "The Shape of Water"],
-            "adventure": ["Indiana Jones", "The Goonies", "Pirates of the Caribbean", "Jurassic Park", "The Mummy"]
-        }
-        
-        self.famous_directors = ["Christopher Nolan", "Steven Spielberg", "Martin Scorsese", 
-                                "Quentin Tarantino", "James Cameron", "Greta Gerwig", 
-                                "Alfred Hitchcock", "Stanley Kubrick", "Francis Ford Coppola"]
-        
-        self.famous_actors = ["Tom Hanks", "Meryl Streep", "Leonardo DiCaprio", "Denzel Washington", 
-                            "Viola Davis", "Robert De Niro", "Jennifer Lawrence", "Brad Pitt", 
-                            "Cate Blanchett", "Morgan Freeman"]
-        
-        # Patterns for matching user inputs
-        self.patterns = {
-            "greeting": r"(?i)(\bhello\b|\bhi\b|\bhey\b|\bgreetings\b)",
-            "how_are_you": r"(?i)(how are you|how's it going|how do you do|what's up)",
-            "recommend": r"(?i)(recommend|suggest|what should I watch|good movie)",
-            "genre": r"(?i)(action|comedy|drama|horror|sci-fi|thriller|romance|animation|documentary|fantasy|adventure)",
-            "opinion": r"(?i)(what (?:do you think|is your opinion) about|have you seen|do you like)",
-            "director": r"(?i)(director|filmmaker|made by)",
-            "actor": r"(?i)(actor|actress|star|starring|plays in)",
-            "best": r"(?i)(best|greatest|favorite|top|excellent)",
-            "worst": r"(?i)(worst|terrible|bad|awful|dislike)",
-            "thank": r"(?i)(thank|thanks|appreciate)",
-            "bye": r"(?i)(bye|goodbye|see you|farewell)"
-        }
-        
-        # Responses for different patterns
-        self.responses = {
-            "greeting": [
-                "Hello! I'm your friendly movie chatbot. What kind of movies do you enjoy?",
-                "Hi there! Ready to talk about some great films?",
-                "Hey! I'm excited to chat about movies with you today!"
-            ],
-            "how_are_you": [
-                "I'm doing great, thanks for asking! Always happy to discuss movies. What's on your mind?",
-                "I'm excellent! I've been thinking about movies all day. What can I help you with?",
-                "All good here in the digital world! Ready to talk about your favorite films?"
-            ],
-            "recommend_generic": [
-                "I'd recommend checking out 'The Shawshank Redemption' - it's a classic for a reason!",
-                "Have you seen 'Parasite'? It's a brilliant film that won Best Picture!",
-                "I think 'Everything Everywhere All at Once' is a must-watch if you haven't seen it yet.",
-                "You might enjoy 'Inception' - it's a mind-bending experience!",
-                "How about 'The Grand Budapest Hotel'? It's visually stunning and has a great story."
-            ],
-            "opinion_generic": [
-                "That's a fascinating film with some really memorable moments!",
-                "I think it's a solid movie that showcases some great performances.",
-                "It's definitely one that makes you think! The cinematography is excellent too.",
-                "That one has some devoted fans! The direction is particularly noteworthy."
-            ],
-            "director_generic": [
-                "They've made some incredible contributions to cinema! Which of their films have you seen?",
-                "One of the most influential directors of their generation! Do you have a favorite film by them?",
-                "Their visual style is so distinctive! I always look forward to their new releases."
-            ],
-            "actor_generic": [
-                "They're incredibly talented! They bring so much depth to their characters.",
-                "One of the finest performers working today! Have you seen their recent work?",
-                "They have such an impressive range! They can do comedy and drama equally well."
-            ],
-            "best_generic": [
-                "It's hard to pick the absolute best, but 'The Godfather' is often considered one of the greatest films ever made.",
-                "Many critics would say 'Citizen Kane' changed cinema forever and remains one of the best.",
-                "For pure entertainment value, it's hard to beat the original 'Star Wars'!"
-            ],
-            "worst_generic": [
-                "There are quite a few contenders for that title! 'The Room' is famously so bad it's good.",
-                "Some of the movies with 0% on Rotten Tomatoes might qualify!",
-                "Everyone has different tastes - one person's worst movie might be another's guilty pleasure!"
-            ],
-            "thank": [
-                "You're welcome! I'm happy to talk movies anytime.",
-                "My pleasure! Is there anything else you'd like to discuss about cinema?",
-                "Glad I could help! Let me know if you want to chat more about films."
-            ],
-            "bye": [
-                "Goodbye! Enjoy your movie watching!",
-                "See you later! Hope you find something great to watch!",
-                "Until next time! The credits may be rolling on our conversation, but there's always a sequel!"
-            ],
-            "default": [
-                "Interesting perspective on movies! What genres do you typically enjoy?",
-                "I'm not quite sure I understood that. Could you tell me more about your movie preferences?",
-                "That's a unique take! Have you seen any good films lately?",
-                "Movies are such a rich topic for discussion! Is there a particular era of film you enjoy most?"
-            ]
-        }
-    
-    def get_response(self, user_input):
-        # Check for patterns in user input
-        if re.search(self.patterns["greeting"], user_input):
-            return random.choice(self.responses["greeting"])
-        
-        elif re.search(self.patterns["how_are_you"], user_input):
-            return random.choice(self.responses["how_are_you"])
-        
-        elif re.search(self.patterns["thank"], user_input):
-            return random.choice(self.responses["thank"])
-        
-        elif re.search(self.patterns["bye"], user_input):
-            return random.choice(self.responses["bye"])
-        
-        elif re.search(self.patterns["recommend"], user_input):
-            # Check if a specific genre is mentioned
-            genre_match = re.search(self.patterns["genre"], user_input)
-            if genre_match:
-                genre = genre_match.group(0).lower()
-                if genre in self.movie_genres:
-                    movies = self.popular_movies.get(genre, [])
-                    if movies:
-                        movie = random.choice(movies)
-                        return f"For {genre}, I'd recommend '{movie}'. It's one of my favorites in that genre!"
-            
-            # Generic recommendation
-            return random.choice(self.responses["recommend_generic"])
-        
-        elif re.search(self.patterns["opinion"], user_input):
-            # Generic opinion
-            return random.choice(self.responses["opinion_generic"])
-        
-        elif re.search(self.patterns["director"], user_input):
-            # Check if a specific director is mentioned
-            for director in self.famous_directors:
-                if director.lower() in user_input.lower():
-                    return f"{director} is a brilliant filmmaker! Their visual storytelling and attention to detail are remarkable."
-            
-            # Generic director response
-            return random.choice(self.responses["director_generic"])
-        
-        elif re.search(self.patterns["actor"], user_input):
-            # Check if a specific actor is mentioned
-            for actor in self.famous_actors:
-                if actor.lower() in user_input.lower():
-                    return f"{actor} brings such authenticity to every role. Their performances are always captivating!"
-            
-            # Generic actor response
-            return random.choice(self.responses["actor_generic"])
-        
-        elif re.search(self.patterns["best"], user_input):
-            # Check if a specific genre is mentioned for "best"
-            genre_match = re.search(self.patterns["genre"], user_input)
-            if genre_match:
-                genre = genre_match.group(0).lower()
-                if genre in self.movie_genres and genre in self.popular_movies:
-                    movie = self.popular_movies[genre][0]  # First movie in the list (presumably the best)
-                    return f"For {genre}, '{movie}' is widely considered one of the best!"
-            
-            # Generic "best" response
-            return random.choice(self.responses["best_generic"])
-        
-        elif re.search(self.patterns["worst"], user_input):
-            return random.choice(self.responses["worst_generic"])
-        
-        # Default response if no patterns match
-        return random.choice(self.responses["default"])
-
 # Initialize chatbot
-chatbot = MovieChatbot()
+if CHAT_BACKEND == "generative":
+    chatbot = load_generative_chatbot()
+else:
+    chatbot = load_chatbot(MOVIE_CATALOG)
 
 # Initialize session states
+# Histories are bounded ring buffers, so long sessions do not grow without limit
 if "analysis_history" not in st.session_state:
-    st.session_state.analysis_history = []
+    st.session_state.analysis_history = HistoryBuffer(maxlen=10)
 
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = HistoryBuffer(maxlen=CHAT_HISTORY_MAXLEN, spill=True)
+    st.session_state.chat_page = 0
+
+# Generative chat keeps each session's token history and key/value cache
+if CHAT_BACKEND == "generative" and "chat_session" not in st.session_state:
+    st.session_state.chat_session = chatbot.new_session()
 
 st.title("🎬 Movie Chat & Sentiment Analysis")
 st.markdown("### Talk about movies with our AI assistant and analyze sentiment")
@@ -234,17 +140,8 @@ tabs = st.tabs(["Movie Chat", "Text Analysis", "Batch Analysis"])
 with tabs[0]:
     st.header("💬 Movie Chat")
     
-    # Create a more prominent chat interface
-    st.markdown("""
-    <style>
-    .chat-container {
-        border: 1px solid #e0e0e0;
-        border-radius: 10px;
-        padding: 20px;
-        margin-bottom: 20px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Chat styles, injected once per run
+    st.markdown(CHAT_CSS, unsafe_allow_html=True)
     
     # Chat input area
     chat_input = st.text_input("Your Message", placeholder="E.g., I love sci-fi movies! What do you recommend?")
@@ -253,11 +150,28 @@ with tabs[0]:
         send_button = st.button("Send", key="send_chat", use_container_width=True)
     with col2:
         if st.button("Clear Chat History", key="clear_chat"):
-            st.session_state.chat_history = []
+            st.session_state.chat_history.clear()
+            st.session_state.chat_page = 0
+            if CHAT_BACKEND == "generative":
+                st.session_state.chat_session.reset()
             st.rerun()
     
     # Process chat input
-    if send_button and chat_input.strip():
+    if send_button and chat_input.strip() and CHAT_BACKEND == "generative":
+        try:
+            # Tokens show up as they are generated; the history below shows the final reply
+            stream_area = st.empty()
+            reply = stream_area.write_stream(chatbot.stream_response(st.session_state.chat_session, chat_input))
+            stream_area.empty()
+            st.session_state.chat_history.append({"user": chat_input, "bot": reply})
+            st.session_state.chat_page = 0
+            stats = st.session_state.chat_session.last_stats
+            st.caption(f"First token after {stats.get('ttft_s', 0) * 1000:.0f} ms · "
+                       f"{stats['tokens_per_s']:.1f} tokens/s · "
+                       f"{stats['cached_tokens']} cached + {stats['prompt_tokens']} new prompt tokens")
+        except Exception as e:
+            st.error(f"Error generating response: {str(e)}")
+    elif send_button and chat_input.strip():
         with st.spinner("Generating response..."):
             try:
                 # Generate bot response using rule-based chatbot
@@ -268,46 +182,33 @@ with tabs[0]:
                     "user": chat_input, 
                     "bot": reply
                 })
+                st.session_state.chat_page = 0
             except Exception as e:
                 st.error(f"Error generating response: {str(e)}")
     
-    # Display chat history with larger text and better structure
-    if st.session_state.chat_history:
-        # Add custom CSS for chat bubbles
-        st.markdown("""
-        <style>
-        .chat-container {
-            margin-bottom: 30px;
-            max-width: 100%;
-        }
-        .user-message {
-            background-color: #2b5797;
-            color: white;
-            padding: 15px;
-            border-radius: 15px;
-            margin-bottom: 10px;
-            font-size: 18px;
-            font-weight: 500;
-        }
-        .bot-message {
-            background-color: #0078d4;
-            color: white;
-            padding: 15px;
-            border-radius: 15px;
-            margin-bottom: 20px;
-            font-size: 18px;
-            font-weight: 500;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+    # Display one window of the chat history; older turns are paged in on demand
+    chat_history = st.session_state.chat_history
+    if chat_history:
+        pages = chat_history.pages(CHAT_WINDOW)
+        st.session_state.chat_page = min(st.session_state.chat_page, pages - 1)
+        entries, first = chat_history.page(st.session_state.chat_page, CHAT_WINDOW)
+        
+        # All bubbles of the window go out as a single element
+        st.markdown(chat_html(entries), unsafe_allow_html=True)
         
-        # Create a container for the chat
-        for i, entry in enumerate(st.session_state.chat_history):
-            # User message
-            st.markdown(f'<div class="user-message"><strong>You:</strong> {entry["user"]}</div>', unsafe_allow_html=True)
+        if pages > 1:
+            def show_page(step):
+                st.session_state.chat_page += step
             
-            # Bot message
-            st.markdown(f'<div class="bot-message"><strong>Movie Bot:</strong> {entry["bot"]}</div>', unsafe_allow_html=True)
+            col1, col2, col3 = st.columns([1, 1, 4])
+            with col1:
+                st.button("Older turns", key="chat_older", on_click=show_page, args=(1,),
+                          disabled=st.session_state.chat_page >= pages - 1, use_container_width=True)
+            with col2:
+                st.button("Newer turns", key="chat_newer", on_click=show_page, args=(-1,),
+                          disabled=st.session_state.chat_page == 0, use_container_width=True)
+            with col3:
+                st.caption(f"Turns {first + 1}-{first + len(entries)} of {len(chat_history)}")
     else:
         st.info("Start chatting with the Movie Bot! Ask about movie recommendations, share your opinions, or discuss your favorite films.")
     
@@ -335,7 +236,7 @@ with tabs[1]:
         analyze_button = st.button("Analyze Sentiment", key="analyze_single", use_container_width=True)
     with col2:
         if st.button("Clear Analysis History", key="clear_analysis", use_container_width=True):
-            st.session_state.analysis_history = []
+            st.session_state.analysis_history.clear()
             st.rerun()
     with col3:
         pass  # Empty column to push buttons to the left
@@ -348,9 +249,7 @@ with tabs[1]:
                     label = result["label"]
                     score = result["score"]
                     
-                    # Add to history
-                    if len(st.session_state.analysis_history) >= 10:
-                        st.session_state.analysis_history.pop(0)
+                    # Add to history (the ring buffer drops the oldest entry)
                     st.session_state.analysis_history.append({"text": user_input[:100] + "..." if len(user_input) > 100 else user_input, 
                                                              "sentiment": label, 
                                                              "score": score})
@@ -363,19 +262,26 @@ with tabs[1]:
                     else:
                         st.info(f"😐 Sentiment: {label}")
                     st.write(f"**Confidence**: {score:.3f}")
+                    if "stage" in result:
+                        st.caption(f"Decided by the {result['stage']} stage of the cascade")
+                    cache_stats = result_cache.stats()
+                    st.caption(f"Result cache: {cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} disk hits, "
+                               f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
                     
-                    # Visualization
-                    fig = px.bar(
-                        x=["POSITIVE", "NEUTRAL", "NEGATIVE"],
-                        y=[
-                            score if label == "POSITIVE" else 0.1,
-                            score if label == "NEUTRAL" else 0.1,
-                            score if label == "NEGATIVE" else 0.1
-                        ],
-                        color=["POSITIVE", "NEUTRAL", "NEGATIVE"],
-                        labels={"x": "Sentiment", "y": "Confidence"},
-                        title="Sentiment Analysis Results"
-                    )
+                    # Visualization (plotly is imported on first use to keep cold start fast)
+                    with stage("chart_build"):
+                        import plotly.express as px
+                        fig = px.bar(
+                            x=["POSITIVE", "NEUTRAL", "NEGATIVE"],
+                            y=[
+                                score if label == "POSITIVE" else 0.1,
+                                score if label == "NEUTRAL" else 0.1,
+                                score if label == "NEGATIVE" else 0.1
+                            ],
+                            color=["POSITIVE", "NEUTRAL", "NEGATIVE"],
+                            labels={"x": "Sentiment", "y": "Confidence"},
+                            title="Sentiment Analysis Results"
+                        )
                     st.plotly_chart(fig)
                 except Exception as e:
                     st.error(f"Error during analysis: {str(e)}")
@@ -385,7 +291,7 @@ with tabs[1]:
     # Show history
     if st.session_state.analysis_history:
         st.subheader("Recent Analysis History")
-        for i, entry in enumerate(reversed(st.session_state.analysis_history)):
+        for i, entry in enumerate(reversed(st.session_state.analysis_history.recent())):
             with st.expander(f"#{i+1}: {entry['text']}"):
                 sentiment_color = "green" if entry['sentiment'] == "POSITIVE" else "red" if entry['sentiment'] == "NEGATIVE" else "gray"
                 st.markdown(f"**Sentiment**: <span style='color:{sentiment_color}'>{entry['sentiment']}</span>", unsafe_allow_html=True)
@@ -395,57 +301,166 @@ with tabs[1]:
 with tabs[2]:
     st.header("📈 Batch Sentiment Analysis")
     st.markdown("Analyze multiple texts at once.")
-    st.info("Upload a CSV file with a 'text' column containing the texts to analyze.")
+    st.info("Upload a CSV or Parquet file with a 'text' column containing the texts to analyze.")
     
-    uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+    uploaded_file = st.file_uploader("Choose a CSV or Parquet file", type=["csv", "parquet"])
     
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
-            if 'text' not in df.columns:
-                st.error("CSV file must contain a 'text' column.")
+            # Only read the header here; rows are streamed during analysis
+            input_format = "parquet" if uploaded_file.name.lower().endswith(".parquet") else "csv"
+            if input_format == "parquet":
+                import pyarrow.parquet as pq
+                columns = pq.ParquetFile(uploaded_file).schema_arrow.names
+            else:
+                columns = pd.read_csv(uploaded_file, nrows=0).columns
+            uploaded_file.seek(0)
+            if 'text' not in columns:
+                st.error("The file must contain a 'text' column.")
             else:
+                output_format = st.radio("Output format", ["csv", "parquet"], horizontal=True,
+                                         format_func=str.upper, key="batch_output_format")
+                
+                # Parallel options for large files
+                with st.expander("Parallel processing"):
+                    use_parallel = st.checkbox("Use multiple CPU cores", key="batch_parallel")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        workers = st.number_input("Worker processes", min_value=1, max_value=64,
+                                                  value=os.cpu_count() or 1, key="batch_workers")
+                    with col2:
+                        chunk_size = st.number_input("Rows per chunk", min_value=100, max_value=1000000,
+                                                     value=10000, step=1000, key="batch_chunk_size")
+                
                 if st.button("Run Batch Analysis", key="analyze_batch"):
-                    with st.spinner("Analyzing batch data..."):
-                        # Process in batches to avoid memory issues
-                        batch_size = 100
-                        results = []
-                        
-                        progress_bar = st.progress(0)
-                        for i in range(0, len(df), batch_size):
-                            batch = df['text'].iloc[i:i+batch_size].tolist()
-                            batch_results = [analyze_sentiment(text) for text in batch]
-                            results.extend(batch_results)
-                            progress_bar.progress(min(1.0, (i + batch_size) / len(df)))
-                        
-                        # Add results to dataframe
-                        df['sentiment'] = [r['label'] for r in results]
-                        df['confidence'] = [r['score'] for r in results]
-                        
-                        # Display results
-                        st.subheader("Analysis Results")
-                        st.dataframe(df)
-                        
-                        # Visualization
-                        sentiment_counts = df['sentiment'].value_counts().reset_index()
-                        sentiment_counts.columns = ['Sentiment', 'Count']
-                        
-                        fig1 = px.pie(sentiment_counts, values='Count', names='Sentiment', 
-                                     title='Sentiment Distribution', color='Sentiment',
-                                     color_discrete_map={'POSITIVE': 'green', 'NEUTRAL': 'gray', 'NEGATIVE': 'red'})
-                        st.plotly_chart(fig1)
-                        
-                        # Allow download of results
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            label="Download Results as CSV",
-                            data=csv,
-                            file_name="sentiment_analysis_results.csv",
-                            mime="text/csv",
+                    # The job copies the upload and runs in the background; this session only polls it
+                    try:
+                        job_id = job_scheduler.enqueue(
+                            uploaded_file,
+                            name=uploaded_file.name,
+                            input_format=input_format,
+                            output_format=output_format,
+                            backend=sentiment_backend.name,
+                            chunk_size=int(chunk_size),
+                            workers=int(workers) if use_parallel else 1,
                         )
+                    except QueueFull:
+                        st.error("Too many batch jobs are waiting. Please try again later.")
+                    else:
+                        st.session_state.pop("batch_result", None)
+                        st.session_state.batch_job = job_id
+                        st.query_params["job"] = job_id
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
+    
+    # The job id is kept in the URL, so a refreshed or reopened page picks the job up again
+    if "batch_job" not in st.session_state and "job" in st.query_params:
+        if valid_job_id(st.query_params["job"]):
+            st.session_state.batch_job = st.query_params["job"]
+        else:
+            st.query_params.pop("job")
+    
+    # Only this fragment reruns while a job is unfinished; a finished job reruns the page to show its results
+    @st.fragment(run_every=BATCH_POLL_SECONDS)
+    def batch_job_status(job_id):
+        job = job_scheduler.store.get(job_id)
+        if job["status"] not in UNFINISHED:
+            st.rerun()
+        if job["status"] == "queued":
+            st.info(f"Batch job for {job['name']} is queued ({job_scheduler.position(job_id)} jobs ahead).")
+        else:
+            st.progress(min(1.0, job["bytes_done"] / max(job["input_bytes"], 1)),
+                        text=f"Analyzing {job['name']}: {job['rows']} rows scored")
+            cache_stats = result_cache.stats()
+            st.caption(f"Result cache: {cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} disk hits, "
+                       f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+        if st.button("Cancel", key="batch_cancel"):
+            job_scheduler.cancel(job_id)
+    
+    batch_job = st.session_state.get("batch_job")
+    if batch_job is not None:
+        job = job_scheduler.store.get(batch_job)
+        if job is None:
+            # Expired or unknown job; its results went with it
+            del st.session_state.batch_job
+            st.query_params.pop("job", None)
+            if st.session_state.get("batch_result", {}).get("job_id") == batch_job:
+                del st.session_state.batch_result
+        elif job["status"] in UNFINISHED:
+            batch_job_status(batch_job)
+        elif job["status"] == "done":
+            if st.session_state.get("batch_result", {}).get("job_id") != batch_job:
+                st.session_state.batch_result = load_result(job_scheduler.store, batch_job)
+                st.session_state.batch_page_number = 1
+        elif job["status"] == "failed":
+            st.error(f"Batch job failed: {job['error']}")
+        else:
+            st.warning(f"Batch job cancelled after {job['rows']} rows.")
+    
+    # Results view: aggregates and one page of rows, so its cost does not grow with the row count
+    batch_result = st.session_state.get("batch_result")
+    if batch_result is not None:
+        summary, pages = batch_result["summary"], batch_result["pages"]
+        st.subheader("Analysis Results")
+        errors = batch_result["errors"]
+        if errors:
+            st.warning(f"{len(errors)} rows could not be analyzed (first error on row {errors[0][0]}: {errors[0][1]})")
+        stages = batch_result.get("stages")
+        if stages:
+            escalated = stages["transformer"] / max(sum(stages.values()), 1)
+            st.caption(f"Cascade: {stages['vader']} rows decided by VADER, {stages['transformer']} escalated "
+                       f"to the transformer ({escalated:.1%})")
+        
+        # Visualization, built from the pre-aggregated summary
+        with stage("chart_build"):
+            import plotly.express as px
+            colors = {'POSITIVE': 'green', 'NEUTRAL': 'gray', 'NEGATIVE': 'red'}
+            fig1 = px.pie(summary.label_frame(), values='Count', names='Sentiment',
+                          title='Sentiment Distribution', color='Sentiment', color_discrete_map=colors)
+            fig2 = px.bar(summary.confidence_frame(), x='Confidence', y='Count', color='Sentiment',
+                          title='Confidence Distribution', color_discrete_map=colors)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(fig1)
+        with col2:
+            st.plotly_chart(fig2)
+        st.markdown("**By text length**")
+        st.dataframe(summary.bucket_frame(), hide_index=True)
+        
+        # Only the current page of rows is read back from the result file
+        page_count = pages.count(BATCH_PAGE_SIZE)
+        page_number = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                                      key="batch_page_number")
+        first_row = (page_number - 1) * BATCH_PAGE_SIZE
+        st.caption(f"Rows {first_row + 1}-{min(first_row + BATCH_PAGE_SIZE, batch_result['rows'])} "
+                   f"of {batch_result['rows']}.")
+        st.dataframe(pages.page(page_number - 1, BATCH_PAGE_SIZE))
+        
+        # The full results are only read when a download is requested
+        suffix, mime = OUTPUT_FORMATS[batch_result["format"]]
+        if st.button("Prepare download", key="batch_prepare_download"):
+            with open(batch_result["path"], "rb") as results_file, stage("download_serialize"):
+                st.download_button(
+                    label=f"Download Results as {batch_result['format'].upper()}",
+                    data=results_file,
+                    file_name=f"sentiment_analysis_results{suffix}",
+                    mime=mime,
+                    on_click="ignore",
+                )
 
 # Footer
 st.markdown("---")
-st.markdown("Powered by NLTK VADER Sentiment Analysis")
\ No newline at end of file
+st.markdown(f"Powered by {sentiment_backend.description}")
+
+# Debug panel: where this session's time went, plus the process-wide metrics
+if instrumentation.ENABLED:
+    with st.expander("🔧 Debug: stage timings"):
+        session_stages = st.session_state.stage_log.summary()
+        if session_stages:
+            st.markdown("**This session** (most recent timings)")
+            st.dataframe(pd.DataFrame.from_dict(session_stages, orient="index").round(2))
+        process_stages = REGISTRY.summary()
+        if process_stages:
+            st.markdown("**All sessions in this process** (p50/p95 are histogram bucket bounds)")
+            st.dataframe(pd.DataFrame.from_dict(process_stages, orient="index").round(2))
+        st.code(REGISTRY.prometheus(), language="text")
\ No newline at end of file
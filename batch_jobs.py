@@ -0,0 +1,339 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+
+from instrumentation import count, stage
+from sentiment_cache import CACHE_DIR
+from streaming_batch import (OUTPUT_FORMATS, ResultPages, ResultSummary, ResultWriter, concat_results,
+                             read_chunks, score_chunks, text_lengths)
+from vader_batch import SENTIMENT_LABELS
+
+# Background batch jobs that survive reruns, refreshes and restarts.
+#
+# A job is a directory under BATCH_JOBS_DIR holding a copy of the input,
+# job.json (options, status and progress) and the results. Every scored
+# chunk is written to its own part file and the ResultSummary of all
+# chunks so far to a summary file of its own; then job.json is replaced
+# atomically, naming the new chunk count. A job that stopped (crash,
+# restart) resumes after the chunks job.json names, from the summary of
+# exactly those chunks, and when the last chunk is done the parts are
+# joined into the output file. While a job runs, its process holds an
+# exclusive lock on the job directory, so several server processes can
+# share BATCH_JOBS_DIR without running a job twice. JobScheduler runs
+# queued jobs on a bounded pool of threads.
+
+# Jobs hold users' uploads and results, so they live in the per-user cache directory, readable by no one else
+BATCH_JOBS_DIR = os.environ.get("BATCH_JOBS_DIR", os.path.join(CACHE_DIR, "jobs"))
+
+# Jobs scored at once per process, jobs waiting at most, and days finished jobs are kept
+BATCH_JOB_WORKERS = int(os.environ.get("BATCH_JOB_WORKERS", 2))
+MAX_QUEUED_JOBS = int(os.environ.get("BATCH_MAX_QUEUED_JOBS", 20))
+BATCH_JOB_TTL_DAYS = float(os.environ.get("BATCH_JOB_TTL_DAYS", 7))
+
+# Job ids are 12 hex digits; nothing else (e.g. from a URL) is ever used as a path
+JOB_ID = re.compile(r"[0-9a-f]{12}")
+
+UNFINISHED = ("queued", "running")
+FINISHED = ("done", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """Raised when MAX_QUEUED_JOBS jobs are already waiting or running."""
+
+
+def valid_job_id(job_id):
+    return isinstance(job_id, str) and JOB_ID.fullmatch(job_id) is not None
+
+
+def _write_json(path, value):
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(temporary, path)
+
+
+class JobStore:
+    """Job directories under root; job.json in each holds the job's state."""
+
+    def __init__(self, root=None):
+        self.root = root or BATCH_JOBS_DIR
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+
+    def path(self, job_id, *names):
+        """Returns: A path in the job's directory. Raises: ValueError for a malformed job id or name."""
+        if not valid_job_id(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        for name in names:
+            if name in ("", ".", "..") or os.sep in name or (os.altsep and os.altsep in name):
+                raise ValueError(f"Invalid name in job {job_id}: {name!r}")
+        return os.path.join(self.root, job_id, *names)
+
+    def create(self, source, name="upload", input_format="csv", output_format="csv", backend="vader",
+               chunk_size=50000, workers=1):
+        """
+        Copy source (a path or binary file object) into a new job directory.
+        Returns: The new job id.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        job_id = uuid.uuid4().hex[:12]
+        os.mkdir(self.path(job_id), mode=0o700)
+        os.mkdir(self.path(job_id, "parts"), mode=0o700)
+        input_path = self.path(job_id, f"input.{input_format}")
+        if isinstance(source, (str, os.PathLike)):
+            shutil.copyfile(source, input_path)
+        else:
+            with open(input_path, "wb") as f:
+                shutil.copyfileobj(source, f)
+        now = time.time()
+        self.save({
+            "id": job_id, "name": name, "status": "queued", "error": None,
+            "input_format": input_format, "output_format": output_format, "backend": backend,
+            "chunk_size": int(chunk_size), "workers": int(workers),
+            "created": now, "updated": now, "input_bytes": os.path.getsize(input_path), "bytes_done": 0,
+            "chunks_done": 0, "rows": 0, "errors": [], "parts": [], "resumed_at": [], "pages": None,
+        })
+        return job_id
+
+    def get(self, job_id):
+        """Returns: The job's state, or None if there is no such job."""
+        try:
+            with open(self.path(job_id, "job.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def save(self, job):
+        job["updated"] = time.time()
+        _write_json(self.path(job["id"], "job.json"), job)
+
+    def jobs(self):
+        """Returns: Every job's state, oldest first."""
+        jobs = [self.get(job_id) for job_id in os.listdir(self.root) if valid_job_id(job_id)]
+        return sorted((job for job in jobs if job is not None), key=lambda job: job["created"])
+
+    def request_cancel(self, job_id):
+        # A marker file, so a job running in another process sees it too
+        open(self.path(job_id, "cancel"), "w").close()
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self.path(job_id, "cancel"))
+
+    def lock(self, job_id):
+        """Returns: An open file holding the job's exclusive lock, or None if another thread or process holds it."""
+        f = open(self.path(job_id, "lock"), "w")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+        return f
+
+    def prune(self, max_age_days=None):
+        """Delete finished jobs not updated for max_age_days (default BATCH_JOB_TTL_DAYS)."""
+        cutoff = time.time() - 86400 * (BATCH_JOB_TTL_DAYS if max_age_days is None else max_age_days)
+        for job in self.jobs():
+            if job["status"] in FINISHED and job["updated"] < cutoff:
+                shutil.rmtree(self.path(job["id"]), ignore_errors=True)
+
+
+def _part_path(store, job, index):
+    return store.path(job["id"], "parts", f"{index:06d}{OUTPUT_FORMATS[job['output_format']][0]}")
+
+
+def _result_path(store, job):
+    return store.path(job["id"], f"results{OUTPUT_FORMATS[job['output_format']][0]}")
+
+
+def _pages(path, job, state):
+    # job.json keeps no paths: they are rebuilt from the job id and fixed names
+    return ResultPages(path, job["output_format"], state["columns"], state["rows"],
+                       [tuple(start) for start in state["chunk_starts"]])
+
+
+def _page_state(pages):
+    return {"columns": pages.columns, "rows": pages.rows, "chunk_starts": pages.chunk_starts}
+
+
+def _input_chunks(f, job):
+    # Reads are timed like score_file_stream's, and the file position gives progress
+    chunks = read_chunks(f, job["chunk_size"], job["input_format"])
+    try:
+        while True:
+            with stage("batch_read"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def _checkpoint(store, job, chunks=None):
+    # The summary of the job's first chunks (default: chunks_done) chunks
+    chunks = job["chunks_done"] if chunks is None else chunks
+    return store.path(job["id"], "parts", f"summary-{chunks:06d}.npz")
+
+
+def run_job(store, job_id, backend=None):
+    """
+    Run or resume a job until it is done, failed or cancelled. backend is
+    a loaded SentimentBackend to use when its name matches the job's.
+    Returns: The job's final state, or None if another thread or process
+    is running it.
+    """
+    lock = store.lock(job_id)
+    if lock is None:
+        return None
+    with lock:
+        job = store.get(job_id)
+        if job["status"] in FINISHED:
+            return job
+        if store.cancel_requested(job_id):
+            job["status"] = "cancelled"
+            store.save(job)
+            return job
+        if job["chunks_done"]:
+            job["resumed_at"].append(job["chunks_done"])
+        job["status"] = "running"
+        store.save(job)
+        # The summary checkpoint job.json names; a crash may leave a later one, which is ignored
+        summary = ResultSummary.load(_checkpoint(store, job)) if job["chunks_done"] else ResultSummary()
+        if backend is None or backend.name != job["backend"]:
+            backend = job["backend"]
+        try:
+            with open(store.path(job_id, f"input.{job['input_format']}"), "rb") as f, \
+                    closing(_input_chunks(f, job)) as chunks:
+                # Chunks before the checkpoint are read again but not scored
+                chunks = islice(chunks, job["chunks_done"], None)
+                for chunk, codes, scores, stages, chunk_errors in score_chunks(chunks, backend, job["workers"]):
+                    with stage("serialize"), \
+                            ResultWriter(_part_path(store, job, job["chunks_done"]), job["output_format"]) as writer:
+                        writer.write(chunk)
+                    summary.update(text_lengths(chunk), codes, scores, stages)
+                    job["errors"] += [(job["rows"] + row, message) for row, message in chunk_errors]
+                    job["parts"] = job["parts"][:job["chunks_done"]] + [_page_state(writer.pages())]
+                    job["chunks_done"] += 1
+                    job["rows"] += len(chunk)
+                    job["bytes_done"] = f.tell()
+                    # job.json only moves on once the summary of its chunks is on disk,
+                    # and the previous summary is kept until then
+                    summary.save(_checkpoint(store, job))
+                    store.save(job)
+                    if job["chunks_done"] > 1:
+                        os.remove(_checkpoint(store, job, job["chunks_done"] - 1))
+                    count("batch_rows_total", len(chunk))
+                    if store.cancel_requested(job_id):
+                        job["status"] = "cancelled"
+                        store.save(job)
+                        return job
+            parts = [_pages(_part_path(store, job, i), job, state) for i, state in enumerate(job["parts"])]
+            pages = concat_results(parts, _result_path(store, job), job["output_format"])
+            job["pages"] = _page_state(pages)
+            job["bytes_done"] = job["input_bytes"]
+            summary.save(store.path(job_id, "summary.npz"))
+            job["status"] = "done"
+            store.save(job)
+            shutil.rmtree(store.path(job_id, "parts"), ignore_errors=True)
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+            store.save(job)
+        return job
+
+
+def load_result(store, job_id):
+    """Returns: A finished job's results in the form score_file_stream returns (without a preview)."""
+    job = store.get(job_id)
+    summary = ResultSummary.load(store.path(job_id, "summary.npz"))
+    pages = _pages(_result_path(store, job), job, job["pages"])
+    return {
+        "job_id": job_id,
+        "path": pages.path,
+        "format": pages.output_format,
+        "rows": pages.rows,
+        "counts": dict(zip(SENTIMENT_LABELS, summary.counts.tolist())),
+        "summary": summary,
+        "pages": pages,
+        "errors": [tuple(error) for error in job["errors"]],
+        "stages": summary.stages(),
+    }
+
+
+class JobScheduler:
+    """
+    Runs jobs from a JobStore on at most workers threads, first come
+    first served; at most max_queued jobs wait or run at once.
+    """
+
+    def __init__(self, store, workers=None, max_queued=None, backend=None):
+        self.store = store
+        self.backend = backend
+        self.max_queued = MAX_QUEUED_JOBS if max_queued is None else max_queued
+        self.executor = ThreadPoolExecutor(max_workers=workers or BATCH_JOB_WORKERS, thread_name_prefix="batch-job")
+        self.futures = {}
+        self._lock = threading.Lock()
+
+    def pending(self):
+        with self._lock:
+            return sum(not future.done() for future in self.futures.values())
+
+    def submit(self, job_id, bounded=True):
+        """Queue a job already in the store. Raises: QueueFull when bounded and max_queued jobs are pending."""
+        with self._lock:
+            if bounded and sum(not future.done() for future in self.futures.values()) >= self.max_queued:
+                raise QueueFull()
+            self.futures[job_id] = self.executor.submit(run_job, self.store, job_id, self.backend)
+
+    def enqueue(self, source, **options):
+        """
+        Create a job from source (see JobStore.create) and queue it.
+        Returns: The job id. Raises: QueueFull when max_queued jobs are pending.
+        """
+        if self.pending() >= self.max_queued:
+            raise QueueFull()
+        job_id = self.store.create(source, **options)
+        try:
+            self.submit(job_id)
+        except QueueFull:
+            shutil.rmtree(self.store.path(job_id), ignore_errors=True)
+            raise
+        return job_id
+
+    def position(self, job_id):
+        """Returns: Number of jobs queued ahead of job_id in this scheduler."""
+        job = self.store.get(job_id)
+        return sum(1 for other in self.store.jobs()
+                   if other["status"] == "queued" and other["created"] < job["created"] and other["id"] in self.futures)
+
+    def cancel(self, job_id):
+        self.store.request_cancel(job_id)
+        # A job still waiting for a thread is cancelled now; a running one stops after its current chunk
+        future = self.futures.get(job_id)
+        if future is not None and future.cancel():
+            job = self.store.get(job_id)
+            job["status"] = "cancelled"
+            self.store.save(job)
+
+    def resume_unfinished(self):
+        """
+        Queue every queued or interrupted job in the store, beyond
+        max_queued if need be (jobs running in another process are
+        skipped by run_job). Returns: Their ids.
+        """
+        self.store.prune()
+        resumed = [job["id"] for job in self.store.jobs() if job["status"] in UNFINISHED]
+        for job_id in resumed:
+            self.submit(job_id, bounded=False)
+        return resumed
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
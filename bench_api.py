@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from synthetic_data import review_corpus
+
+# Load test for sentiment_api.py.
+#
+# concurrency clients each hold one keep-alive connection and send requests
+# back to back for duration seconds. Reports requests per second, latency
+# percentiles and status counts (429s show where backpressure kicks in).
+# With --serve, a server is started on a free local port for the run.
+
+
+async def read_response(reader):
+    """Returns: (status, headers, body) of one HTTP/1.1 response."""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+
+async def client(host, port, path, bodies, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            body = next(bodies)
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+            start = time.perf_counter()
+            writer.write(request)
+            status, headers, _ = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            if headers.get("connection", "").lower() == "close":
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+    finally:
+        writer.close()
+
+
+async def run_load(url, texts, concurrency, duration, batch_size):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if batch_size:
+        path = "/analyze/batch"
+        payloads = [json.dumps({"texts": texts[i:i + batch_size]}).encode()
+                    for i in range(0, len(texts) - batch_size + 1, batch_size)]
+    else:
+        path = "/analyze"
+        payloads = [json.dumps({"text": text}).encode() for text in texts]
+    bodies = itertools.cycle(payloads)
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(client(host, port, path, bodies, deadline, latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "texts_per_s": statuses[200] * max(batch_size, 1) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def start_server(port, extra_args):
+    """Start sentiment_api.py on port and wait until /health answers. Returns: The process."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_api.py")
+    # A session of its own, so stopping the group also stops forked server processes
+    process = subprocess.Popen([sys.executable, script, "--port", str(port), *extra_args], start_new_session=True)
+
+    async def wait_healthy():
+        for _ in range(600):
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                await asyncio.sleep(0.1)
+                continue
+            writer.write(f"GET /health HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+            status, _, _ = await read_response(reader)
+            writer.close()
+            if status == 200:
+                return
+        raise RuntimeError("sentiment_api.py did not become healthy")
+
+    asyncio.run(wait_healthy())
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the sentiment HTTP API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--batch-size", type=int, default=0, help="texts per /analyze/batch request (0: /analyze)")
+    parser.add_argument("--texts", type=int, default=20000, help="distinct synthetic reviews to send")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", action="store_true",
+                        help="start sentiment_api.py for the run; arguments after -- are passed to it")
+    args, server_args = parser.parse_known_args()
+    server_args = [arg for arg in server_args if arg != "--"]
+
+    process = None
+    if args.serve:
+        from tornado.netutil import bind_sockets
+
+        probe = bind_sockets(0, "127.0.0.1")[0]
+        port = probe.getsockname()[1]
+        probe.close()
+        args.url = f"http://127.0.0.1:{port}"
+        process = start_server(port, server_args)
+    try:
+        texts = review_corpus(args.texts, "lognormal", 40, args.seed)
+        result = asyncio.run(run_load(args.url, texts, args.concurrency, args.duration, args.batch_size))
+    finally:
+        if process is not None:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait()
+
+    print(f"{result['requests']} requests in {args.duration:.0f} s with {args.concurrency} connections")
+    print(f"  {result['rps']:.0f} requests/s, {result['texts_per_s']:.0f} texts/s")
+    print(f"  latency p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    print(f"  statuses {result['statuses']}")
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Latency, throughput, memory and agreement with the fp32 transformer for
+# every sentiment backend. Each backend runs in its own process so memory
+# numbers are not mixed up.
+
+REFERENCE = "transformer"
+
+
+def corpus(size=2000, seed=0):
+    """Fixed review-like corpus: test.csv plus seeded synthetic sentences."""
+    from tiny_models import WORDS
+    import pandas as pd
+
+    texts = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.csv"))["text"].tolist()
+    rng = np.random.default_rng(seed)
+    texts += [" ".join(rng.choice(WORDS, size=rng.integers(3, 60))) for _ in range(size - len(texts))]
+    return texts
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def measure(name, size):
+    import torch
+
+    from sentiment_backends import make_backend
+
+    torch.set_num_threads(1)
+    texts = corpus(size)
+    before = rss_mb()
+    start = time.perf_counter()
+    backend = make_backend(name)
+    load = time.perf_counter() - start
+    backend.analyze_batch(texts[:8])  # warm up
+
+    latencies = []
+    for text in texts[:100]:
+        start = time.perf_counter()
+        backend.analyze(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    codes, _ = backend.analyze_batch(texts)
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": name,
+        "load_s": load,
+        "p50_latency_ms": float(np.percentile(latencies, 50) * 1000),
+        "throughput": len(texts) / elapsed,
+        "memory_mb": rss_mb() - before,
+        "codes": codes.tolist(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sentiment backends.")
+    parser.add_argument("--model", help="transformer model name or path (default: a tiny local model)")
+    parser.add_argument("--size", type=int, default=2000, help="corpus size")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.size)))
+        sys.exit()
+
+    from sentiment_backends import BACKENDS
+    from tiny_models import save_tiny_classifier
+
+    env = dict(os.environ, SENTIMENT_MODEL=args.model or save_tiny_classifier(tempfile.mkdtemp(), dim=256, layers=4))
+    results = {}
+    for name in BACKENDS:
+        output = subprocess.run([sys.executable, __file__, "--measure", name, "--size", str(args.size)],
+                                capture_output=True, text=True, env=env, check=True)
+        results[name] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    reference = np.array(results[REFERENCE]["codes"])
+    print(f"{'backend':24s} {'load s':>7s} {'p50 ms':>8s} {'texts/s':>9s} {'RSS MB':>8s} {'agree w/ fp32':>14s}")
+    for name, r in results.items():
+        agreement = np.mean(np.array(r["codes"]) == reference)
+        print(f"{name:24s} {r['load_s']:7.2f} {r['p50_latency_ms']:8.2f} {r['throughput']:9.0f} "
+              f"{r['memory_mb']:8.1f} {agreement:14.1%}")
@@ -0,0 +1,94 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from sentiment_backends import CASCADE_MAX_WORDS, CASCADE_MIXED_RATIO
+from synthetic_data import review_corpus
+
+# Report on cascaded scoring: for each VADER band, how many texts the
+# cascade escalates to the transformer (and why), its throughput, how often
+# it agrees with transformer-only scoring, and its accuracy on the labeled
+# reviews in test.csv, overall and on the reviews VADER settles alone
+# ("kept"). The corpus is test.csv plus seeded synthetic reviews; accuracy
+# only uses the labeled rows. Backends are called directly, without the
+# result cache.
+#
+# Without --model the transformer is a DistilBERT-sized random model, so
+# timings and kept accuracy are realistic but agreement and overall
+# accuracy are not; pass a fine-tuned model (e.g. the app's default) for
+# meaningful numbers.
+
+
+def labeled_sample():
+    """Returns: (texts, label codes into SENTIMENT_LABELS) of the labeled reviews in test.csv."""
+    from vader_batch import SENTIMENT_LABELS
+
+    frame = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.csv"))
+    return frame["text"].tolist(), np.array([SENTIMENT_LABELS.index(label) for label in frame["label"]])
+
+
+def timed(function, texts):
+    """Returns: (result, texts per second)."""
+    start = time.perf_counter()
+    result = function(texts)
+    return result, len(texts) / (time.perf_counter() - start)
+
+
+def report(texts, labels, bands, max_words, mixed_ratio):
+    from sentiment_backends import CascadeBackend, CascadeRouter, TransformerBackend, VaderBackend
+
+    vader, transformer = VaderBackend(), TransformerBackend()
+    transformer.analyze_batch(texts[:8])  # warm up
+    labeled = slice(0, len(labels))
+
+    (reference, _), transformer_rate = timed(transformer.analyze_batch, texts)
+    (vader_codes, _), vader_rate = timed(vader.analyze_batch, texts)
+    print(f"{'scoring':>18} {'escalated':>9} {'band':>6} {'long':>6} {'mixed':>6} {'texts/s':>9} "
+          f"{'agree':>7} {'accuracy':>8} {'kept acc':>8}")
+
+    def row(name, codes, rate, escalated="", reasons=("", "", ""), kept=None):
+        agreement = np.mean(codes == reference)
+        accuracy = np.mean(codes[labeled] == labels)
+        kept_accuracy = f"{np.mean(codes[labeled][kept] == labels[kept]):.1%}" if kept is not None else ""
+        print(f"{name:>18} {escalated:>9} {reasons[0]:>6} {reasons[1]:>6} {reasons[2]:>6} {rate:9.0f} "
+              f"{agreement:7.1%} {accuracy:8.1%} {kept_accuracy:>8}")
+
+    row("transformer only", reference, transformer_rate, "100.0%")
+    row("vader only", vader_codes, vader_rate, "0.0%")
+    words = np.array([len(text.split()) for text in texts])
+    for band in bands:
+        router = CascadeRouter(vader, band=band, max_words=max_words, mixed_ratio=mixed_ratio)
+        compound, escalate = router.route(texts)
+        in_band, long = np.abs(compound) < band, words > max_words
+        mixed = escalate & ~in_band & ~long
+        (codes, _), rate = timed(CascadeBackend(router, transformer).analyze_batch, texts)
+        reasons = [f"{np.mean(reason):.1%}" for reason in (in_band, long & ~in_band, mixed)]
+        row(f"cascade band {band:g}", codes, rate, f"{np.mean(escalate):.1%}", reasons, ~escalate[labeled])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escalation rate, throughput and agreement of cascaded scoring.")
+    parser.add_argument("--model", help="transformer model name or path (default: a DistilBERT-sized random model)")
+    parser.add_argument("--size", type=int, default=1000, help="synthetic reviews added to the labeled sample")
+    parser.add_argument("--bands", type=float, nargs="+", default=[0.1, 0.25, 0.5], help="VADER bands to compare")
+    parser.add_argument("--max-words", type=int, default=CASCADE_MAX_WORDS)
+    parser.add_argument("--mixed-ratio", type=float, default=CASCADE_MIXED_RATIO)
+    args = parser.parse_args()
+
+    texts, labels = labeled_sample()
+    texts += review_corpus(args.size, seed=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            os.environ["SENTIMENT_MODEL"] = args.model
+        else:
+            from tiny_models import save_tiny_classifier
+
+            os.environ["SENTIMENT_MODEL"] = save_tiny_classifier(os.path.join(tmp, "model"), dim=768, layers=6,
+                                                                 max_length=512)
+            print("Random transformer weights: agreement and accuracy are not meaningful (use --model).")
+        print(f"Texts: {len(texts)} ({len(labels)} labeled)")
+        report(texts, labels, args.bands, args.max_words, args.mixed_ratio)
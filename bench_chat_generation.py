@@ -0,0 +1,40 @@
+import argparse
+import tempfile
+import time
+
+import torch
+
+from chat_generation import GenerativeChatbot, load_chat_model
+from tiny_models import save_tiny_causal_lm
+
+# Time to first token and decode speed over a growing conversation: the
+# KV-cached session against re-encoding the whole history every turn
+
+
+def recompute_ttft(model, prompt_ids):
+    start = time.perf_counter()
+    with torch.inference_mode():
+        model(input_ids=torch.tensor([prompt_ids]))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark KV-cached chat generation.")
+    parser.add_argument("--model", help="causal LM name or path (default: a tiny local model)")
+    parser.add_argument("--turns", type=int, default=12)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    tokenizer, model = load_chat_model(args.model or save_tiny_causal_lm(tempfile.mkdtemp(), dim=256, layers=4, max_length=1024))
+    bot = GenerativeChatbot(tokenizer, model, max_new_tokens=32)
+    session = bot.new_session()
+    message = "i really loved the acting in that movie but the plot was slow and the ending was a mess !"
+
+    print(f"{'turn':>4s} {'history':>8s} {'new':>5s} {'cached TTFT ms':>15s} {'recompute TTFT ms':>18s} {'tokens/s':>9s}")
+    for turn in range(1, args.turns + 1):
+        history = session.token_ids + tokenizer.encode(message + tokenizer.eos_token)
+        recompute = recompute_ttft(model, history)
+        bot.get_response(message, session)
+        stats = session.last_stats
+        print(f"{turn:4d} {stats['cached_tokens'] + stats['prompt_tokens']:8d} {stats['prompt_tokens']:5d} "
+              f"{stats['ttft_s'] * 1000:15.2f} {recompute * 1000:18.2f} {stats['tokens_per_s']:9.1f}")
@@ -0,0 +1,67 @@
+import argparse
+import tempfile
+import threading
+import time
+
+import numpy as np
+from transformers import pipeline
+
+from micro_batching import MicroBatcher
+from tiny_models import WORDS, save_tiny_classifier
+
+# Throughput and tail latency of concurrent single-text requests:
+# one classifier call per request versus the micro-batching queue.
+
+
+def run_clients(call, texts, threads):
+    latencies = [[] for _ in range(threads)]
+    results = [None] * len(texts)
+
+    def client(worker):
+        for i in range(worker, len(texts), threads):
+            start = time.perf_counter()
+            results[i] = call(texts[i])
+            latencies[worker].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(w,)) for w in range(threads)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    elapsed = time.perf_counter() - start
+    all_latencies = np.array([l for worker in latencies for l in worker]) * 1000
+    return results, {
+        "throughput": len(texts) / elapsed,
+        "p50_ms": float(np.percentile(all_latencies, 50)),
+        "p99_ms": float(np.percentile(all_latencies, 99)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Throughput and tail latency of concurrent requests: single calls vs micro-batching.")
+    parser.add_argument("--model", help="model name or local path (default: a tiny local model)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    model = args.model or save_tiny_classifier(tempfile.mkdtemp(), dim=256, layers=4)
+    classifier = pipeline("sentiment-analysis", model=model)
+    rng = np.random.default_rng(0)
+    texts = [" ".join(rng.choice(WORDS, size=rng.integers(4, 100))) for _ in range(args.requests)]
+    classifier(texts[:8])  # warm up
+
+    single, single_stats = run_clients(lambda text: classifier(text)[0], texts, args.threads)
+    batcher = MicroBatcher(classifier, args.max_batch_size, args.max_wait_ms)
+    batched, batched_stats = run_clients(batcher.classify, texts, args.threads)
+    batcher.close()
+
+    agree = np.mean([a["label"] == b["label"] for a, b in zip(single, batched)])
+    max_diff = max(abs(a["score"] - b["score"]) for a, b in zip(single, batched))
+    print(f"{args.requests} requests from {args.threads} threads")
+    for name, stats in (("single call", single_stats), ("micro-batched", batched_stats)):
+        print(f"  {name:14s} {stats['throughput']:8.1f} req/s  p50 {stats['p50_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms")
+    print(f"  label agreement {agree:.1%}, max score difference {max_diff:.2e}")
@@ -0,0 +1,66 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Build time, index size, load time, resident memory and query latency of
+# the indexed catalog, against loading the source into a pandas DataFrame
+# and scanning it. Loads run in fresh processes so memory is not shared.
+
+LOADERS = {
+    "pandas": """
+import pandas as pd
+frame = pd.read_csv(PATH)
+genre = "horror"
+query = lambda: frame[frame["genres"].str.contains(genre, regex=False)].nlargest(1, "rating")["title"].iloc[0]
+""",
+    "index": """
+from movie_catalog import MovieCatalog
+catalog = MovieCatalog.load(PATH)
+query = lambda: catalog.best("horror")
+""",
+}
+
+MEASURE = """
+import sys, time
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) / 1024 for line in f if line.startswith("VmRSS:"))
+PATH = sys.argv[1]
+before = rss_mb()
+start = time.perf_counter()
+{loader}
+load = time.perf_counter() - start
+query()
+start = time.perf_counter()
+for _ in range(100):
+    query()
+print(load, (time.perf_counter() - start) * 10, rss_mb() - before)
+"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the movie catalog index.")
+    parser.add_argument("--rows", type=int, default=300000, help="synthetic catalog size")
+    args = parser.parse_args()
+
+    from movie_catalog import MovieCatalog
+    from synthetic_data import write_movie_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_movie_catalog(os.path.join(tmp, "movies.csv"), args.rows)
+        index = os.path.join(tmp, "movies.catalog")
+        start = time.perf_counter()
+        MovieCatalog.from_file(source).save(index)
+        print(f"Movies: {args.rows}, index build: {time.perf_counter() - start:.1f}s, "
+              f"CSV {os.path.getsize(source) / 1e6:.1f} MB, index {os.path.getsize(index) / 1e6:.1f} MB")
+
+        print(f"{'load from':10s} {'load s':>8s} {'best-in-genre ms':>17s} {'RSS MB':>8s}")
+        for name, loader in LOADERS.items():
+            output = subprocess.run(
+                [sys.executable, "-c", MEASURE.format(loader=loader), source if name == "pandas" else index],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            load, query_ms, memory = map(float, output.stdout.split())
+            print(f"{name:10s} {load:8.3f} {query_ms:17.3f} {memory:8.1f}")
@@ -0,0 +1,54 @@
+import random
+import time
+
+import numpy as np
+
+from movie_chatbot import MovieChatbot
+
+# get_response latency as the director and actor lists grow, compared with
+# the old per-name scan (`name.lower() in user_input.lower()` for each name)
+
+SIZES = (10, 100, 1000, 10000, 100000)
+
+random.seed(0)
+syllables = "an bel cor dan el fin gar hol is jon kel lam mor nor os per quin ros sal tor ul van wes"
+syllables = syllables.split()
+
+
+def fake_name():
+    return " ".join("".join(random.choices(syllables, k=random.randint(2, 3))).title() for _ in range(2))
+
+
+names = [fake_name() for _ in range(max(SIZES))]
+
+
+def linear_lookup(people, user_input):
+    for person in people:
+        if person.lower() in user_input.lower():
+            return person
+    return None
+
+
+def p50_ms(function, inputs, repeat=3):
+    latencies = []
+    for _ in range(repeat):
+        for text in inputs:
+            start = time.perf_counter()
+            function(text)
+            latencies.append(time.perf_counter() - start)
+    return float(np.percentile(latencies, 50) * 1000)
+
+
+print(f"{'names':>7s} {'build ms':>9s} {'get_response p50 ms':>20s} {'old name scan p50 ms':>21s}")
+for size in SIZES:
+    directors = names[:size]
+    start = time.perf_counter()
+    bot = MovieChatbot(directors=directors, actors=directors)
+    build = time.perf_counter() - start
+    # Half the messages name someone from the end of the list, half nobody
+    inputs = [f"Tell me about the director {random.choice(directors[-10:])}?" for _ in range(100)]
+    inputs += ["Who is your favourite filmmaker of all time?"] * 100
+
+    responses = p50_ms(bot.get_response, inputs)
+    scan = p50_ms(lambda text: linear_lookup(directors, text), inputs, repeat=1)
+    print(f"{size:7d} {build * 1000:9.1f} {responses:20.3f} {scan:21.3f}")
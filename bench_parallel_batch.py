@@ -0,0 +1,23 @@
+import os
+import random
+import time
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from parallel_batch import analyze_sentiment_parallel
+
+# Speedup of the process-pool batch mode from 1 to N worker processes
+if __name__ == "__main__":
+    words = list(SentimentIntensityAnalyzer().lexicon)[:2000] + "the movie was not very good but the acting is really GREAT".split() * 50
+    random.seed(0)
+    texts = [" ".join(random.choices(words, k=random.randint(5, 80))) for _ in range(200000)]
+    texts[123] = float("nan")  # an empty cell, e.g. from pandas; clean_texts scores it as ""
+
+    baseline = None
+    print(f"Texts: {len(texts)}, CPU cores: {os.cpu_count()}")
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        labels, scores, errors = analyze_sentiment_parallel(texts, workers=workers, chunk_size=10000)
+        elapsed = time.perf_counter() - start
+        assert labels[123] == "NEUTRAL", labels[123]
+        baseline = baseline or elapsed
+        print(f"workers={workers:2d}  {elapsed:6.2f}s  {len(texts) / elapsed:8.0f} texts/s  speedup {baseline / elapsed:4.1f}x  failed rows: {len(errors)}")
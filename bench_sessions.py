@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.netutil import bind_sockets
+from tornado.websocket import websocket_connect
+
+from synthetic_data import review_corpus
+
+# Concurrent-session load harness for app.py.
+#
+# Starts one headless `streamlit run app.py` and connects many simulated
+# browser sessions to it over Streamlit's websocket protocol, so sessions
+# really run concurrently in one server process, sharing its cached
+# models, result cache and GIL as real visitors do. (AppTest runs one
+# script at a time per process, so it cannot measure this.) Each session
+# sends chat messages, analyzes single texts and uploads small CSV batches
+# in a seeded random mix. A batch's latency covers the upload and queueing
+# its job; the job itself is scored by the server's background workers,
+# which compete with the sessions for the process. Latency is measured from sending the rerun to
+# the server reporting the script finished; the server's memory is read
+# after each concurrency level.
+
+CHAT_MESSAGES = [
+    "Hello there!", "Can you recommend a good comedy?", "What is the best sci-fi film?",
+    "Do you like Christopher Nolan as a director?", "I think Tom Hanks is a great actor",
+    "I loved that movie, it was amazing", "That film was boring and too long", "Thanks, bye!",
+]
+INTERACTIONS = ("chat", "analyze", "batch")
+
+
+def _proto():
+    # Streamlit's protobuf modules; imported lazily like the app's other heavy dependencies
+    from streamlit.proto import BackMsg_pb2, Common_pb2, ForwardMsg_pb2, WidgetStates_pb2
+
+    return BackMsg_pb2, Common_pb2, ForwardMsg_pb2, WidgetStates_pb2
+
+
+def server_memory(pid):
+    """Returns: (RSS, anonymous) of the server process in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Anonymous"]
+
+
+class AppServer:
+    """A headless `streamlit run app.py` on a free local port."""
+
+    def __init__(self, script="app.py"):
+        probe = bind_sockets(0, "127.0.0.1")[0]
+        self.port = probe.getsockname()[1]
+        probe.close()
+        self.url = f"http://127.0.0.1:{self.port}"
+        # Batch jobs go to a directory removed with the server
+        self.jobs_dir = tempfile.mkdtemp(prefix="bench_jobs_")
+        # Upload requests from this harness carry no XSRF cookie
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", script, "--server.headless", "true",
+             "--server.address", "127.0.0.1", "--server.port", str(self.port),
+             "--server.enableXsrfProtection", "false", "--browser.gatherUsageStats", "false"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+            env={**os.environ, "BATCH_JOBS_DIR": self.jobs_dir},
+        )
+
+    async def wait_ready(self, timeout=120):
+        client = AsyncHTTPClient()
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                await client.fetch(self.url + "/_stcore/health")
+                return
+            except Exception:
+                await asyncio.sleep(0.2)
+        raise RuntimeError("streamlit server did not start")
+
+    def stop(self):
+        os.killpg(self.process.pid, signal.SIGTERM)
+        self.process.wait()
+        shutil.rmtree(self.jobs_dir, ignore_errors=True)
+
+
+class Session:
+    """
+    One simulated browser tab. Widget ids are learned from the elements
+    the server sends, by key or label, and the current value of every
+    input is sent with each rerun, as the frontend does.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.ws = None
+        self.session_id = None
+        self.widgets = {}
+        self.values = {}
+        self.failures = []
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.server.url.replace("http", "ws") + "/_stcore/stream",
+                                          max_message_size=256 * 1024 * 1024)
+        await self.rerun()
+
+    async def _send(self, message):
+        await self.ws.write_message(message.SerializeToString(), binary=True)
+
+    async def rerun(self, trigger=None, **extra):
+        """Rerun the script with the current inputs, clicking button trigger. Returns: Seconds until finished."""
+        BackMsg_pb2, Common_pb2, ForwardMsg_pb2, WidgetStates_pb2 = _proto()
+        message = BackMsg_pb2.BackMsg()
+        message.rerun_script.SetInParent()
+        states = message.rerun_script.widget_states
+        for widget_id, value in {**self.values, **extra}.items():
+            state = states.widgets.add(id=widget_id)
+            if isinstance(value, Common_pb2.FileUploaderState):
+                state.file_uploader_state_value.CopyFrom(value)
+            else:
+                state.string_value = value
+        if trigger is not None:
+            states.widgets.add(id=self.widgets[trigger], trigger_value=True)
+        start = time.perf_counter()
+        await self._send(message)
+        await self._until_finished()
+        return time.perf_counter() - start
+
+    async def _until_finished(self):
+        _, _, ForwardMsg_pb2, _ = _proto()
+        finished = ForwardMsg_pb2.ForwardMsg.FINISHED_SUCCESSFULLY
+        while True:
+            payload = await self.ws.read_message()
+            if payload is None:
+                raise ConnectionError("server closed the session")
+            message = ForwardMsg_pb2.ForwardMsg.FromString(payload)
+            kind = message.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = message.new_session.initialize.session_id
+            elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                self._learn(message.delta.new_element)
+            elif kind == "file_urls_response":
+                self.file_urls = message.file_urls_response
+            elif kind == "script_finished" and message.script_finished == finished:
+                return
+
+    def _learn(self, element):
+        element_type = element.WhichOneof("type")
+        if element_type == "exception":
+            self.failures.append(element.exception.message)
+            return
+        widget = getattr(element, element_type)
+        widget_id = getattr(widget, "id", "")
+        if widget_id:
+            # Widget ids end with the user key when one is given
+            self.widgets[widget_id.rsplit("-", 1)[-1] if "-" in widget_id else widget_id] = widget_id
+            self.widgets[getattr(widget, "label", "")] = widget_id
+
+    async def type_and_click(self, field, text, button):
+        self.values[self.widgets[field]] = text
+        return await self.rerun(trigger=button)
+
+    async def upload_and_run(self, name, data):
+        """Upload a CSV through the file uploader, then queue its batch job. Returns: Seconds for both."""
+        BackMsg_pb2, Common_pb2, _, _ = _proto()
+        start = time.perf_counter()
+        request = BackMsg_pb2.BackMsg()
+        request.file_urls_request.request_id = uuid.uuid4().hex
+        request.file_urls_request.file_names.append(name)
+        request.file_urls_request.session_id = self.session_id
+        self.file_urls = None
+        await self._send(request)
+        while self.file_urls is None:
+            payload = await self.ws.read_message()
+            message = _proto()[2].ForwardMsg.FromString(payload)
+            if message.WhichOneof("type") == "file_urls_response":
+                self.file_urls = message.file_urls_response
+        urls = self.file_urls.file_urls[0]
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{name}\"\r\n"
+                f"Content-Type: text/csv\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        upload_url = urls.upload_url if urls.upload_url.startswith("http") else self.server.url + urls.upload_url
+        await AsyncHTTPClient().fetch(HTTPRequest(upload_url, method="PUT", body=body,
+                                                  headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}))
+        state = Common_pb2.FileUploaderState(max_file_id=0)
+        state.uploaded_file_info.add(file_id=urls.file_id, name=name, size=len(data), file_urls=urls)
+        uploader = self.widgets["Choose a CSV or Parquet file"]
+        self.values[uploader] = state
+        # The Run button only appears once the file is there
+        await self.rerun()
+        await self.rerun(trigger="analyze_batch")
+        del self.values[uploader]
+        return time.perf_counter() - start
+
+    async def close(self):
+        self.ws.close()
+
+
+async def run_session(session, seed, interactions, weights, texts, batch_rows, latencies):
+    rng = random.Random(seed)
+    for kind in rng.choices(INTERACTIONS, weights, k=interactions):
+        if kind == "chat":
+            seconds = await session.type_and_click("Your Message", rng.choice(CHAT_MESSAGES), "send_chat")
+        elif kind == "analyze":
+            seconds = await session.type_and_click("Input Text", rng.choice(texts), "analyze_single")
+        else:
+            frame = pd.DataFrame({"id": range(batch_rows), "text": rng.sample(texts, batch_rows)})
+            seconds = await session.upload_and_run("reviews.csv", frame.to_csv(index=False).encode())
+        latencies.append((kind, seconds))
+
+
+async def run_level(server, sessions, interactions, weights, texts, batch_rows, seed):
+    """Returns: (latencies as (kind, seconds), failures, wall seconds, initial load seconds)."""
+    clients = [Session(server) for _ in range(sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.connect() for client in clients))
+    connect = time.perf_counter() - start
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(client, seed * 1000 + i, interactions, weights, texts, batch_rows, latencies)
+                           for i, client in enumerate(clients)))
+    wall = time.perf_counter() - start
+    failures = [failure for client in clients for failure in client.failures]
+    for client in clients:
+        await client.close()
+    return latencies, failures, wall, connect
+
+
+async def main(args):
+    texts = review_corpus(5000, seed=args.seed)
+    server = AppServer()
+    try:
+        await server.wait_ready()
+        # A first visitor loads the models and fills the process-wide caches
+        warm = Session(server)
+        await warm.connect()
+        await warm.close()
+        baseline_rss, baseline_anon = server_memory(server.process.pid)
+        print(f"Server RSS after warm-up: {baseline_rss:.0f} MB ({baseline_anon:.0f} MB anonymous)")
+        print(f"{'sessions':>8} {'interaction':>11} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'per s':>7} {'RSS MB':>7} {'growth':>7}")
+        for sessions in args.sessions:
+            latencies, failures, wall, connect = await run_level(server, sessions, args.interactions, args.mix,
+                                                                 texts, args.batch_rows, args.seed)
+            rss, _ = server_memory(server.process.pid)
+            rows = [("connect", [connect])] + [(kind, [s for k, s in latencies if k == kind]) for kind in INTERACTIONS]
+            rows.append(("all", [s for _, s in latencies]))
+            for kind, seconds in rows:
+                if not seconds:
+                    continue
+                p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+                rate = f"{len(seconds) / wall:7.1f}" if kind != "connect" else f"{'':>7}"
+                print(f"{sessions:>8} {kind:>11} {len(seconds):>6} {p50:8.0f} {p95:8.0f} {p99:8.0f} "
+                      f"{rate} {rss:7.0f} {rss - baseline_rss:+7.0f}")
+            for message in failures[:3]:
+                print(f"  FAILED: {message}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive one app.py server with many concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="concurrency levels")
+    parser.add_argument("--interactions", type=int, default=20, help="interactions per session")
+    parser.add_argument("--mix", type=float, nargs=3, default=[0.5, 0.4, 0.1], metavar=("CHAT", "ANALYZE", "BATCH"),
+                        help="relative weights of chat messages, single analyses and batch uploads")
+    parser.add_argument("--batch-rows", type=int, default=200, help="rows per simulated batch upload")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Offline CPU benchmark suite with regression thresholds.
+#
+# Runs on reproducible synthetic review corpora and measures single-text
+# sentiment latency, Batch Analysis throughput (score_file_stream, which
+# the Streamlit tab drives, with a no-op progress callback standing in for
+# the UI), MovieChatbot.get_response latency and startup time. Results are
+# written as JSON. With a baseline file the run exits with status 1 when a
+# metric is worse than its baseline by more than the metric's tolerance.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# name: (higher is better, tolerated relative regression)
+METRICS = {
+    "analyze_vader_p50_ms": (False, 0.5),
+    "analyze_vader_p95_ms": (False, 0.5),
+    "analyze_cached_p50_ms": (False, 0.5),
+    "analyze_transformer_p50_ms": (False, 0.5),
+    "batch_rows_per_s": (True, 0.3),
+    "chatbot_p50_ms": (False, 0.5),
+    "chatbot_p95_ms": (False, 0.5),
+    "startup_app_imports_s": (False, 0.5),
+    "startup_vader_first_response_s": (False, 0.5),
+    "startup_chatbot_first_response_s": (False, 0.5),
+}
+
+
+def percentiles(latencies):
+    latencies = np.asarray(latencies) * 1000
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def time_each(function, inputs):
+    latencies = []
+    for value in inputs:
+        start = time.perf_counter()
+        function(value)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_analyze(texts, tmp, transformer=False):
+    """Single-text latency of the app's analyze path, uncached and cached."""
+    from sentiment_backends import make_backend
+    from sentiment_cache import SentimentCache
+
+    results = {}
+    backend = make_backend("vader")
+    backend.analyze(texts[0])  # warm up
+    results["analyze_vader_p50_ms"], results["analyze_vader_p95_ms"] = percentiles(time_each(backend.analyze, texts))
+
+    cache = SentimentCache(backend.name, backend.revision, path=os.path.join(tmp, "cache.sqlite"))
+    for text in texts:
+        cache.get_or_compute(text, backend.analyze)
+    cached = time_each(lambda text: cache.get_or_compute(text, backend.analyze), texts)
+    results["analyze_cached_p50_ms"] = percentiles(cached)[0]
+
+    if transformer:
+        import torch
+        from tiny_models import save_tiny_classifier
+
+        torch.set_num_threads(1)
+        os.environ["SENTIMENT_MODEL"] = save_tiny_classifier(os.path.join(tmp, "classifier"), dim=256, layers=4)
+        backend = make_backend("transformer")
+        backend.analyze(texts[0])
+        results["analyze_transformer_p50_ms"] = percentiles(time_each(backend.analyze, texts[:200]))[0]
+    return results
+
+
+def bench_batch(texts, tmp):
+    """Rows per second through the Batch Analysis flow, with the UI stubbed out."""
+    from streaming_batch import score_file_stream
+    from synthetic_data import write_reviews_csv
+
+    source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), texts)
+    start = time.perf_counter()
+    result = score_file_stream(source, os.path.join(tmp, "scored.csv"), chunk_size=5000,
+                               progress=lambda rows: None, use_cache=False)
+    elapsed = time.perf_counter() - start
+    assert result["rows"] == len(texts)
+    return {"batch_rows_per_s": len(texts) / elapsed}
+
+
+def bench_chatbot(count, seed):
+    import random
+
+    from movie_chatbot import MovieChatbot
+    from synthetic_data import review_corpus
+
+    chatbot = MovieChatbot()
+    rng = random.Random(seed)
+    prompts = ["Can you recommend a good {}?", "What is the best {} film?", "Hello there!",
+               "Do you like Christopher Nolan as a director?", "{}", "I think Tom Hanks is a great actor",
+               "Thanks, bye!"]
+    messages = [rng.choice(prompts).format(text) for text in review_corpus(count, "uniform", 8, seed)]
+    chatbot.get_response(messages[0])
+    p50, p95 = percentiles(time_each(chatbot.get_response, messages))
+    return {"chatbot_p50_ms": p50, "chatbot_p95_ms": p95}
+
+
+def bench_startup():
+    from startup_profile import APP_IMPORTS, first_response_time, import_time
+
+    vader = first_response_time("vader")
+    chatbot = first_response_time("chatbot")
+    return {
+        "startup_app_imports_s": import_time(APP_IMPORTS),
+        "startup_vader_first_response_s": vader["load"] + vader["first_call"],
+        "startup_chatbot_first_response_s": chatbot["load"] + chatbot["first_call"],
+    }
+
+
+def compare(results, baseline):
+    """Returns: List of (metric, baseline value, current value, limit) for regressions."""
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline or name not in METRICS:
+            continue
+        higher_is_better, tolerance = METRICS[name]
+        reference = baseline[name]
+        limit = reference * (1 - tolerance) if higher_is_better else reference * (1 + tolerance)
+        if (value < limit) if higher_is_better else (value > limit):
+            regressions.append((name, reference, value, limit))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with regression thresholds.")
+    parser.add_argument("--size", type=int, default=20000, help="reviews in the batch corpus")
+    parser.add_argument("--length", choices=["fixed", "uniform", "lognormal"], default="lognormal",
+                        help="distribution of words per review")
+    parser.add_argument("--mean-words", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--transformer", action="store_true", help="also time a tiny local transformer")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to check against")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    from synthetic_data import review_corpus
+
+    texts = review_corpus(args.size, args.length, args.mean_words, args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results.update(bench_analyze(texts[:2000], tmp, args.transformer))
+        results.update(bench_batch(texts, tmp))
+    results.update(bench_chatbot(2000, args.seed))
+    results.update(bench_startup())
+
+    report = {
+        "corpus": {"size": args.size, "length": args.length, "mean_words": args.mean_words, "seed": args.seed},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "metrics": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["corpus"] != report["corpus"]:
+            print("Baseline was recorded on a different corpus; not comparing.", file=sys.stderr)
+            sys.exit()
+        regressions = compare(results, baseline["metrics"])
+        for name, reference, value, limit in regressions:
+            print(f"REGRESSION {name}: {value:.4g} (baseline {reference:.4g}, limit {limit:.4g})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
@@ -0,0 +1,34 @@
+import random
+import time
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from vader_batch import analyze_sentiment_batch
+
+# Compare row-by-row polarity_scores with the vectorized batch scorer
+analyzer = SentimentIntensityAnalyzer()
+words = list(analyzer.lexicon)[:2000] + "the movie was not very good but the acting is really GREAT".split() * 50
+random.seed(0)
+texts = [" ".join(random.choices(words, k=random.randint(5, 80))) + random.choice([".", "!", "?!"]) for _ in range(20000)]
+
+start = time.perf_counter()
+expected = [analyzer.polarity_scores(text)["compound"] for text in texts]
+loop_time = time.perf_counter() - start
+
+analyze_sentiment_batch(texts[:10], analyzer)  # warm up
+start = time.perf_counter()
+labels, scores = analyze_sentiment_batch(texts, analyzer)
+batch_time = time.perf_counter() - start
+
+mismatches = 0
+for compound, label, score in zip(expected, labels, scores):
+    if compound >= 0.05:
+        mismatches += label != "POSITIVE" or score != (compound + 1) / 2
+    elif compound <= -0.05:
+        mismatches += label != "NEGATIVE" or score != (1 - compound) / 2
+    else:
+        mismatches += label != "NEUTRAL" or score != 0.5
+
+print(f"Texts: {len(texts)}")
+print(f"polarity_scores loop: {loop_time:.2f}s ({len(texts) / loop_time:.0f} texts/s)")
+print(f"analyze_sentiment_batch: {batch_time:.2f}s ({len(texts) / batch_time:.0f} texts/s)")
+print(f"Speedup: {loop_time / batch_time:.1f}x, mismatches: {mismatches}")
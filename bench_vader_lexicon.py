@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from vader_lexicon import compile_lexicon
+
+# Startup cost of NLTK's SentimentIntensityAnalyzer, which parses the text
+# lexicon, against MappedSentimentIntensityAnalyzer on a compiled file.
+#
+# Each variant runs in fresh interpreters with the modules already
+# imported, so only construction is timed. Memory is the growth of the
+# process during construction, from /proc/self/smaps_rollup: anonymous
+# memory is private to the process, while the compiled file's pages are a
+# file mapping that every process on the host shares. Both variants must
+# score the same texts identically, one text at a time and in batch.
+
+CHILD = """
+import json, sys, time
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from synthetic_data import review_corpus
+from vader_batch import BatchSentimentScorer
+from vader_lexicon import MappedSentimentIntensityAnalyzer
+
+def memory():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return fields
+
+texts = review_corpus(int(sys.argv[2]), seed=0)
+before = memory()
+start = time.perf_counter()
+analyzer = SentimentIntensityAnalyzer() if sys.argv[1] == "stock" else MappedSentimentIntensityAnalyzer(sys.argv[1])
+seconds = time.perf_counter() - start
+after = memory()
+start = time.perf_counter()
+single = [analyzer.polarity_scores(text)["compound"] for text in texts]
+single_seconds = time.perf_counter() - start
+scorer = BatchSentimentScorer(analyzer)
+start = time.perf_counter()
+batch = scorer.polarity_compound(texts).tolist()
+batch_seconds = time.perf_counter() - start
+print(json.dumps({"construct": seconds, "rss": after["Rss"] - before["Rss"],
+                  "anonymous": after["Anonymous"] - before["Anonymous"],
+                  "single": single_seconds, "batch": batch_seconds, "scores": single, "batch_scores": batch}))
+"""
+
+
+def run(variant, texts):
+    output = subprocess.run([sys.executable, "-c", CHILD, variant, str(texts)], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(output.stdout)
+
+
+def median(runs, key):
+    values = sorted(run[key] for run in runs)
+    return values[len(values) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construction time and memory: text vs compiled VADER lexicon.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per variant")
+    parser.add_argument("--texts", type=int, default=2000, help="texts scored to check parity")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vader.lexicon")
+        compile_lexicon(path)
+        print(f"Compiled lexicon: {os.path.getsize(path) / 1024:.0f} KB")
+        print(f"{'analyzer':>8} {'construct ms':>12} {'RSS KB':>8} {'anon KB':>8} {'single ms':>10} {'batch ms':>9}")
+        results = {}
+        for name, variant in (("stock", "stock"), ("mapped", path)):
+            runs = [run(variant, args.texts) for _ in range(args.runs)]
+            results[name] = runs[0]
+            print(f"{name:>8} {median(runs, 'construct') * 1000:12.2f} {median(runs, 'rss') / 1024:8.0f} "
+                  f"{median(runs, 'anonymous') / 1024:8.0f} {median(runs, 'single') * 1000:10.0f} "
+                  f"{median(runs, 'batch') * 1000:9.0f}")
+    stock, mapped = results["stock"], results["mapped"]
+    assert stock["scores"] == mapped["scores"] and stock["batch_scores"] == mapped["batch_scores"], "scores differ"
+    assert stock["scores"] == stock["batch_scores"], "batch scores differ from polarity_scores"
+    print(f"Scores identical for {args.texts} texts.")
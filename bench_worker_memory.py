@@ -0,0 +1,109 @@
+import argparse
+import os
+import tempfile
+from multiprocessing import Manager
+
+import numpy as np
+
+from parallel_batch import score_shard, worker_pool
+from synthetic_data import review_corpus
+
+# Host memory of N transformer batch workers started with spawn (every
+# worker imports torch and loads the model itself) versus forkserver
+# (workers are forked from a server that imported the scoring stack once).
+#
+# Memory is read from /proc/<pid>/smaps_rollup once every worker has
+# loaded its model, and includes the fork server. RSS counts a shared page
+# in every process mapping it, so the RSS sum overstates what the host
+# spends; PSS splits each shared page between the processes sharing it and
+# sums to the real total. Anonymous is heap and copy-on-write memory (it
+# excludes the memory-mapped weights). Every run must produce the same
+# labels and scores.
+
+
+def memory(pid):
+    """Returns: {"rss", "pss", "anonymous"} of a process, in bytes."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "anonymous": fields["Anonymous"]}
+
+
+def weights_file_mapped():
+    """Returns: Fraction of the transformer's weight bytes that live in a file mapping (this process)."""
+    from sentiment_analyzer import get_classifier
+
+    regions = []
+    with open("/proc/self/maps") as f:
+        for line in f:
+            parts = line.split()
+            start, stop = (int(address, 16) for address in parts[0].split("-"))
+            regions.append((start, stop, len(parts) > 5 and parts[5].startswith("/")))
+    mapped = total = 0
+    for tensor in get_classifier().model.state_dict().values():
+        size = tensor.numel() * tensor.element_size()
+        total += size
+        mapped += size * any(start <= tensor.data_ptr() < stop and is_file for start, stop, is_file in regions)
+    return mapped / total
+
+
+def _wait_for_all(barrier):
+    # Every worker has to take one of these, so all of them have started
+    barrier.wait()
+    return os.getpid(), weights_file_mapped()
+
+
+def run_workers(start_method, workers, texts):
+    """Returns: (summed worker memory, fraction of weights file-mapped, (codes, scores))."""
+    with Manager() as manager, worker_pool("transformer", workers, use_cache=False,
+                                           start_method=start_method) as pool:
+        barrier = manager.Barrier(workers)
+        started = [future.result() for future in [pool.submit(_wait_for_all, barrier) for _ in range(workers)]]
+        pids = [pid for pid, _ in started]
+        if start_method == "forkserver":
+            # The fork server holds the preloaded pages too; count its share
+            from multiprocessing import forkserver
+
+            pids.append(forkserver._forkserver._forkserver_pid)
+        total = {"rss": 0, "pss": 0, "anonymous": 0}
+        for pid in pids:
+            for key, value in memory(pid).items():
+                total[key] += value
+        size = -(-len(texts) // workers)
+        shards = [pool.submit(score_shard, start, texts[start:start + size]) for start in range(0, len(texts), size)]
+        shards = [future.result() for future in shards]
+    codes = np.concatenate([shard[1] for shard in shards])
+    scores = np.concatenate([shard[2] for shard in shards])
+    return total, min(mapped for _, mapped in started), (codes, scores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of transformer batch workers: spawn vs forkserver.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--model", help="model name or directory (default: a DistilBERT-sized random model)")
+    args = parser.parse_args()
+
+    texts = review_corpus(args.texts, seed=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.model:
+            os.environ["SENTIMENT_MODEL"] = args.model
+        else:
+            from tiny_models import save_tiny_classifier
+
+            os.environ["SENTIMENT_MODEL"] = save_tiny_classifier(os.path.join(tmp, "model"), dim=768, layers=6,
+                                                                 max_length=512)
+        reference = None
+        print(f"{'start':>10} {'workers':>7} {'RSS sum MB':>11} {'PSS sum MB':>11} {'anon MB':>8} {'weights mmap':>12}",
+              flush=True)
+        for workers in args.workers:
+            for start_method in ("spawn", "forkserver"):
+                total, mapped, (codes, scores) = run_workers(start_method, workers, texts)
+                reference = reference or (codes, scores)
+                assert np.array_equal(codes, reference[0]) and np.array_equal(scores, reference[1]), "outputs differ"
+                print(f"{start_method:>10} {workers:>7} {total['rss'] / 2**20:11.0f} {total['pss'] / 2**20:11.0f} "
+                      f"{total['anonymous'] / 2**20:8.0f} {mapped:12.0%}", flush=True)
+        print("Outputs identical across all runs.")
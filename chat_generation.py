@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from instrumentation import record
+
+# Generative chat backend for the Movie Chat tab (DialoGPT-style causal LM)
+
+DEFAULT_CHAT_MODEL = "microsoft/DialoGPT-small"
+
+# Reply length cap, in tokens
+MAX_NEW_TOKENS = 64
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def load_chat_model(name=None):
+    """
+    Load a causal LM and its tokenizer ONCE per process.
+    CHAT_MODEL selects another model (e.g. a local directory).
+    Returns: (tokenizer, model) with the model in eval mode.
+    """
+    name = name or os.environ.get("CHAT_MODEL", DEFAULT_CHAT_MODEL)
+    if name not in _models:
+        with _model_lock:
+            if name not in _models:
+                from transformers import AutoModelForCausalLM, AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(name)
+                model = AutoModelForCausalLM.from_pretrained(name).eval()
+                _models[name] = (tokenizer, model)
+    return _models[name]
+
+
+class ChatSession:
+    """
+    One conversation: its token history and the model's past key/values.
+
+    token_ids holds every turn still in context, each ending with EOS.
+    The first `cached` of them are already in the key/value cache, so the
+    next turn only runs the model over the tokens after them.
+    """
+
+    def __init__(self):
+        self.token_ids = []
+        self.cache = None
+        self.cached = 0
+        self.last_stats = None
+
+    def reset(self):
+        self.__init__()
+
+
+class GenerativeChatbot:
+    """
+    Streams replies from a causal LM, keeping per-session state.
+
+    Each turn feeds only the new tokens (the previous reply's EOS and the
+    user's message) through the model on top of the session's key/value
+    cache, then decodes greedily (or by sampling when temperature > 0)
+    one token at a time, yielding text as soon as it is produced. Replies
+    stop at EOS or max_new_tokens. When the history would no longer fit
+    history_tokens, the oldest whole turns are dropped down to half the
+    budget and the cache is rebuilt once, so trimming is rare.
+    """
+
+    def __init__(self, tokenizer=None, model=None, max_new_tokens=MAX_NEW_TOKENS,
+                 history_tokens=None, temperature=0.0, top_k=50):
+        if model is None:
+            tokenizer, model = load_chat_model()
+        self.tokenizer = tokenizer
+        self.model = model
+        self.eos_token_id = tokenizer.eos_token_id
+        context = getattr(model.config, "n_positions", None) or model.config.max_position_embeddings
+        self.max_new_tokens = min(max_new_tokens, context // 2)
+        self.history_tokens = min(history_tokens or context, context) - self.max_new_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+
+    def new_session(self):
+        return ChatSession()
+
+    def _trim(self, session, new_ids):
+        """Drop the oldest turns so history plus new_ids fits the budget."""
+        if len(session.token_ids) + len(new_ids) <= self.history_tokens:
+            return new_ids
+        # A message longer than half the budget keeps only its end
+        new_ids = new_ids[-(self.history_tokens // 2):] if len(new_ids) > self.history_tokens // 2 else new_ids
+        history = session.token_ids
+        keep = self.history_tokens // 2 - len(new_ids)
+        start = len(history)
+        ends = [i + 1 for i, token in enumerate(history) if token == self.eos_token_id]
+        for end in ends:
+            if len(history) - end <= keep:
+                start = end
+                break
+        session.token_ids = history[start:]
+        # Absolute positions shift, so the cache has to be rebuilt
+        session.cache, session.cached = None, 0
+        return new_ids
+
+    def _next_token(self, logits):
+        import torch
+
+        if self.temperature <= 0:
+            return int(logits.argmax())
+        logits = logits / self.temperature
+        if self.top_k:
+            threshold = torch.topk(logits, min(self.top_k, logits.shape[-1])).values[-1]
+            logits = logits.masked_fill(logits < threshold, float("-inf"))
+        return int(torch.multinomial(torch.softmax(logits, dim=-1), 1))
+
+    def stream_response(self, session, user_input):
+        """
+        Generate a reply to user_input, yielding text pieces as they are
+        produced. Afterwards session.last_stats holds prompt_tokens (run
+        through the model this turn), cached_tokens (reused), new_tokens,
+        ttft_s (time to first token) and tokens_per_s (decode speed).
+        """
+        import torch
+
+        start = time.perf_counter()
+        new_ids = self._trim(session, self.tokenizer.encode(user_input + self.tokenizer.eos_token))
+        session.token_ids = session.token_ids + new_ids
+        pending = session.token_ids[session.cached:]
+        cache = session.cache
+        stats = {"prompt_tokens": len(pending), "cached_tokens": session.cached, "new_tokens": 0}
+
+        reply_ids, text, first_token, steps = [], "", None, 0
+        try:
+            with torch.inference_mode():
+                inputs = torch.tensor([pending])
+                for _ in range(self.max_new_tokens):
+                    output = self.model(input_ids=inputs, past_key_values=cache, use_cache=True)
+                    cache = output.past_key_values
+                    session.cached += inputs.shape[1]
+                    steps += 1
+                    token = self._next_token(output.logits[0, -1])
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        stats["ttft_s"] = first_token - start
+                    if token == self.eos_token_id:
+                        break
+                    reply_ids.append(token)
+                    # Decode the whole reply so multi-token characters come out whole
+                    decoded = self.tokenizer.decode(reply_ids, skip_special_tokens=True)
+                    if len(decoded) > len(text) and not decoded.endswith("\ufffd"):
+                        yield decoded[len(text):]
+                        text = decoded
+                    inputs = torch.tensor([[token]])
+        finally:
+            # Also runs when the caller stops reading early. The closing EOS
+            # (and the last reply token, if capped) feed into the next turn.
+            session.token_ids += reply_ids + [self.eos_token_id]
+            session.cache = cache
+            end = time.perf_counter()
+            stats["new_tokens"] = len(reply_ids)
+            # Decode speed: tokens produced after the first one
+            stats["tokens_per_s"] = (steps - 1) / (end - first_token) if steps > 1 else 0.0
+            session.last_stats = stats
+            record("chat_generate", end - start)
+            if first_token is not None:
+                record("chat_first_token", stats["ttft_s"])
+
+    def get_response(self, user_input, session=None):
+        """Returns: The whole reply; without a session, as a fresh conversation."""
+        return "".join(self.stream_response(session or self.new_session(), user_input))
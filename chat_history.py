@@ -0,0 +1,119 @@
+import html
+import json
+import tempfile
+from array import array
+from collections import deque
+
+# Chat bubble styles, injected once per page run
+CHAT_CSS = """
+<style>
+.chat-container {
+    margin-bottom: 30px;
+    max-width: 100%;
+}
+.user-message {
+    background-color: #2b5797;
+    color: white;
+    padding: 15px;
+    border-radius: 15px;
+    margin-bottom: 10px;
+    font-size: 18px;
+    font-weight: 500;
+}
+.bot-message {
+    background-color: #0078d4;
+    color: white;
+    padding: 15px;
+    border-radius: 15px;
+    margin-bottom: 20px;
+    font-size: 18px;
+    font-weight: 500;
+}
+</style>
+"""
+
+
+class HistoryBuffer:
+    """
+    Bounded per-session history.
+
+    The newest maxlen entries live in a ring buffer (a deque with maxlen),
+    so appends are O(1) and memory stays bounded. With spill=True, entries
+    pushed out of the ring are appended as JSON lines to an anonymous
+    temporary file and stay readable page by page; without it they are
+    dropped. Entry 0 is the oldest entry still retained.
+    """
+
+    def __init__(self, maxlen=200, spill=False, spill_dir=None):
+        self.maxlen = maxlen
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self._recent = deque(maxlen=maxlen)
+        self._file = None
+        self._offsets = array("q")
+
+    def __len__(self):
+        return len(self._offsets) + len(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, entry):
+        if self.spill and len(self._recent) == self.maxlen:
+            self._spill(self._recent[0])
+        self._recent.append(entry)
+
+    def _spill(self, entry):
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(prefix="chat_history_", suffix=".jsonl", dir=self.spill_dir)
+        self._file.seek(0, 2)
+        self._offsets.append(self._file.tell())
+        self._file.write(json.dumps(entry).encode() + b"\n")
+
+    def _read_spilled(self, start, stop):
+        self._file.seek(self._offsets[start])
+        return [json.loads(self._file.readline()) for _ in range(start, stop)]
+
+    def entries(self, start, stop):
+        """Returns: Entries start to stop (oldest first), read from disk where spilled."""
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return []
+        spilled = len(self._offsets)
+        older = self._read_spilled(start, min(stop, spilled)) if start < spilled else []
+        first, last = max(start - spilled, 0), max(stop - spilled, 0)
+        # Deque indexing is fast near the ends, and windows sit at the newest end
+        return older + [self._recent[i] for i in range(first, last)]
+
+    def recent(self, count=None):
+        """Returns: The newest count entries (all in memory), oldest first."""
+        count = len(self._recent) if count is None else min(count, len(self._recent))
+        return [self._recent[i] for i in range(len(self._recent) - count, len(self._recent))]
+
+    def page(self, number, size):
+        """
+        Page number of the history, counting back from the newest (0).
+        Returns: (entries oldest first, index of the first entry).
+        """
+        stop = len(self) - number * size
+        start = max(stop - size, 0)
+        return self.entries(start, stop), start
+
+    def pages(self, size):
+        return max(-(-len(self) // size), 1)
+
+    def clear(self):
+        self._recent.clear()
+        self._offsets = array("q")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def chat_html(entries):
+    """One HTML block of chat bubbles, with message text escaped."""
+    bubbles = []
+    for entry in entries:
+        bubbles.append(f'<div class="user-message"><strong>You:</strong> {html.escape(entry["user"])}</div>')
+        bubbles.append(f'<div class="bot-message"><strong>Movie Bot:</strong> {html.escape(entry["bot"])}</div>')
+    return f'<div class="chat-container">{"".join(bubbles)}</div>'
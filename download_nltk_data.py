@@ -3,3 +3,9 @@ import nltk
 # Download necessary NLTK data
 nltk.download('vader_lexicon')
 print("NLTK data downloaded successfully!")
+
+# Compile the lexicon so the app memory-maps it instead of parsing the text file
+from vader_lexicon import VADER_LEXICON_PATH, compile_lexicon
+
+compile_lexicon(VADER_LEXICON_PATH)
+print(f"Compiled VADER lexicon written to {VADER_LEXICON_PATH}")
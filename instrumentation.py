@@ -0,0 +1,214 @@
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Lightweight stage timers and counters.
+#
+# stage("name") times a block into a process-wide latency histogram and,
+# when a session log is active in the current context, into that session's
+# recent timings too. Histograms and counters render in Prometheus text
+# format. METRICS_ENABLED=0 turns everything into a shared no-op context
+# manager; METRICS_JSON_LOG=1 also logs one JSON line per timed stage.
+
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+JSON_LOG = os.environ.get("METRICS_JSON_LOG", "0") == "1"
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float("inf"))
+
+logger = logging.getLogger("sentiment_app.metrics")
+_NOOP = nullcontext()
+_session_log = contextvars.ContextVar("session_log", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns: Upper bound of the bucket holding the q-quantile."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return float("nan")
+
+
+class Registry:
+    """Process-wide stage histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, stage_name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage_name)
+            if histogram is None:
+                histogram = self.histograms[stage_name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """
+        Returns: {stage: {"calls", "mean_ms", "p50_ms", "p95_ms"}}; the
+        percentiles are the upper bounds of the histogram buckets holding them.
+        """
+        with self._lock:
+            return {
+                stage_name: {
+                    "calls": h.count,
+                    "mean_ms": h.sum / h.count * 1000,
+                    "p50_ms": h.quantile(0.5) * 1000,
+                    "p95_ms": h.quantile(0.95) * 1000,
+                }
+                for stage_name, h in sorted(self.histograms.items())
+            }
+
+    def prometheus(self):
+        """Returns: All metrics in Prometheus text exposition format."""
+        lines = ["# HELP app_stage_seconds Latency of instrumented stages.",
+                 "# TYPE app_stage_seconds histogram"]
+        with self._lock:
+            for stage_name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'app_stage_seconds_bucket{{stage="{stage_name}",le="{le}"}} {cumulative}')
+                lines.append(f'app_stage_seconds_sum{{stage="{stage_name}"}} {histogram.sum!r}')
+                lines.append(f'app_stage_seconds_count{{stage="{stage_name}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE app_{name} counter")
+                lines.append(f"app_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class SessionLog:
+    """A session's most recent stage timings, for the debug panel."""
+
+    def __init__(self, maxlen=200):
+        self.entries = deque(maxlen=maxlen)
+
+    def add(self, stage_name, seconds):
+        self.entries.append((time.time(), stage_name, seconds))
+
+    def summary(self):
+        """Returns: {stage: {"calls", "last_ms", "total_ms"}} over the retained timings."""
+        summary = {}
+        for _, stage_name, seconds in self.entries:
+            row = summary.setdefault(stage_name, {"calls": 0, "last_ms": 0.0, "total_ms": 0.0})
+            row["calls"] += 1
+            row["last_ms"] = seconds * 1000
+            row["total_ms"] += seconds * 1000
+        return summary
+
+
+def use_session_log(log):
+    """Record stage timings of the current context (e.g. one Streamlit session) into log."""
+    _session_log.set(log)
+
+
+def record(stage_name, seconds):
+    """Record a duration measured elsewhere (e.g. across a generator's lifetime)."""
+    if not ENABLED:
+        return
+    REGISTRY.observe(stage_name, seconds)
+    log = _session_log.get()
+    if log is not None:
+        log.add(stage_name, seconds)
+    if JSON_LOG:
+        logger.info(json.dumps({"event": "stage", "stage": stage_name, "seconds": seconds, "ts": time.time()}))
+
+
+@contextmanager
+def _timed(stage_name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - start)
+
+
+def stage(stage_name):
+    """Context manager timing a block as stage_name (a no-op when disabled)."""
+    return _timed(stage_name) if ENABLED else _NOOP
+
+
+def timed(stage_name):
+    """Decorator form of stage()."""
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with _timed(stage_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def count(name, amount=1):
+    """Add amount to the counter name (a no-op when disabled)."""
+    if ENABLED:
+        REGISTRY.count(name, amount)
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """
+    Serve REGISTRY.prometheus() at http://host:port/metrics from a daemon
+    thread. Returns: The server (call shutdown() to stop it).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
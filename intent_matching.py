@@ -0,0 +1,133 @@
+import re
+from array import array
+
+# Code points above this never occur, so state * _ALPHABET + ord(char) is a
+# unique key for every (state, character) transition
+_ALPHABET = 0x110000
+
+
+def _strip_inline_flags(pattern):
+    return re.sub(r"^\(\?i\)", "", pattern)
+
+
+class IntentMatcher:
+    """
+    All intent patterns compiled into one regular expression.
+
+    Each intent becomes a named group inside one lookahead alternation,
+    ordered by precedence, so a single scan over the text finds every
+    position where some intent matches. At each position the alternation
+    reports the highest-precedence intent matching there, which means the
+    highest-precedence intent anywhere in the text is always found.
+    """
+
+    def __init__(self, patterns, order):
+        self.order = list(order)
+        # Inline (?i) flags can only lead a whole pattern, so apply it globally
+        alternatives = "|".join(
+            f"(?P<{intent}>{_strip_inline_flags(patterns[intent])})" for intent in self.order
+        )
+        self.regex = re.compile(f"(?=(?:{alternatives}))", re.IGNORECASE)
+        self._rank = {intent: rank for rank, intent in enumerate(self.order)}
+
+    def intents(self, text):
+        """Returns: Intents found in text, in precedence order."""
+        found = {match.lastgroup for match in self.regex.finditer(text)}
+        return sorted(found, key=self._rank.__getitem__)
+
+    def match(self, text):
+        """Returns: The highest-precedence intent in text, or None."""
+        best = None
+        for match in self.regex.finditer(text):
+            rank = self._rank[match.lastgroup]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return None if best is None else self.order[best]
+
+
+class EntityAutomaton:
+    """
+    Aho-Corasick automaton over lowercased entity names.
+
+    Finds every name occurring as a substring of a text in one pass over
+    the text, so the cost per message depends on the message length and
+    the number of hits, not on how many names are loaded. Transitions
+    live in one flat dict of integer keys and the failure and output
+    links in arrays, which keeps large name lists compact.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self._goto = {}
+        fail = array("i", [0])
+        # Lowest name index ending at each state (-1 for none)
+        output = array("i", [-1])
+        children = [[]]
+
+        for index, name in enumerate(self.names):
+            if not name:
+                continue
+            state = 0
+            for char in name.lower():
+                key = state * _ALPHABET + ord(char)
+                next_state = self._goto.get(key)
+                if next_state is None:
+                    next_state = len(fail)
+                    self._goto[key] = next_state
+                    fail.append(0)
+                    output.append(-1)
+                    children[state].append((ord(char), next_state))
+                    children.append([])
+                state = next_state
+            if output[state] < 0:
+                output[state] = index
+
+        # Breadth-first order guarantees a state's failure target is done first
+        goto = self._goto
+        # Nearest state down the failure chain that ends a name (0 for none)
+        link = array("i", bytes(4 * len(fail)))
+        queue = [child for _, child in children[0]]
+        for state in queue:
+            for code, child in children[state]:
+                target = fail[state]
+                while True:
+                    next_state = goto.get(target * _ALPHABET + code)
+                    if next_state is not None or target == 0:
+                        break
+                    target = fail[target]
+                fail[child] = next_state or 0
+                link[child] = fail[child] if output[fail[child]] >= 0 else link[fail[child]]
+                queue.append(child)
+
+        self._fail = fail
+        self._output = output
+        self._link = link
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, text):
+        """Returns: Indexes into names of every name occurring in text."""
+        goto, fail, output, link = self._goto, self._fail, self._output, self._link
+        found = set()
+        state = 0
+        for char in text.lower():
+            code = ord(char)
+            while True:
+                next_state = goto.get(state * _ALPHABET + code)
+                if next_state is not None or state == 0:
+                    break
+                state = fail[state]
+            state = next_state or 0
+            hit = state if output[state] >= 0 else link[state]
+            while hit:
+                found.add(output[hit])
+                hit = link[hit]
+        return found
+
+    def first(self, text):
+        """Returns: The earliest-listed name occurring in text, or None."""
+        found = self.find(text)
+        return self.names[min(found)] if found else None
@@ -0,0 +1,72 @@
+import torch
+
+from micro_batching import activation, pad_token_ids
+
+
+def score_long_documents(classifier, texts, stride=None, batch_size=32):
+    """
+    Score documents longer than the model's context with sliding windows.
+
+    All texts are tokenized in one call that also cuts them into
+    overlapping windows of the model's real maximum length (stride tokens
+    of overlap). Windows from every document are sorted by length and run
+    through the model together in batches of batch_size. Each document's
+    window logits are averaged, weighted by window length, and turned into
+    one label and score.
+    Returns: List of dictionaries with label, score and the window count.
+    Raises: ValueError unless 0 <= stride < the window's room for text tokens.
+    """
+    probabilities, windows = document_probabilities(classifier.tokenizer, classifier.model, texts, stride, batch_size)
+    scores, label_ids = probabilities.max(dim=-1)
+    return [
+        {"label": classifier.model.config.id2label[label_id], "score": score, "windows": count}
+        for label_id, score, count in zip(label_ids.tolist(), scores.tolist(), windows.tolist())
+    ]
+
+
+def document_probabilities(tokenizer, model, texts, stride=None, batch_size=32, logits=None):
+    """
+    The windowed scoring behind score_long_documents. logits maps a padded
+    batch of inputs to the model's logits (default: calling model).
+    Returns: (class probabilities of each document, window count of each document) as tensors.
+    Raises: ValueError unless 0 <= stride < the window's room for text tokens.
+    """
+    texts = list(texts)
+    if not texts:
+        return torch.empty(0, model.config.num_labels), torch.empty(0, dtype=torch.long)
+    if logits is None:
+        def logits(inputs):
+            return model(**inputs).logits
+    max_length = min(tokenizer.model_max_length, model.config.max_position_embeddings)
+    stride = max_length // 4 if stride is None else stride
+    # Windows hold max_length tokens including [CLS]/[SEP]; the overlap must leave room for new tokens
+    room = max_length - tokenizer.num_special_tokens_to_add()
+    if not 0 <= stride < room:
+        raise ValueError(f"stride must be at least 0 and less than {room} (max_length {max_length} "
+                         f"minus special tokens), got {stride}")
+
+    encoded = tokenizer(
+        texts,
+        truncation=True,
+        max_length=max_length,
+        stride=stride,
+        return_overflowing_tokens=True,
+    )
+    window_ids = encoded["input_ids"]
+    document = torch.tensor(encoded["overflow_to_sample_mapping"])
+    lengths = torch.tensor([len(ids) for ids in window_ids])
+
+    # Similar lengths share a batch, so little compute goes to padding
+    order = torch.argsort(lengths, descending=True)
+    window_logits = torch.empty(len(window_ids), model.config.num_labels)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            inputs = pad_token_ids([window_ids[i] for i in rows.tolist()], tokenizer.pad_token_id)
+            window_logits[rows] = logits(inputs).float()
+
+    weights = lengths.float()
+    totals = torch.zeros(len(texts), window_logits.shape[1]).index_add_(0, document, window_logits * weights[:, None])
+    document_logits = totals / torch.zeros(len(texts)).index_add_(0, document, weights)[:, None]
+    windows = torch.bincount(document, minlength=len(texts))
+    return activation(model.config, document_logits), windows
@@ -0,0 +1,137 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+# Token-length bucket edges; texts in the same bucket share one forward pass
+BUCKET_EDGES = (16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-text requests into batched forward passes.
+
+    Callers submit texts from any thread and get a Future back. A worker
+    thread waits for the first request, keeps collecting until
+    max_batch_size texts are queued or max_wait_ms has passed, groups the
+    texts into token-length buckets so little padding is wasted, runs one
+    forward pass per bucket and resolves each caller's future with the same
+    {"label", "score"} a sentiment-analysis pipeline would return.
+    """
+
+    def __init__(self, classifier, max_batch_size=None, max_wait_ms=None):
+        self.model = classifier.model
+        self.tokenizer = classifier.tokenizer
+        self.max_batch_size = max_batch_size or int(os.environ.get("SENTIMENT_MAX_BATCH_SIZE", 32))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None
+                         else float(os.environ.get("SENTIMENT_MAX_WAIT_MS", 5))) / 1000
+        self.max_length = min(self.tokenizer.model_max_length, self.model.config.max_position_embeddings)
+        self.id2label = self.model.config.id2label
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="sentiment-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """
+        Queue one text. Returns: Future resolving to {"label", "score"}.
+        Raises: TypeError if text is not a str.
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"MicroBatcher.submit expects str, got {type(text).__name__}")
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def classify(self, text):
+        """Blocking single-text call, batched with whatever else is queued."""
+        return self.submit(text).result()
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # finish this batch, then stop
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # Callers that gave up (cancelled futures) are skipped
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            try:
+                self._process(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # One bad text must not fail the requests it was batched with: retry each on its own
+                for item in batch:
+                    if not item[1].done():
+                        try:
+                            self._process([item])
+                        except Exception as item_error:
+                            item[1].set_exception(item_error)
+
+    def _process(self, batch):
+        texts = [text for text, _ in batch]
+        # Tokenize once without padding to learn each text's length
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+
+        buckets = {}
+        for i, length in enumerate(lengths):
+            edge = next((e for e in BUCKET_EDGES if length <= e), self.max_length)
+            buckets.setdefault(edge, []).append(i)
+
+        for indices in buckets.values():
+            # Pad only to the longest text in this bucket
+            inputs = pad_token_ids([encoded["input_ids"][i] for i in indices], self.tokenizer.pad_token_id)
+            with torch.inference_mode():
+                logits = self.model(**inputs).logits
+            probabilities = activation(self.model.config, logits)
+            scores, label_ids = probabilities.max(dim=-1)
+            for i, score, label_id in zip(indices, scores.tolist(), label_ids.tolist()):
+                batch[i][1].set_result({"label": self.id2label[label_id], "score": score})
+
+
+def pad_token_ids(id_lists, pad_token_id=None):
+    """Right-pad token id lists to the longest one. Returns: model inputs."""
+    lengths = torch.tensor([len(ids) for ids in id_lists])
+    input_ids = torch.nn.utils.rnn.pad_sequence(
+        [torch.tensor(ids) for ids in id_lists], batch_first=True, padding_value=pad_token_id or 0
+    )
+    attention_mask = (torch.arange(input_ids.shape[1]) < lengths[:, None]).long()
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def activation(config, logits):
+    """Same output function the text-classification pipeline applies."""
+    if config.problem_type == "multi_label_classification" or config.num_labels == 1:
+        return torch.sigmoid(logits)
+    return torch.softmax(logits, dim=-1)
@@ -0,0 +1,323 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import re
+
+import numpy as np
+
+# Compact, indexed movie catalog.
+#
+# Every string is stored once in a StringTable (one UTF-8 blob plus an
+# offsets array) and every column and index is a numpy array. Multi-valued
+# fields (genres, directors, cast) and the inverted indexes from genre,
+# director and actor to movies are CSR pairs: an offsets array and a flat
+# id array. Movies are numbered best first, so every posting list is
+# already in rank order. A prebuilt index file holds all arrays and is
+# memory-mapped on load, which makes loading near instant and lets every
+# process on the machine share the same pages.
+
+INDEX_MAGIC = b"MOVIECATALOG1\n"
+INDEX_SUFFIX = ".catalog"
+ALIGNMENT = 64
+
+# Source files put several genres, directors or cast members in one cell
+MULTI_VALUE_SEPARATOR = "|"
+GENRE_ALIASES = {"science fiction": "sci-fi", "sci fi": "sci-fi", "scifi": "sci-fi", "animated": "animation"}
+
+# Longest person name, in words, looked for in chat messages
+MAX_NAME_WORDS = 4
+_WORD = re.compile(r"\w[\w'.-]*\w|\w")
+
+
+def normalize_genre(genre):
+    genre = genre.strip().lower()
+    return GENRE_ALIASES.get(genre, genre)
+
+
+def split_values(cell):
+    """Returns: The non-empty values of a multi-valued cell."""
+    if not isinstance(cell, str):
+        return []
+    return [value.strip() for value in cell.split(MULTI_VALUE_SEPARATOR) if value.strip()]
+
+
+class StringTable:
+    """Strings packed into one UTF-8 blob; string i is blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def pack(strings):
+        """Returns: (blob, offsets) arrays for strings."""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def index(self, value):
+        """
+        Binary search a table sorted case-insensitively.
+        Returns: Position of value (ignoring case), or -1.
+        """
+        key = value.casefold()
+        i = bisect.bisect_left(self, key, key=str.casefold)
+        return i if i < len(self) and self[i].casefold() == key else -1
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _csr(keys, values, size):
+    """Group values by key. Returns: (offsets, values sorted by key then value)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int32)
+    order = np.lexsort((values, keys))
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order]
+
+
+def write_index(path, magic, arrays):
+    """
+    Write named numpy arrays to one file: magic, a JSON layout header,
+    then every array at an aligned offset so it can be memory-mapped.
+    The file is replaced atomically.
+    """
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += _aligned(array.nbytes)
+    header = json.dumps(layout).encode()
+    start = _aligned(len(magic) + 8 + len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name][2])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+    os.replace(temporary, path)
+
+
+def map_index(path, magic, kind):
+    """Memory-map a file written by write_index. Returns: Dictionary of read-only arrays."""
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not a {kind}")
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    start = _aligned(len(magic) + 8 + header_length)
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, (dtype, shape, offset) in header.items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        begin = start + offset
+        arrays[name] = data[begin:begin + count * dtype.itemsize].view(dtype).reshape(shape)
+    return arrays
+
+
+class MovieCatalog:
+    """
+    Movies with genres, year, directors and cast, plus inverted indexes
+    from genre, director and actor to movies. Lookups cost O(result).
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.titles = StringTable(arrays["title_blob"], arrays["title_offsets"])
+        self.genres = StringTable(arrays["genre_blob"], arrays["genre_offsets"])
+        self.people = StringTable(arrays["people_blob"], arrays["people_offsets"])
+        self.years = arrays["years"]
+
+    @classmethod
+    def build(cls, titles, genres, years=None, directors=None, cast=None, score=None):
+        """
+        Build a catalog from columns. genres, directors and cast hold one
+        list of values per movie. Movies are ranked by score (highest
+        first); without a score the given order is the rank.
+        """
+        n = len(titles)
+        empty = [[]] * n
+        directors = directors if directors is not None else empty
+        cast = cast if cast is not None else empty
+        if score is None:
+            order = np.arange(n)
+        else:
+            # Missing scores rank last
+            order = np.argsort(-np.nan_to_num(np.asarray(score, dtype=float), nan=-np.inf), kind="stable")
+
+        genre_names = sorted({normalize_genre(g) for row in genres for g in row})
+        # One entry per person, however the name is capitalized
+        people = {}
+        for row in list(directors) + list(cast):
+            for name in row:
+                people.setdefault(name.casefold(), name)
+        people = sorted(people.values(), key=lambda name: (name.casefold(), name))
+
+        arrays = {}
+        arrays["title_blob"], arrays["title_offsets"] = StringTable.pack(titles[i] for i in order)
+        arrays["genre_blob"], arrays["genre_offsets"] = StringTable.pack(genre_names)
+        arrays["people_blob"], arrays["people_offsets"] = StringTable.pack(people)
+        year_column = np.zeros(n, dtype=np.int16)
+        if years is not None:
+            year_column[:] = np.nan_to_num(np.asarray(years, dtype=float)[order]).astype(np.int16)
+        arrays["years"] = year_column
+
+        genre_ids = {name: i for i, name in enumerate(genre_names)}
+        person_ids = {name.casefold(): i for i, name in enumerate(people)}
+        for field, column, ids, size in (
+            ("genre", genres, genre_ids, len(genre_names)),
+            ("director", directors, person_ids, len(people)),
+            ("actor", cast, person_ids, len(people)),
+        ):
+            normalize = normalize_genre if field == "genre" else str.casefold
+            movie_ids, item_ids = [], []
+            for movie, row in enumerate(order):
+                items = {ids[normalize(value)] for value in column[row]}
+                movie_ids += [movie] * len(items)
+                item_ids += sorted(items)
+            arrays[f"movie_{field}s_offsets"], arrays[f"movie_{field}s"] = _csr(movie_ids, item_ids, n)
+            arrays[f"{field}_movies_offsets"], arrays[f"{field}_movies"] = _csr(item_ids, movie_ids, size)
+        return cls(arrays)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Build from a CSV or Parquet file with a title column and optional
+        genres, year, director, cast and rating columns. Multi-valued cells
+        separate values with '|'. Movies are ranked by rating, if present.
+        """
+        import pandas as pd
+
+        frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        if "title" not in frame.columns:
+            raise ValueError("Catalog must contain a 'title' column.")
+
+        def multi(column):
+            return [split_values(cell) for cell in frame[column]] if column in frame.columns else None
+
+        return cls.build(
+            frame["title"].astype(str).tolist(),
+            multi("genres") or [[]] * len(frame),
+            years=frame["year"].to_numpy() if "year" in frame.columns else None,
+            directors=multi("director"),
+            cast=multi("cast"),
+            score=frame["rating"].to_numpy() if "rating" in frame.columns else None,
+        )
+
+    def save(self, path):
+        """Write all arrays to one index file, each aligned for memory-mapping."""
+        write_index(path, INDEX_MAGIC, self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index file written by save. Nothing is copied."""
+        return cls(map_index(path, INDEX_MAGIC, "movie catalog index"))
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _postings(self, name, i):
+        offsets = self.arrays[f"{name}_offsets"]
+        return self.arrays[name][offsets[i]:offsets[i + 1]]
+
+    def movie(self, i):
+        """Returns: Dictionary with title, year, genres, directors and cast."""
+        return {
+            "title": self.titles[i],
+            "year": int(self.years[i]) or None,
+            "genres": [self.genres[g] for g in self._postings("movie_genres", i)],
+            "directors": [self.people[p] for p in self._postings("movie_directors", i)],
+            "cast": [self.people[p] for p in self._postings("movie_actors", i)],
+        }
+
+    def by_genre(self, genre, limit=None):
+        """Returns: Movie ids in the genre, best first."""
+        i = self.genres.index(normalize_genre(genre))
+        movies = self._postings("genre_movies", i) if i >= 0 else self.arrays["genre_movies"][:0]
+        return movies[:limit]
+
+    def by_director(self, name, limit=None):
+        """Returns: Movie ids directed by name, best first."""
+        i = self.people.index(name)
+        return self._postings("director_movies", i)[:limit] if i >= 0 else self.arrays["director_movies"][:0]
+
+    def by_actor(self, name, limit=None):
+        """Returns: Movie ids name appears in, best first."""
+        i = self.people.index(name)
+        return self._postings("actor_movies", i)[:limit] if i >= 0 else self.arrays["actor_movies"][:0]
+
+    def best(self, genre):
+        """Returns: Title of the top-ranked movie in the genre, or None."""
+        movies = self.by_genre(genre, limit=1)
+        return self.titles[movies[0]] if len(movies) else None
+
+    def recommend(self, genre, pool=20, rng=random):
+        """Returns: Title of a random movie among the genre's top pool, or None."""
+        movies = self.by_genre(genre, limit=pool)
+        return self.titles[rng.choice(movies.tolist())] if len(movies) else None
+
+    def find_person(self, text, role):
+        """
+        Look up the people named in a chat message: every run of 2 to
+        MAX_NAME_WORDS words is checked against the people table, longest
+        first. role is "director" or "actor".
+        Returns: The first name with at least one movie in that role, or None.
+        """
+        words = _WORD.findall(text)
+        postings = self.arrays[f"{role}_movies_offsets"]
+        for size in range(MAX_NAME_WORDS, 1, -1):
+            for start in range(len(words) - size + 1):
+                i = self.people.index(" ".join(words[start:start + size]))
+                if i >= 0 and postings[i + 1] > postings[i]:
+                    return self.people[i]
+        return None
+
+
+def index_path(source):
+    return os.path.splitext(source)[0] + INDEX_SUFFIX
+
+
+def load_catalog(path):
+    """
+    Load a catalog from an index file, or from a CSV/Parquet source. A
+    source gets its index file built next to it on first use (and again
+    whenever the source is newer), so later loads just memory-map it.
+    """
+    if path.endswith(INDEX_SUFFIX):
+        return MovieCatalog.load(path)
+    index = index_path(path)
+    if os.path.exists(index) and os.path.getmtime(index) >= os.path.getmtime(path):
+        return MovieCatalog.load(index)
+    catalog = MovieCatalog.from_file(path)
+    try:
+        catalog.save(index)
+    except OSError:
+        return catalog  # read-only location: keep the in-memory catalog
+    return MovieCatalog.load(index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a movie catalog index file.")
+    parser.add_argument("source", help="CSV or Parquet file with title, genres, year, director, cast, rating")
+    parser.add_argument("-o", "--output", help=f"index file (default: source with {INDEX_SUFFIX})")
+    args = parser.parse_args()
+    output = args.output or index_path(args.source)
+    catalog = MovieCatalog.from_file(args.source)
+    catalog.save(output)
+    print(f"Wrote {len(catalog)} movies to {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
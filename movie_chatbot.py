@@ -0,0 +1,207 @@
+import random
+import re
+
+from instrumentation import timed
+from intent_matching import EntityAutomaton, IntentMatcher
+from movie_catalog import MovieCatalog
+
+# Intents get_response acts on, highest precedence first
+INTENT_ORDER = ["greeting", "how_are_you", "thank", "bye", "recommend",
+                "opinion", "director", "actor", "best", "worst"]
+
+# Recommendations are drawn from this many top-ranked movies of a genre
+RECOMMEND_POOL = 20
+
+# Simple rule-based movie chatbot
+class MovieChatbot:
+    def __init__(self, directors=None, actors=None, catalog=None):
+        self.movie_genres = ["action", "comedy", "drama", "horror", "sci-fi", "thriller", 
+                            "romance", "animation", "documentary", "fantasy", "adventure"]
+        
+        self.popular_movies = {
+            "action": ["Die Hard", "The Matrix", "John Wick", "Mad Max: Fury Road", "The Dark Knight"],
+            "comedy": ["Superbad", "Anchorman", "Bridesmaids", "The Hangover", "Step Brothers"],
+            "drama": ["The Shawshank Redemption", "The Godfather", "Schindler's List", "Forrest Gump", "The Green Mile"],
+            "horror": ["The Shining", "Hereditary", "Get Out", "The Exorcist", "A Quiet Place"],
+            "sci-fi": ["Blade Runner", "Interstellar", "The Martian", "Arrival", "Dune"],
+            "thriller": ["Silence of the Lambs", "Se7en", "Parasite", "Gone Girl", "Shutter Island"],
+            "romance": ["The Notebook", "Pride and Prejudice", "La La Land", "Before Sunrise", "Eternal Sunshine of the Spotless Mind"],
+            "animation": ["Toy Story", "Spirited Away", "Spider-Man: Into the Spider-Verse", "The Lion King", "WALL-E"],
+            "documentary": ["March of the Penguins", "Free Solo", "13th", "Won't You Be My Neighbor?", "My Octopus Teacher"],
+            "fantasy": ["The Lord of the Rings", "Harry Potter", "Pan's Labyrinth", "The Princess Bride", "The Shape of Water"],
+            "adventure": ["Indiana Jones", "The Goonies", "Pirates of the Caribbean", "Jurassic Park", "The Mummy"]
+        }
+        
+        self.famous_directors = directors or ["Christopher Nolan", "Steven Spielberg", "Martin Scorsese", 
+                                "Quentin Tarantino", "James Cameron", "Greta Gerwig", 
+                                "Alfred Hitchcock", "Stanley Kubrick", "Francis Ford Coppola"]
+        
+        self.famous_actors = actors or ["Tom Hanks", "Meryl Streep", "Leonardo DiCaprio", "Denzel Washington", 
+                            "Viola Davis", "Robert De Niro", "Jennifer Lawrence", "Brad Pitt", 
+                            "Cate Blanchett", "Morgan Freeman"]
+        
+        # Patterns for matching user inputs
+        self.patterns = {
+            "greeting": r"(?i)(\bhello\b|\bhi\b|\bhey\b|\bgreetings\b)",
+            "how_are_you": r"(?i)(how are you|how's it going|how do you do|what's up)",
+            "recommend": r"(?i)(recommend|suggest|what should I watch|good movie)",
+            "genre": r"(?i)(action|comedy|drama|horror|sci-fi|thriller|romance|animation|documentary|fantasy|adventure)",
+            "opinion": r"(?i)(what (?:do you think|is your opinion) about|have you seen|do you like)",
+            "director": r"(?i)(director|filmmaker|made by)",
+            "actor": r"(?i)(actor|actress|star|starring|plays in)",
+            "best": r"(?i)(best|greatest|favorite|top|excellent)",
+            "worst": r"(?i)(worst|terrible|bad|awful|dislike)",
+            "thank": r"(?i)(thank|thanks|appreciate)",
+            "bye": r"(?i)(bye|goodbye|see you|farewell)"
+        }
+        
+        # Compiled once: one scan finds the intent, automata find the names
+        self.intent_matcher = IntentMatcher(self.patterns, INTENT_ORDER)
+        self.genre_regex = re.compile(self.patterns["genre"])
+        self.director_matcher = EntityAutomaton(self.famous_directors)
+        self.actor_matcher = EntityAutomaton(self.famous_actors)
+        
+        # Recommendations and "best" answers come from the catalog; without
+        # one, the popular movies above form a small catalog, in list order
+        self.catalog = catalog or self._popular_catalog()
+        
+        # Responses for different patterns
+        self.responses = {
+            "greeting": [
+                "Hello! I'm your friendly movie chatbot. What kind of movies do you enjoy?",
+                "Hi there! Ready to talk about some great films?",
+                "Hey! I'm excited to chat about movies with you today!"
+            ],
+            "how_are_you": [
+                "I'm doing great, thanks for asking! Always happy to discuss movies. What's on your mind?",
+                "I'm excellent! I've been thinking about movies all day. What can I help you with?",
+                "All good here in the digital world! Ready to talk about your favorite films?"
+            ],
+            "recommend_generic": [
+                "I'd recommend checking out 'The Shawshank Redemption' - it's a classic for a reason!",
+                "Have you seen 'Parasite'? It's a brilliant film that won Best Picture!",
+                "I think 'Everything Everywhere All at Once' is a must-watch if you haven't seen it yet.",
+                "You might enjoy 'Inception' - it's a mind-bending experience!",
+                "How about 'The Grand Budapest Hotel'? It's visually stunning and has a great story."
+            ],
+            "opinion_generic": [
+                "That's a fascinating film with some really memorable moments!",
+                "I think it's a solid movie that showcases some great performances.",
+                "It's definitely one that makes you think! The cinematography is excellent too.",
+                "That one has some devoted fans! The direction is particularly noteworthy."
+            ],
+            "director_generic": [
+                "They've made some incredible contributions to cinema! Which of their films have you seen?",
+                "One of the most influential directors of their generation! Do you have a favorite film by them?",
+                "Their visual style is so distinctive! I always look forward to their new releases."
+            ],
+            "actor_generic": [
+                "They're incredibly talented! They bring so much depth to their characters.",
+                "One of the finest performers working today! Have you seen their recent work?",
+                "They have such an impressive range! They can do comedy and drama equally well."
+            ],
+            "best_generic": [
+                "It's hard to pick the absolute best, but 'The Godfather' is often considered one of the greatest films ever made.",
+                "Many critics would say 'Citizen Kane' changed cinema forever and remains one of the best.",
+                "For pure entertainment value, it's hard to beat the original 'Star Wars'!"
+            ],
+            "worst_generic": [
+                "There are quite a few contenders for that title! 'The Room' is famously so bad it's good.",
+                "Some of the movies with 0% on Rotten Tomatoes might qualify!",
+                "Everyone has different tastes - one person's worst movie might be another's guilty pleasure!"
+            ],
+            "thank": [
+                "You're welcome! I'm happy to talk movies anytime.",
+                "My pleasure! Is there anything else you'd like to discuss about cinema?",
+                "Glad I could help! Let me know if you want to chat more about films."
+            ],
+            "bye": [
+                "Goodbye! Enjoy your movie watching!",
+                "See you later! Hope you find something great to watch!",
+                "Until next time! The credits may be rolling on our conversation, but there's always a sequel!"
+            ],
+            "default": [
+                "Interesting perspective on movies! What genres do you typically enjoy?",
+                "I'm not quite sure I understood that. Could you tell me more about your movie preferences?",
+                "That's a unique take! Have you seen any good films lately?",
+                "Movies are such a rich topic for discussion! Is there a particular era of film you enjoy most?"
+            ]
+        }
+    
+    def _popular_catalog(self):
+        ranked = [(rank, genre, title) for genre, titles in self.popular_movies.items()
+                  for rank, title in enumerate(titles)]
+        ranked.sort(key=lambda movie: movie[0])
+        return MovieCatalog.build([title for _, _, title in ranked], [[genre] for _, genre, _ in ranked])
+    
+    def _known_for(self, movies):
+        if len(movies) == 0:
+            return ""
+        movie = self.catalog.movie(movies[0])
+        year = f" ({movie['year']})" if movie["year"] else ""
+        return f" Have you seen '{movie['title']}'{year}?"
+    
+    @timed("chatbot_response")
+    def get_response(self, user_input):
+        # Highest-precedence intent in the input, found in a single pass
+        intent = self.intent_matcher.match(user_input)
+
+        if intent in ("greeting", "how_are_you", "thank", "bye"):
+            return random.choice(self.responses[intent])
+        
+        elif intent == "recommend":
+            # Check if a specific genre is mentioned
+            genre_match = self.genre_regex.search(user_input)
+            if genre_match:
+                genre = genre_match.group(0).lower()
+                if genre in self.movie_genres:
+                    movie = self.catalog.recommend(genre, pool=RECOMMEND_POOL)
+                    if movie:
+                        return f"For {genre}, I'd recommend '{movie}'. It's one of my favorites in that genre!"
+            
+            # Generic recommendation
+            return random.choice(self.responses["recommend_generic"])
+        
+        elif intent == "opinion":
+            # Generic opinion
+            return random.choice(self.responses["opinion_generic"])
+        
+        elif intent == "director":
+            # Check if a specific director is mentioned
+            director = (self.director_matcher.first(user_input)
+                        or self.catalog.find_person(user_input, "director"))
+            if director:
+                return (f"{director} is a brilliant filmmaker! Their visual storytelling and attention to detail are remarkable."
+                        + self._known_for(self.catalog.by_director(director, limit=1)))
+            
+            # Generic director response
+            return random.choice(self.responses["director_generic"])
+        
+        elif intent == "actor":
+            # Check if a specific actor is mentioned
+            actor = (self.actor_matcher.first(user_input)
+                     or self.catalog.find_person(user_input, "actor"))
+            if actor:
+                return (f"{actor} brings such authenticity to every role. Their performances are always captivating!"
+                        + self._known_for(self.catalog.by_actor(actor, limit=1)))
+            
+            # Generic actor response
+            return random.choice(self.responses["actor_generic"])
+        
+        elif intent == "best":
+            # Check if a specific genre is mentioned for "best"
+            genre_match = self.genre_regex.search(user_input)
+            if genre_match:
+                genre = genre_match.group(0).lower()
+                movie = self.catalog.best(genre) if genre in self.movie_genres else None  # Top-ranked movie
+                if movie:
+                    return f"For {genre}, '{movie}' is widely considered one of the best!"
+            
+            # Generic "best" response
+            return random.choice(self.responses["best_generic"])
+        
+        elif intent == "worst":
+            return random.choice(self.responses["worst_generic"])
+        
+        # Default response if no patterns match
+        return random.choice(self.responses["default"])
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from sentiment_backends import BACKENDS, make_backend
+from sentiment_cache import get_cache
+from vader_batch import SENTIMENT_LABELS
+
+# Per-process scoring function, built once by _init_worker
+_score = None
+
+# How worker processes start. forkserver forks every worker from one server
+# process that has already imported the scoring stack, so the memory those
+# imports allocate (about 200 MB for torch alone) is shared copy-on-write
+# instead of repeated per worker. Transformer weights are shared either way:
+# from_pretrained leaves safetensors weights memory-mapped from the
+# checkpoint file. spawn starts each worker from scratch.
+WORKER_START_METHOD = os.environ.get("SENTIMENT_WORKER_START", "forkserver")
+
+
+def make_scorer(backend, use_cache=True):
+    """
+    Build a scoring function texts -> (label codes, scores).
+    backend is a name from sentiment_backends.BACKENDS or an already
+    loaded SentimentBackend. With use_cache, duplicate texts are scored
+    once and results go through the process-wide result cache.
+    """
+    if isinstance(backend, str):
+        backend = make_backend(backend)
+    if not use_cache:
+        return backend.analyze_batch
+    cache = get_cache(backend.name, backend.revision)
+    return lambda texts: cache.analyze_batch(texts, backend.analyze_batch, SENTIMENT_LABELS)
+
+
+def _init_worker(backend, use_cache):
+    global _score
+    if backend.startswith("transformer") or backend == "cascade":
+        import torch
+
+        # One intra-op thread per worker; the pool provides the parallelism
+        torch.set_num_threads(1)
+    _score = make_scorer(backend, use_cache=use_cache)
+
+
+def preload_modules(backend):
+    """Returns: Modules a worker for backend imports, for the fork server to import once."""
+    modules = ["numpy", "pandas", "parallel_batch", "sentiment_backends", "sentiment_cache", "vader_batch",
+               "vader_lexicon"]
+    if backend.startswith("transformer") or backend == "cascade":
+        modules += ["torch", "transformers.pipelines", "micro_batching"]
+    return modules
+
+
+def worker_pool(backend, workers, use_cache=True, start_method=None):
+    """Process pool whose workers each build the backend's scorer once."""
+    # spawn and forkserver keep workers independent of the (threaded) Streamlit server process
+    start_method = start_method or WORKER_START_METHOD
+    if start_method not in multiprocessing.get_all_start_methods():
+        start_method = "spawn"
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        # Only takes effect when the fork server starts, i.e. for the first pool in this process
+        context.set_forkserver_preload(preload_modules(backend))
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(backend, use_cache),
+    )
+
+
+def clean_texts(texts):
+    """
+    Returns: texts as a list of str. Missing values (None, NaN, as empty
+    CSV cells read) become "" and score NEUTRAL instead of raising.
+    """
+    return pd.Series(texts, dtype=object).fillna("").astype(str).tolist()
+
+
+def score_shard(start, texts, score=None):
+    """
+    Score one shard with score (the worker's scorer by default).
+    If scoring fails, the shard is split in halves until the failing
+    rows are isolated, so a bad row only loses itself.
+    Returns: (start, label codes, scores, errors).
+    """
+    score = score or _score
+    try:
+        codes, scores = score(texts)
+        return start, codes, scores, []
+    except Exception as e:
+        if len(texts) == 1:
+            return start, np.array([-1], dtype=np.int8), np.array([np.nan]), [(start, f"{type(e).__name__}: {e}")]
+
+    middle = len(texts) // 2
+    _, left_codes, left_scores, left_errors = score_shard(start, texts[:middle], score)
+    _, right_codes, right_scores, right_errors = score_shard(start + middle, texts[middle:], score)
+    return (
+        start,
+        np.concatenate([left_codes, right_codes]),
+        np.concatenate([left_scores, right_scores]),
+        left_errors + right_errors,
+    )
+
+
+def analyze_sentiment_parallel(texts, backend="vader", workers=None, chunk_size=10000, progress=None,
+                               use_cache=True):
+    """
+    Analyze sentiment of many texts across a pool of worker processes.
+
+    Each worker builds its sentiment backend (VADER or a transformer) once and
+    scores shards of chunk_size rows. progress(done, total) is called as
+    shards finish. Rows that raise are left empty instead of failing the job.
+    Returns: (labels, scores, errors) where errors lists (row, message).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    texts = clean_texts(texts)
+    total = len(texts)
+    workers = workers or os.cpu_count() or 1
+
+    codes = np.full(total, -1, dtype=np.int8)
+    scores = np.full(total, np.nan, dtype=np.float64)
+    errors = []
+    done = 0
+
+    with worker_pool(backend, workers, use_cache) as pool:
+        futures = [
+            pool.submit(score_shard, start, texts[start:start + chunk_size])
+            for start in range(0, total, chunk_size)
+        ]
+        for future in as_completed(futures):
+            start, shard_codes, shard_scores, shard_errors = future.result()
+            codes[start:start + len(shard_codes)] = shard_codes
+            scores[start:start + len(shard_scores)] = shard_scores
+            errors.extend(shard_errors)
+            done += len(shard_codes)
+            if progress is not None:
+                progress(done, total)
+
+    labels = pd.Categorical.from_codes(codes, categories=SENTIMENT_LABELS)
+    return labels, scores, sorted(errors)
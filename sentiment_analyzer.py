@@ -1,20 +1,108 @@
-from transformers import pipeline
+import os
+import threading
+from sentiment_cache import get_cache
 
-# Create the pipeline ONCE
-classifier = pipeline("sentiment-analysis")
+# Default model of the sentiment-analysis pipeline
+DEFAULT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+DEFAULT_REVISION = "714eb0f"
+
+_classifier = None
+_batcher = None
+_classifier_lock = threading.Lock()
+
+def model_source():
+    """
+    Model name (or local directory) and revision to load.
+    SENTIMENT_MODEL selects another model; the pipeline default is used otherwise.
+    """
+    model = os.environ.get("SENTIMENT_MODEL")
+    return (model, None) if model else (DEFAULT_MODEL, DEFAULT_REVISION)
+
+def load_model(**kwargs):
+    """
+    Load a fresh tokenizer and classification model, separate from the
+    shared pipeline. kwargs go to from_pretrained (e.g. torchscript=True).
+    Returns: (tokenizer, model) with the model in eval mode.
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    name, revision = model_source()
+    tokenizer = AutoTokenizer.from_pretrained(name, revision=revision)
+    model = AutoModelForSequenceClassification.from_pretrained(name, revision=revision, **kwargs)
+    return tokenizer, model.eval()
+
+def get_classifier():
+    """
+    Create the pipeline ONCE per process, on first use.
+    transformers and torch are only imported here, so importing
+    this module stays cheap.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from transformers import pipeline
+                name, revision = model_source()
+                _classifier = pipeline("sentiment-analysis", model=name, revision=revision)
+    return _classifier
+
+def get_batcher():
+    """
+    Micro-batching front end for the classifier, shared by all callers
+    in this process. See micro_batching.MicroBatcher for the tunables.
+    """
+    global _batcher
+    if _batcher is None:
+        classifier = get_classifier()
+        with _classifier_lock:
+            if _batcher is None:
+                from micro_batching import MicroBatcher
+                _batcher = MicroBatcher(classifier)
+    return _batcher
+
+def __getattr__(name):
+    # Keep `from sentiment_analyzer import classifier` working
+    if name == "classifier":
+        return get_classifier()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def model_revision():
+    """
+    Model name and commit of the loaded classifier.
+    Used to keep cached results of different models apart.
+    """
+    config = get_classifier().model.config
+    return f"{config._name_or_path}@{getattr(config, '_commit_hash', None) or 'local'}"
+
+def _classify(text):
+    # Concurrent callers are coalesced into batched forward passes
+    return get_batcher().classify(text)
 
 def analyze_sentiment(text):
     """
     Analyze sentiment of input text.
+    Repeated texts are answered from the shared result cache.
     Returns: Dictionary with label and confidence score.
     """
-    result = classifier(text)
+    # The pipeline's raw labels are cached apart from TransformerBackend's mapped ones
+    result = get_cache("pipeline", model_revision()).get_or_compute(text, _classify)
     return {
         "text": text,
-        "label": result[0]["label"],
-        "score": result[0]["score"]
+        "label": result["label"],
+        "score": result["score"]
     }
 
+def analyze_long_sentiment(texts, stride=None, batch_size=32):
+    """
+    Analyze sentiment of full-length documents such as IMDb reviews.
+    Texts are split into overlapping token windows at the model's maximum
+    length instead of being cut off; see long_documents.score_long_documents.
+    Returns: List of dictionaries with label, confidence score and window count.
+    """
+    from long_documents import score_long_documents
+    texts = list(texts)
+    results = score_long_documents(get_classifier(), texts, stride=stride, batch_size=batch_size)
+    return [{"text": text, **result} for text, result in zip(texts, results)]
+
 # Test the function
 if __name__ == "__main__":
     sample_texts = [
@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.netutil
+import tornado.process
+import tornado.web
+from tornado.httpserver import HTTPServer
+from tornado.log import access_log
+
+from instrumentation import REGISTRY, count, record, stage
+from sentiment_backends import CASCADE_STAGES, cascade_router, make_backend
+from sentiment_cache import get_cache
+
+# Headless HTTP API for the app's sentiment scoring.
+#
+# POST /analyze        {"text": "..."}        -> {"label", "score"}
+# POST /analyze/batch  {"texts": ["...", ...]} -> {"results": [{"label", "score"}, ...]}
+# GET  /health                                 -> backend and load
+# GET  /metrics                                -> Prometheus text (see instrumentation.py)
+#
+# With the cascade backend every result also has "stage": the cascade
+# stage (vader or transformer) that decided it.
+#
+# Scoring gives the same results as app.py: the backend named by
+# SENTIMENT_BACKEND behind the process-wide result cache. It runs on a
+# bounded thread pool, so the event loop keeps accepting and answering
+# requests while texts are scored. Requests queued or running on the pool
+# are counted; once max_pending are in flight, new scoring requests get
+# 429 with Retry-After instead of queueing without bound.
+
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "vader")
+
+# Largest batch accepted by /analyze/batch; bigger uploads belong to the Batch Analysis flow
+MAX_BATCH_TEXTS = 1000
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+# Seconds an idle keep-alive connection stays open
+KEEPALIVE_TIMEOUT = 75
+RETRY_AFTER_SECONDS = 1
+
+
+class Overloaded(Exception):
+    """Raised when max_pending scoring requests are already in flight."""
+
+
+class ScoringService:
+    """
+    A sentiment backend and its result cache behind a bounded executor.
+
+    workers threads score texts; at most max_pending requests may be queued
+    or running at once. Single texts that arrive while the workers are busy
+    are queued and scored together, up to max_batch_size per call, since
+    one backend call on many texts costs far less per text than many calls
+    on one. The pending count and the queue are only touched from the
+    event loop, so they need no lock.
+    """
+
+    def __init__(self, backend, workers=4, max_pending=256, max_batch_size=64, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else get_cache(backend.name, backend.revision)
+        self.cascade = cascade_router(backend)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_batch_size = max_batch_size
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sentiment-api")
+        self._queue = None
+        self._dispatchers = []
+
+    def analyze_batch(self, texts):
+        """Returns: [{"label", "score"}] for texts, through the result cache (blocking)."""
+        with stage("analyze_batch"):
+            labels = self.backend.labels
+            codes, scores = self.cache.analyze_batch(texts, self.backend.analyze_batch, labels)
+            results = [{"label": labels[code], "score": float(score)} for code, score in zip(codes, scores)]
+            if self.cascade is not None:
+                for result, code in zip(results, self.cascade.stages(texts)):
+                    result["stage"] = CASCADE_STAGES[code]
+            return results
+
+    def _admit(self):
+        if self.pending >= self.max_pending:
+            count("api_rejected_total")
+            raise Overloaded()
+        self.pending += 1
+
+    async def analyze(self, text):
+        """Score one text. Raises: Overloaded when the queue is full."""
+        self._admit()
+        try:
+            if self._queue is None:
+                self._queue = asyncio.Queue()
+                self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+            future = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait((text, future))
+            return await future
+        finally:
+            self.pending -= 1
+
+    async def score_batch(self, texts):
+        """Score a list of texts in one call. Raises: Overloaded when the queue is full."""
+        self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.analyze_batch, texts)
+        finally:
+            self.pending -= 1
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            while len(items) < self.max_batch_size and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                results = await loop.run_in_executor(self.executor, self.analyze_batch, [text for text, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(items, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class JSONHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body)
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="Request body must be a JSON object")
+        return body
+
+    def write_error(self, status_code, **kwargs):
+        if status_code == 429:
+            self.set_header("Retry-After", str(RETRY_AFTER_SECONDS))
+        self.finish({"error": self._reason})
+
+    async def score(self, scoring):
+        try:
+            return await scoring
+        except Overloaded:
+            raise tornado.web.HTTPError(429, reason="Too many pending requests")
+
+
+class AnalyzeHandler(JSONHandler):
+    async def post(self):
+        text = self.json_body().get("text")
+        if not isinstance(text, str):
+            raise tornado.web.HTTPError(400, reason='Expected {"text": "..."}')
+        self.write(await self.score(self.service.analyze(text)))
+
+
+class BatchHandler(JSONHandler):
+    async def post(self):
+        texts = self.json_body().get("texts")
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise tornado.web.HTTPError(400, reason='Expected {"texts": ["...", ...]}')
+        if len(texts) > MAX_BATCH_TEXTS:
+            raise tornado.web.HTTPError(413, reason=f"At most {MAX_BATCH_TEXTS} texts per batch")
+        self.write({"results": await self.score(self.service.score_batch(texts)) if texts else []})
+
+
+class HealthHandler(JSONHandler):
+    def get(self):
+        service = self.service
+        self.write({
+            "status": "ok",
+            "backend": service.backend.name,
+            "revision": service.backend.revision,
+            "pending": service.pending,
+            "max_pending": service.max_pending,
+            "workers": service.workers,
+            "max_batch_size": service.max_batch_size,
+        })
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(REGISTRY.prometheus())
+
+
+def log_request(handler):
+    """Record request latency instead of logging every request; errors are still logged."""
+    status = handler.get_status()
+    record("api_request", handler.request.request_time())
+    if status >= 500:
+        access_log.error("%d %s %.2fms", status, handler._request_summary(), 1000 * handler.request.request_time())
+
+
+def make_app(service):
+    return tornado.web.Application([
+        (r"/analyze", AnalyzeHandler, {"service": service}),
+        (r"/analyze/batch", BatchHandler, {"service": service}),
+        (r"/health", HealthHandler, {"service": service}),
+        (r"/metrics", MetricsHandler),
+    ], log_function=log_request)
+
+
+def make_server(service):
+    """HTTP/1.1 server with keep-alive connections and a bounded request body."""
+    return HTTPServer(make_app(service), idle_connection_timeout=KEEPALIVE_TIMEOUT,
+                      max_body_size=MAX_BODY_BYTES)
+
+
+def load_backend(name):
+    if name in ("vader", "cascade"):
+        import nltk
+
+        try:
+            nltk.data.find('sentiment/vader_lexicon')
+        except LookupError:
+            nltk.download('vader_lexicon')
+    with stage("model_load"):
+        return make_backend(name)
+
+
+async def serve(sockets, backend_name, workers, max_pending, max_batch_size):
+    service = ScoringService(load_backend(backend_name), workers, max_pending, max_batch_size)
+    server = make_server(service)
+    server.add_sockets(sockets)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve sentiment scoring over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backend", default=SENTIMENT_BACKEND, help="sentiment backend (default: $SENTIMENT_BACKEND)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="scoring threads per process")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="single texts scored together at most")
+    parser.add_argument("--max-pending", type=int, default=256,
+                        help="scoring requests queued or running per process before answering 429")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="server processes sharing the port (0: one per CPU); each loads its own model")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Bind before forking so every process accepts on the same socket
+    sockets = tornado.netutil.bind_sockets(args.port, args.host)
+    if args.processes != 1:
+        tornado.process.fork_processes(args.processes)
+    logging.info("Serving %s sentiment on http://%s:%d", args.backend, args.host, args.port)
+    asyncio.run(serve(sockets, args.backend, args.workers, args.max_pending, args.max_batch_size))
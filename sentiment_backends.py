@@ -0,0 +1,290 @@
+import copy
+import os
+
+import numpy as np
+
+from instrumentation import count, stage
+from vader_batch import NEUTRAL_BAND, SENTIMENT_LABELS, label_polarity, label_polarity_one
+
+# Cascade: texts whose VADER compound is closer to zero than this go on to the transformer,
+CASCADE_BAND = float(os.environ.get("SENTIMENT_CASCADE_BAND", 0.25))
+# as do texts longer than this many words
+CASCADE_MAX_WORDS = int(os.environ.get("SENTIMENT_CASCADE_MAX_WORDS", 128))
+# and mixed texts, whose weaker polarity (negative or positive) is at least this share of the stronger one
+CASCADE_MIXED_RATIO = float(os.environ.get("SENTIMENT_CASCADE_MIXED_RATIO", 0.67))
+
+# Which cascade stage decided a text; stage codes index into this
+CASCADE_STAGES = ["vader", "transformer"]
+
+
+class SentimentBackend:
+    """
+    Common interface of the sentiment models the app can run.
+
+    A backend turns texts into a polarity in [-1, 1]; label_polarity then
+    applies the same POSITIVE / NEUTRAL / NEGATIVE mapping (including the
+    NEUTRAL band around zero) for every backend.
+    """
+
+    name = None
+    description = None
+    labels = SENTIMENT_LABELS
+    neutral_band = NEUTRAL_BAND
+
+    # Identifies the model weights; part of result cache keys
+    revision = None
+
+    def polarity(self, texts):
+        raise NotImplementedError
+
+    def analyze_batch(self, texts):
+        """Returns: (label codes into SENTIMENT_LABELS, scores) as numpy arrays."""
+        texts = list(texts)
+        count("texts_scored_total", len(texts))
+        with stage("score"):
+            return label_polarity(self.polarity(texts), self.neutral_band)
+
+    def analyze(self, text):
+        """Returns: Dictionary with label and confidence score."""
+        codes, scores = self.analyze_batch([text])
+        return {"label": self.labels[codes[0]], "score": float(scores[0])}
+
+
+class VaderBackend(SentimentBackend):
+    """NLTK VADER; polarity is the compound score. The lexicon is memory-mapped from its compiled file."""
+
+    name = "vader"
+    description = "NLTK VADER Sentiment Analysis"
+
+    def __init__(self, analyzer=None):
+        from vader_batch import BatchSentimentScorer, lexicon_revision
+        from vader_lexicon import load_analyzer
+
+        self.scorer = BatchSentimentScorer(analyzer if analyzer is not None else load_analyzer())
+        self.analyzer = self.scorer.analyzer
+        self.revision = lexicon_revision(self.analyzer)
+
+    def polarity(self, texts):
+        return self.scorer.polarity_compound(texts)
+
+    def analyze(self, text):
+        # One text skips the batch path, whose numpy setup costs more than it saves here
+        count("texts_scored_total", 1)
+        with stage("score"):
+            label, score = label_polarity_one(self.analyzer.polarity_scores(text)["compound"], self.neutral_band)
+        return {"label": label, "score": float(score)}
+
+
+class TransformerBackend(SentimentBackend):
+    """
+    Transformer classifier run directly on the model (fp32 by default).
+    Polarity is P(POSITIVE) - P(NEGATIVE), so confidence for a positive
+    label is P(POSITIVE), as the pipeline reports it.
+    """
+
+    name = "transformer"
+    description = "DistilBERT (fp32)"
+
+    def __init__(self, classifier=None, batch_size=32):
+        self.tokenizer, self.model = self._load(classifier)
+        self.config = self.model.config
+        self.batch_size = batch_size
+        self.max_length = min(self.tokenizer.model_max_length, self.config.max_position_embeddings)
+        label_ids = {label.upper(): i for i, label in self.config.id2label.items()}
+        self._positive, self._negative = label_ids["POSITIVE"], label_ids["NEGATIVE"]
+        self.revision = f"{self.config._name_or_path}@{getattr(self.config, '_commit_hash', None) or 'local'}"
+
+    def _load(self, classifier):
+        # fp32 shares the process-wide pipeline's weights
+        from sentiment_analyzer import get_classifier
+
+        classifier = classifier or get_classifier()
+        return classifier.tokenizer, classifier.model
+
+    def _logits(self, inputs):
+        return self.model(**inputs).logits
+
+    def polarity(self, texts):
+        import torch
+        from micro_batching import activation, pad_token_ids
+
+        texts = [str(text) for text in texts]
+        polarity = np.zeros(len(texts))
+        if not texts:
+            return polarity
+        with stage("tokenize"):
+            ids = self.tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        order = np.argsort([len(i) for i in ids], kind="stable")
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                rows = order[start:start + self.batch_size]
+                inputs = pad_token_ids([ids[i] for i in rows], self.tokenizer.pad_token_id)
+                probabilities = activation(self.config, self._logits(inputs).float())
+                polarity[rows] = (probabilities[:, self._positive] - probabilities[:, self._negative]).numpy()
+        return polarity
+
+    def long_polarity(self, texts, stride=None):
+        """
+        Polarity of whole documents: texts longer than the model's context are
+        scored over overlapping windows instead of being cut off (see
+        long_documents.score_long_documents); shorter ones score as in polarity.
+        """
+        from long_documents import document_probabilities
+
+        texts = [str(text) for text in texts]
+        probabilities, _ = document_probabilities(self.tokenizer, self.model, texts, stride, self.batch_size,
+                                                  self._logits)
+        return (probabilities[:, self._positive] - probabilities[:, self._negative]).numpy()
+
+
+class QuantizedTransformerBackend(TransformerBackend):
+    """Same model with Linear layers dynamically quantized to int8."""
+
+    name = "transformer-int8"
+    description = "DistilBERT (int8 dynamic quantization)"
+
+    def __init__(self, classifier=None, batch_size=32):
+        super().__init__(classifier, batch_size)
+        self.revision += "+int8"
+
+    def _load(self, classifier):
+        import torch
+        from sentiment_analyzer import load_model
+
+        # Quantize a private copy so no fp32 weights stay resident and
+        # the shared pipeline is left untouched
+        if classifier is None:
+            tokenizer, model = load_model()
+        else:
+            tokenizer, model = classifier.tokenizer, copy.deepcopy(classifier.model)
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return tokenizer, model
+
+
+class TorchScriptBackend(TransformerBackend):
+    """Model traced and frozen into a TorchScript graph."""
+
+    name = "transformer-torchscript"
+    description = "DistilBERT (TorchScript graph)"
+
+    def __init__(self, classifier=None, batch_size=32):
+        import torch
+        from micro_batching import pad_token_ids
+
+        super().__init__(classifier, batch_size)
+        example = pad_token_ids(self.tokenizer(["a short example", "an example"])["input_ids"],
+                                self.tokenizer.pad_token_id)
+        with torch.inference_mode():
+            traced = torch.jit.trace(self.model, (example["input_ids"], example["attention_mask"]))
+        self.graph = torch.jit.freeze(traced)
+        self.revision += "+torchscript"
+
+    def _load(self, classifier):
+        from transformers import AutoModelForSequenceClassification
+
+        from sentiment_analyzer import load_model
+
+        # Eager attention traces to a graph that accepts any batch and sequence length.
+        # Tracing needs a model built for it, so a given classifier's weights are loaded again.
+        if classifier is None:
+            return load_model(torchscript=True, attn_implementation="eager")
+        config = classifier.model.config
+        model = AutoModelForSequenceClassification.from_pretrained(
+            config._name_or_path, revision=getattr(config, "_commit_hash", None), torchscript=True,
+            attn_implementation="eager")
+        return classifier.tokenizer, model.eval()
+
+    def _logits(self, inputs):
+        return self.graph(inputs["input_ids"], inputs["attention_mask"])[0]
+
+
+class CascadeRouter:
+    """
+    Decides which texts VADER settles on its own and which are ambiguous
+    enough to escalate to the transformer: a compound score inside band
+    around zero, more than max_words words, or mixed polarity.
+    """
+
+    def __init__(self, vader=None, band=None, max_words=None, mixed_ratio=None):
+        self.vader = vader if vader is not None else VaderBackend()
+        self.band = CASCADE_BAND if band is None else band
+        self.max_words = CASCADE_MAX_WORDS if max_words is None else max_words
+        self.mixed_ratio = CASCADE_MIXED_RATIO if mixed_ratio is None else mixed_ratio
+
+    @property
+    def settings(self):
+        return f"band={self.band},words={self.max_words},mixed={self.mixed_ratio}"
+
+    def route(self, texts):
+        """Returns: (VADER compound scores, boolean mask of texts to escalate)."""
+        texts = [text if isinstance(text, str) else str(text) for text in texts]
+        compound, positive, negative = self.vader.scorer.polarity_details(texts)
+        words = np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+        negative = -negative
+        mixed = (positive > 0) & (negative > 0) & (
+            np.minimum(positive, negative) >= self.mixed_ratio * np.maximum(positive, negative))
+        return compound, (np.abs(compound) < self.band) | (words > self.max_words) | mixed
+
+    def stages(self, texts):
+        """Returns: Stage codes into CASCADE_STAGES. Only VADER runs, so this is cheap even for cached results."""
+        return self.route(texts)[1].astype(np.int8)
+
+
+class CascadeBackend(SentimentBackend):
+    """
+    VADER first; only texts the CascadeRouter finds ambiguous are scored
+    again by the transformer, in batches, and take its polarity. They are
+    scored whole, window by window, so long texts are not cut off.
+    """
+
+    name = "cascade"
+    description = "VADER, escalating ambiguous texts to DistilBERT"
+
+    def __init__(self, router=None, transformer=None):
+        self.router = router if router is not None else CascadeRouter()
+        self.transformer = transformer if transformer is not None else TransformerBackend()
+        # Routing settings change results, so they are part of the cache key
+        self.revision = f"{self.router.vader.revision}|{self.transformer.revision}|{self.router.settings}"
+
+    def _route_and_score(self, texts):
+        # Returns: (polarity, escalate mask)
+        polarity, escalate = self.router.route(texts)
+        if escalate.any():
+            count("texts_escalated_total", int(escalate.sum()))
+            with stage("escalate"):
+                polarity[escalate] = self.transformer.long_polarity([texts[i] for i in np.flatnonzero(escalate)])
+        return polarity, escalate
+
+    def polarity(self, texts):
+        return self._route_and_score(texts)[0]
+
+    def analyze(self, text):
+        """Returns: Dictionary with label, confidence score and the stage that decided it."""
+        count("texts_scored_total", 1)
+        with stage("score"):
+            polarity, escalate = self._route_and_score([text])
+            label, score = label_polarity_one(polarity[0], self.neutral_band)
+        return {"label": label, "score": float(score), "stage": CASCADE_STAGES[int(escalate[0])]}
+
+
+def cascade_router(backend):
+    """Returns: The CascadeRouter behind backend (a name or loaded backend), or None if it is not a cascade."""
+    if isinstance(backend, CascadeBackend):
+        return backend.router
+    return CascadeRouter() if backend == CascadeBackend.name else None
+
+
+BACKENDS = {
+    "vader": VaderBackend,
+    "transformer": TransformerBackend,
+    "transformer-int8": QuantizedTransformerBackend,
+    "transformer-torchscript": TorchScriptBackend,
+    "cascade": CascadeBackend,
+}
+
+
+def make_backend(name, **kwargs):
+    """Build a backend by name (see BACKENDS)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
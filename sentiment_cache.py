@@ -0,0 +1,237 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+# Default location of the on-disk tier, shared by this user's processes. It is
+# a per-user directory rather than the shared temp dir, where other local
+# users could write (and so poison) cached results.
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "sentiment_app")
+DEFAULT_CACHE_PATH = os.environ.get("SENTIMENT_CACHE_PATH", os.path.join(CACHE_DIR, "sentiment_cache.sqlite"))
+
+# Bounds of the on-disk tier: results older than this many days and the
+# oldest rows beyond the row cap are pruned on open and every PRUNE_EVERY stores
+DISK_TTL_DAYS = float(os.environ.get("SENTIMENT_CACHE_TTL_DAYS", 30))
+DISK_MAX_ROWS = int(os.environ.get("SENTIMENT_CACHE_MAX_ROWS", 1000000))
+PRUNE_EVERY = 10000
+
+
+# One cache per (backend, revision) in this process, shared by every session
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_text(text):
+    """
+    Normalize text for cache lookups.
+    Only whitespace is collapsed: both backends split on whitespace, while
+    case and punctuation change VADER scores and must stay in the key.
+    Raises: TypeError if text is not a str (callers turn missing values into "").
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"Sentiment cache keys must be str, got {type(text).__name__}")
+    return " ".join(text.split())
+
+
+class SentimentCache:
+    """
+    Two-tier cache of sentiment results.
+
+    Tier 1 is an in-process LRU with a size limit and TTL. Tier 2 is a
+    SQLite file shared across processes and sessions, bounded by
+    disk_ttl_days and disk_max_rows. Keys hash the
+    normalized text together with the backend name and model revision,
+    so results from different models never mix.
+    """
+
+    def __init__(self, backend, revision, maxsize=100000, ttl=3600, path=DEFAULT_CACHE_PATH,
+                 disk_ttl_days=DISK_TTL_DAYS, disk_max_rows=DISK_MAX_ROWS):
+        self.backend = backend
+        self.revision = revision
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self.disk_ttl = disk_ttl_days * 86400
+        self.disk_max_rows = disk_max_rows
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._stored = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, label TEXT, score REAL, created REAL)"
+            )
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(results)")]
+            if "created" not in columns:
+                # Files from before the bounds: their rows count as expired
+                self._db.execute("ALTER TABLE results ADD COLUMN created REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._db.commit()
+            self.prune()
+
+    def key(self, text):
+        prefix = f"{self.backend}\0{self.revision}\0"
+        return hashlib.sha256((prefix + normalize_text(text)).encode("utf-8")).digest()
+
+    def _disk_get(self, keys):
+        found = {}
+        if self._db is None or not keys:
+            return found
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                query = (f"SELECT key, label, score FROM results WHERE key IN ({','.join('?' * len(part))}) "
+                         f"AND created >= ?")
+                for key, label, score in self._db.execute(query, part + [time.time() - self.disk_ttl]):
+                    found[key] = (label, score)
+        except sqlite3.Error:
+            pass
+        return found
+
+    def _disk_put(self, items):
+        if self._db is None or not items:
+            return
+        now = time.time()
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results (key, label, score, created) VALUES (?, ?, ?, ?)",
+                [(key, label, score, now) for key, (label, score) in items],
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            # The disk tier is best effort; a locked or read-only file only costs hits
+            return
+        self._stored += len(items)
+        if self._stored >= PRUNE_EVERY:
+            self._prune()
+
+    def prune(self):
+        """Delete on-disk results older than disk_ttl_days and the oldest beyond disk_max_rows."""
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        self._stored = 0
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.disk_ttl,))
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.disk_max_rows,),
+            )
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def lookup(self, keys):
+        """
+        Look up many keys, memory first, then disk.
+        Returns: Dictionary of key -> (label, score) for the hits.
+        """
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                value = self.memory.get(key)
+                if value is None:
+                    missing.append(key)
+                else:
+                    found[key] = value
+            self.hits["memory"] += len(found)
+            from_disk = self._disk_get(missing)
+            for key, value in from_disk.items():
+                self.memory[key] = value
+            self.hits["disk"] += len(from_disk)
+            self.misses += len(missing) - len(from_disk)
+        found.update(from_disk)
+        return found
+
+    def store(self, items):
+        """Store (key, (label, score)) pairs in both tiers."""
+        items = list(items)
+        with self._lock:
+            for key, value in items:
+                self.memory[key] = value
+            self._disk_put(items)
+
+    def get_or_compute(self, text, compute):
+        """
+        Cached result for a single text.
+        compute(text) must return a dictionary with label and score.
+        """
+        key = self.key(text)
+        found = self.lookup([key])
+        if key in found:
+            label, score = found[key]
+            return {"label": label, "score": score}
+        result = compute(text)
+        self.store([(key, (result["label"], result["score"]))])
+        return result
+
+    def analyze_batch(self, texts, score, labels):
+        """
+        Score many texts, computing each distinct normalized text only once.
+        score(texts) must return (label codes, scores) for the given labels;
+        results are broadcast back to every row.
+        Returns: (label codes, scores) for all texts.
+        """
+        keys = [self.key(text) for text in texts]
+        codes, unique_keys = pd.factorize(np.array(keys, dtype=object))
+        unique_keys = list(unique_keys)
+        first_row = np.full(len(unique_keys), -1)
+        first_row[codes[::-1]] = np.arange(len(codes))[::-1]
+
+        unique_codes = np.full(len(unique_keys), -1, dtype=np.int8)
+        unique_scores = np.full(len(unique_keys), np.nan)
+        found = self.lookup(unique_keys)
+        todo = []
+        for i, key in enumerate(unique_keys):
+            if key in found:
+                label, value = found[key]
+                unique_codes[i] = labels.index(label)
+                unique_scores[i] = value
+            else:
+                todo.append(i)
+
+        if todo:
+            new_codes, new_scores = score([texts[first_row[i]] for i in todo])
+            unique_codes[todo] = new_codes
+            unique_scores[todo] = new_scores
+            self.store(
+                (unique_keys[i], (labels[int(code)], float(value)))
+                for i, code, value in zip(todo, new_codes, new_scores)
+            )
+
+        return unique_codes[codes], unique_scores[codes]
+
+    def stats(self):
+        """Hit/miss counters for this process."""
+        with self._lock:
+            hits = self.hits["memory"] + self.hits["disk"]
+            total = hits + self.misses
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_size": len(self.memory),
+            }
+
+
+def get_cache(backend, revision, **kwargs):
+    """Process-wide SentimentCache for a backend and model revision."""
+    with _caches_lock:
+        cache = _caches.get((backend, revision))
+        if cache is None:
+            cache = _caches[(backend, revision)] = SentimentCache(backend, revision, **kwargs)
+        return cache
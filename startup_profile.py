@@ -0,0 +1,92 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# Modules app.py imports at startup (its own imports, then the VADER modules
+# they and the default backend pull in), followed by the ones it defers
+APP_IMPORTS = ["streamlit", "pandas", "nltk", "streaming_batch", "batch_jobs", "sentiment_backends",
+               "sentiment_cache", "chat_history", "instrumentation", "movie_catalog", "movie_chatbot",
+               "nltk.sentiment.vader", "vader_batch", "vader_lexicon"]
+DEFERRED_IMPORTS = ["plotly.express", "pyarrow.parquet", "sentiment_analyzer", "chat_generation",
+                    "transformers", "torch"]
+
+FIRST_RESPONSE = {
+    # The backend the app loads: VADER on the memory-mapped compiled lexicon
+    "vader": """
+from sentiment_backends import VaderBackend
+start = time.perf_counter()
+backend = VaderBackend()
+loaded = time.perf_counter()
+backend.analyze("This movie was absolutely fantastic!")
+""",
+    "chatbot": """
+from movie_chatbot import MovieChatbot
+start = time.perf_counter()
+chatbot = MovieChatbot()
+loaded = time.perf_counter()
+chatbot.get_response("Can you recommend a good comedy?")
+""",
+    "transformer": """
+from sentiment_analyzer import analyze_sentiment, get_classifier
+start = time.perf_counter()
+get_classifier()
+loaded = time.perf_counter()
+analyze_sentiment("This movie was absolutely fantastic!")
+""",
+}
+
+
+def run_timed(code):
+    """Run code in a fresh interpreter so nothing is already imported."""
+    output = subprocess.run([sys.executable, "-c", "import time\n" + code],
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def import_time(modules):
+    code = f"""
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(time.perf_counter() - start)
+"""
+    return run_timed(code)
+
+
+def first_response_time(name):
+    code = FIRST_RESPONSE[name] + """
+done = time.perf_counter()
+print('{"load": %f, "first_call": %f}' % (loaded - start, done - loaded))
+"""
+    return run_timed(code)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import and first-inference times.")
+    parser.add_argument("--transformer", action="store_true", help="also load the transformer model")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args()
+
+    report = {
+        "imports": {"app startup": import_time(APP_IMPORTS)},
+        "first_response": {},
+    }
+    for module in APP_IMPORTS + DEFERRED_IMPORTS:
+        report["imports"][module] = import_time([module])
+    # Deployments compile the VADER lexicon ahead of time (download_nltk_data.py), so load times exclude it
+    subprocess.run([sys.executable, "-m", "vader_lexicon"], check=True, capture_output=True)
+    backends = ["vader", "chatbot"] + (["transformer"] if args.transformer else [])
+    for backend in backends:
+        report["first_response"][backend] = first_response_time(backend)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("Import time (fresh interpreter):")
+        for module, seconds in report["imports"].items():
+            deferred = " (deferred)" if module in DEFERRED_IMPORTS else ""
+            print(f"  {module:22s} {seconds * 1000:8.1f} ms{deferred}")
+        print("Time to first response:")
+        for backend, times in report["first_response"].items():
+            print(f"  {backend:22s} load {times['load'] * 1000:8.1f} ms, first call {times['first_call'] * 1000:8.1f} ms")
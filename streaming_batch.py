@@ -0,0 +1,404 @@
+import bisect
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, stage
+from parallel_batch import clean_texts, make_scorer, score_shard, worker_pool
+from sentiment_backends import CASCADE_STAGES, cascade_router
+from vader_batch import SENTIMENT_LABELS
+
+# Supported output formats and their file suffixes / MIME types
+OUTPUT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+# Batch summary resolution: confidence histogram bins and text-length bucket edges (characters)
+CONFIDENCE_BINS = 20
+LENGTH_BUCKETS = (50, 100, 200, 500, 1000, 2000)
+
+
+def read_chunks(source, chunk_size=50000, input_format="csv"):
+    """
+    Yield the input as DataFrames of at most chunk_size rows.
+    source can be a path or a binary file object (e.g. a Streamlit upload).
+    """
+    if input_format == "csv":
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    elif input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported input format: {input_format}")
+
+
+class ResultWriter:
+    """
+    Append scored chunks to a CSV or Parquet file without keeping
+    earlier chunks in memory. For CSV output, the byte offset where each
+    chunk starts is recorded so pages can be read back without a scan.
+    """
+
+    def __init__(self, path, output_format="csv"):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.path = path
+        self.output_format = output_format
+        self.columns = None
+        self.rows = 0
+        self.chunk_starts = []
+        self._file = None
+        self._parquet = None
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        if self.output_format == "csv":
+            if self._file is None:
+                self._file = open(self.path, "w", newline="", encoding="utf-8")
+                chunk.head(0).to_csv(self._file, index=False)
+            self.chunk_starts.append((self.rows, self._file.tell()))
+            chunk.to_csv(self._file, index=False, header=False)
+        else:
+            # pyarrow is only imported when Parquet is actually used
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            else:
+                # Later chunks may infer narrower types (e.g. all-null columns)
+                table = table.cast(self._parquet.schema, safe=False)
+            self._parquet.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def pages(self):
+        """Returns: ResultPages over the written file (call after close)."""
+        return ResultPages(self.path, self.output_format, self.columns or [], self.rows, self.chunk_starts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ResultPages:
+    """
+    Random access to pages of rows of a written result file, reading only
+    the part of the file that holds the page. CSV pages seek to the start
+    of the chunk holding the first row; Parquet pages read only the row
+    groups they overlap.
+    """
+
+    def __init__(self, path, output_format, columns, rows, chunk_starts=()):
+        self.path = path
+        self.output_format = output_format
+        self.columns = columns
+        self.rows = rows
+        self.chunk_starts = list(chunk_starts)
+
+    def count(self, size):
+        return max(-(-self.rows // size), 1)
+
+    def page(self, number, size):
+        """Returns: DataFrame of rows number * size to (number + 1) * size."""
+        start = number * size
+        stop = min(start + size, self.rows)
+        if start >= stop:
+            return pd.DataFrame(columns=self.columns)
+        if self.output_format == "csv":
+            return self._csv_rows(start, stop)
+        return self._parquet_rows(start, stop)
+
+    def _csv_rows(self, start, stop):
+        first_row, offset = self.chunk_starts[bisect.bisect_right(self.chunk_starts, (start, float("inf"))) - 1]
+        with open(self.path, newline="", encoding="utf-8") as f:
+            f.seek(offset)
+            frame = pd.read_csv(f, header=None, names=self.columns, skiprows=start - first_row, nrows=stop - start)
+        frame.index = pd.RangeIndex(start, stop)
+        return frame
+
+    def _parquet_rows(self, start, stop):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(self.path)
+        groups, tables, group_start = [], [], 0
+        for group in range(parquet.metadata.num_row_groups):
+            group_rows = parquet.metadata.row_group(group).num_rows
+            if group_start < stop and group_start + group_rows > start:
+                groups.append(group)
+                if len(groups) == 1:
+                    first_row = group_start
+            group_start += group_rows
+        table = pa.concat_tables([parquet.read_row_group(group) for group in groups])
+        frame = table.slice(start - first_row, stop - start).to_pandas()
+        frame.index = pd.RangeIndex(start, stop)
+        return frame
+
+
+class ResultSummary:
+    """
+    Aggregates of a batch run, updated chunk by chunk as results arrive:
+    label counts, per-label confidence histograms and sums, and label
+    counts and confidence sums per text-length bucket, plus rows per
+    cascade stage. Its size, and the size of the frames it renders for
+    charts, does not depend on the number of rows.
+    """
+
+    def __init__(self):
+        labels, buckets = len(SENTIMENT_LABELS), len(LENGTH_BUCKETS) + 1
+        self.counts = np.zeros(labels, dtype=np.int64)
+        self.confidence_sum = np.zeros(labels)
+        self.confidence_hist = np.zeros((labels, CONFIDENCE_BINS), dtype=np.int64)
+        self.bucket_counts = np.zeros((buckets, labels), dtype=np.int64)
+        self.bucket_confidence_sum = np.zeros(buckets)
+        self.stage_counts = np.zeros(len(CASCADE_STAGES), dtype=np.int64)
+        self.failed = 0
+
+    def update(self, lengths, codes, scores, stages=None):
+        """
+        Add one chunk: text lengths in characters, label codes (-1 for
+        failed rows), scores and, for the cascade, stage codes (-1 for failed rows).
+        """
+        labels, buckets = len(SENTIMENT_LABELS), len(LENGTH_BUCKETS) + 1
+        if stages is not None:
+            self.stage_counts += np.bincount(stages[stages >= 0], minlength=len(CASCADE_STAGES))
+        ok = codes >= 0
+        self.failed += int(len(codes) - ok.sum())
+        codes = codes[ok].astype(np.int64)
+        scores = np.clip(scores[ok], 0, 1)
+        bins = np.minimum((scores * CONFIDENCE_BINS).astype(np.int64), CONFIDENCE_BINS - 1)
+        length_buckets = np.searchsorted(LENGTH_BUCKETS, np.asarray(lengths)[ok], side="right")
+        self.counts += np.bincount(codes, minlength=labels)
+        self.confidence_sum += np.bincount(codes, weights=scores, minlength=labels)
+        self.confidence_hist += np.bincount(codes * CONFIDENCE_BINS + bins,
+                                            minlength=labels * CONFIDENCE_BINS).reshape(labels, CONFIDENCE_BINS)
+        self.bucket_counts += np.bincount(length_buckets * labels + codes,
+                                          minlength=buckets * labels).reshape(buckets, labels)
+        self.bucket_confidence_sum += np.bincount(length_buckets, weights=scores, minlength=buckets)
+
+    @property
+    def rows(self):
+        return int(self.counts.sum()) + self.failed
+
+    def stages(self):
+        """Returns: Rows decided by each cascade stage, or None if no stages were recorded."""
+        return dict(zip(CASCADE_STAGES, self.stage_counts.tolist())) if self.stage_counts.any() else None
+
+    def save(self, path):
+        """Write the aggregates to an .npz file, replacing it atomically."""
+        temporary = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(temporary, **{name: np.asarray(value) for name, value in vars(self).items()})
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        summary = cls()
+        with np.load(path) as arrays:
+            for name in arrays.files:
+                setattr(summary, name, arrays[name])
+        summary.failed = int(summary.failed)
+        return summary
+
+    def label_frame(self):
+        """Returns: One row per label with Count and Mean confidence."""
+        return pd.DataFrame({
+            "Sentiment": SENTIMENT_LABELS,
+            "Count": self.counts,
+            "Mean confidence": self.confidence_sum / np.maximum(self.counts, 1),
+        })
+
+    def confidence_frame(self):
+        """Returns: Long-form confidence histogram (Sentiment, Confidence bin start, Count)."""
+        edges = np.arange(CONFIDENCE_BINS) / CONFIDENCE_BINS
+        return pd.DataFrame({
+            "Sentiment": np.repeat(SENTIMENT_LABELS, CONFIDENCE_BINS),
+            "Confidence": np.tile(edges, len(SENTIMENT_LABELS)),
+            "Count": self.confidence_hist.ravel(),
+        })
+
+    def bucket_frame(self):
+        """Returns: Per text-length bucket row counts, label shares and mean confidence (non-empty buckets)."""
+        edges = (0,) + LENGTH_BUCKETS
+        names = [f"{low}-{high - 1}" for low, high in zip(edges, LENGTH_BUCKETS)] + [f"{LENGTH_BUCKETS[-1]}+"]
+        rows = self.bucket_counts.sum(axis=1)
+        frame = pd.DataFrame({"Length (chars)": names, "Rows": rows})
+        for label, column in zip(SENTIMENT_LABELS, self.bucket_counts.T):
+            frame[f"{label} share"] = column / np.maximum(rows, 1)
+        frame["Mean confidence"] = self.bucket_confidence_sum / np.maximum(rows, 1)
+        return frame[rows > 0].reset_index(drop=True)
+
+
+def _add_results(chunk, codes, scores, stages=None):
+    chunk["sentiment"] = pd.Categorical.from_codes(codes, categories=SENTIMENT_LABELS)
+    chunk["confidence"] = scores
+    if stages is not None:
+        chunk["stage"] = pd.Categorical.from_codes(stages, categories=CASCADE_STAGES)
+    return chunk
+
+
+def score_chunks(chunks, backend="vader", workers=1, use_cache=True):
+    """
+    Score DataFrame chunks (each with a text column) in input order. With
+    workers > 1, a bounded window of chunks is in flight on a process pool.
+    backend is a backend name or a loaded SentimentBackend (worker
+    processes always load their own by name). Missing texts score as ""
+    (NEUTRAL). With the cascade backend every row also gets the stage that
+    decided it.
+    Yields: (chunk with the result columns, label codes, scores, stage
+    codes or None, errors as (row within the chunk, message)).
+    """
+    # Stages are decided by VADER alone, so cached and worker-scored rows get them too
+    router = cascade_router(backend)
+
+    def finish(chunk, codes, scores, chunk_errors):
+        with stage("dataframe_assembly"):
+            stages = None
+            if router is not None:
+                stages = np.where(codes >= 0, router.stages(clean_texts(chunk["text"])), -1).astype(np.int8)
+            return _add_results(chunk, codes, scores, stages), codes, scores, stages, chunk_errors
+
+    if workers <= 1:
+        score = make_scorer(backend, use_cache)
+        for chunk in chunks:
+            _check_columns(chunk)
+            with stage("batch_score"):
+                _, codes, scores, chunk_errors = score_shard(0, clean_texts(chunk["text"]), score)
+            yield finish(chunk, codes, scores, chunk_errors)
+    else:
+        # Keep a bounded window of chunks in flight and yield them in order
+        with worker_pool(getattr(backend, "name", backend), workers, use_cache) as pool:
+            pending = deque()
+            for chunk in chunks:
+                _check_columns(chunk)
+                pending.append((chunk, pool.submit(score_shard, 0, clean_texts(chunk["text"]))))
+                if len(pending) >= 2 * workers:
+                    chunk, future = pending.popleft()
+                    yield finish(chunk, *future.result()[1:])
+            while pending:
+                chunk, future = pending.popleft()
+                yield finish(chunk, *future.result()[1:])
+
+
+def text_lengths(chunk):
+    """Returns: Length in characters of each row's text (0 for missing)."""
+    return chunk["text"].astype("string").str.len().fillna(0).to_numpy(dtype=np.int64)
+
+
+def score_file_stream(source, output_path=None, output_format="csv", input_format="csv",
+                      chunk_size=50000, backend="vader", workers=1,
+                      progress=None, preview_rows=1000, use_cache=True):
+    """
+    Score a CSV/Parquet file chunk by chunk and write the enriched rows to
+    output_path (a temp file by default). Memory stays bounded by
+    chunk_size (times the number of chunks in flight when workers > 1),
+    plus the fixed-size in-memory tier of the result cache.
+
+    backend is a backend name or a loaded SentimentBackend (see score_chunks).
+    progress(rows_done) is called after each chunk is written.
+    Returns: Dictionary with path, rows, label counts, a ResultSummary,
+    ResultPages over the output file, errors, stage counts (cascade only,
+    else None) and a preview of the first preview_rows rows.
+    """
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(suffix=OUTPUT_FORMATS[output_format][0], prefix="sentiment_")
+        os.close(fd)
+
+    summary = ResultSummary()
+    errors = []
+    rows = 0
+    chunks = _timed_chunks(read_chunks(source, chunk_size, input_format))
+    with ResultWriter(output_path, output_format) as writer:
+        for chunk, codes, scores, stages, chunk_errors in score_chunks(chunks, backend, workers, use_cache):
+            with stage("dataframe_assembly"):
+                summary.update(text_lengths(chunk), codes, scores, stages)
+                errors.extend((rows + row, message) for row, message in chunk_errors)
+            with stage("serialize"):
+                writer.write(chunk)
+            rows += len(chunk)
+            count("batch_rows_total", len(chunk))
+            if progress is not None:
+                progress(rows)
+
+    pages = writer.pages()
+    return {
+        "path": output_path,
+        "format": output_format,
+        "rows": rows,
+        "counts": dict(zip(SENTIMENT_LABELS, summary.counts.tolist())),
+        "summary": summary,
+        "pages": pages,
+        "errors": errors,
+        "stages": summary.stages(),
+        "preview": pages.page(0, preview_rows) if rows else pd.DataFrame(columns=["text", "sentiment", "confidence"]),
+    }
+
+
+def concat_results(parts, path, output_format="csv"):
+    """
+    Join result files into one file at path. parts are ResultPages over
+    files written by ResultWriter; their bytes (CSV) or Arrow tables
+    (Parquet) are copied without parsing rows into pandas.
+    Returns: ResultPages over the joined file.
+    """
+    pages = ResultPages(path, output_format, parts[0].columns if parts else [], 0)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    if output_format == "csv":
+        with open(temporary, "wb") as out:
+            for part in parts:
+                with open(part.path, "rb") as f:
+                    # Every part starts with the same header line
+                    header = f.read(part.chunk_starts[0][1])
+                    if out.tell() == 0:
+                        out.write(header)
+                    for first_row, offset in part.chunk_starts:
+                        pages.chunk_starts.append((pages.rows + first_row, out.tell() + offset - len(header)))
+                    shutil.copyfileobj(f, out)
+                pages.rows += part.rows
+    else:
+        import pyarrow.parquet as pq
+
+        with open(temporary, "wb"):
+            pass
+        writer = None
+        for part in parts:
+            table = pq.read_table(part.path)
+            if writer is None:
+                writer = pq.ParquetWriter(temporary, table.schema)
+            writer.write_table(table.cast(writer.schema, safe=False))
+            pages.rows += table.num_rows
+        if writer is not None:
+            writer.close()
+    os.replace(temporary, path)
+    return pages
+
+
+def _timed_chunks(chunks):
+    # Parsing happens lazily, inside next()
+    while True:
+        with stage("batch_read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _check_columns(chunk):
+    if "text" not in chunk.columns:
+        raise ValueError("File must contain a 'text' column.")
@@ -0,0 +1,83 @@
+import csv
+import math
+import random
+
+# Seeded synthetic data for tests and benchmarks
+
+GENRES = ["action", "comedy", "drama", "horror", "sci-fi", "thriller",
+          "romance", "animation", "documentary", "fantasy", "adventure"]
+SYLLABLES = "an bel cor dan el fin gar hol is jon kel lam mor nor os per quin ros sal tor ul van wes".split()
+TITLE_WORDS = ("the a of night day return last first dark light city river house war love story "
+               "king queen ghost star road home dream fire ice shadow secret island game").split()
+
+# Review vocabulary: plain words plus the kinds VADER reacts to
+REVIEW_WORDS = {
+    "neutral": ("the a an this that it movie film plot story acting actor actress director scene ending "
+                "script score music cast sequel character dialogue camera was is were had has of to in "
+                "with for on at by about as than then just also still i we they my our").split(),
+    "positive": "good great amazing excellent brilliant fantastic love loved enjoyed fun funny beautiful best".split(),
+    "negative": "bad terrible awful boring hate hated worst poor dull weak slow disappointing waste mess".split(),
+    "modifier": "not never very really so too quite extremely barely hardly kind of".split(),
+}
+LENGTH_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+def review_corpus(size, length="lognormal", mean_words=40, seed=0):
+    """
+    Reproducible review-like texts. length is the distribution of words
+    per review: fixed (always mean_words), uniform (1 to 2 * mean_words)
+    or lognormal (mean mean_words with a long tail of long reviews).
+    Returns: List of size strings.
+    """
+    if length not in LENGTH_DISTRIBUTIONS:
+        raise ValueError(f"length must be one of {LENGTH_DISTRIBUTIONS}")
+    rng = random.Random(seed)
+    kinds = list(REVIEW_WORDS)
+    weights = [6, 2, 2, 1]
+    texts = []
+    for _ in range(size):
+        if length == "fixed":
+            count = mean_words
+        elif length == "uniform":
+            count = rng.randint(1, 2 * mean_words)
+        else:
+            sigma = 0.8
+            count = max(1, round(rng.lognormvariate(math.log(mean_words) - sigma ** 2 / 2, sigma)))
+        words = [rng.choice(REVIEW_WORDS[kind]) for kind in rng.choices(kinds, weights, k=count)]
+        if rng.random() < 0.1:
+            shouted = rng.randrange(count)
+            words[shouted] = words[shouted].upper()
+        texts.append(" ".join(words) + rng.choice([".", "!", "?", "!!", " :)", ""]))
+    return texts
+
+
+def write_reviews_csv(path, texts):
+    """Write texts as an id,text CSV like the Batch Analysis upload. Returns: path."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "text"])
+        writer.writerows(enumerate(texts))
+    return path
+
+
+def person_name(rng):
+    return " ".join("".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).title() for _ in range(2))
+
+
+def write_movie_catalog(path, rows, people=None, seed=0):
+    """
+    Write a movie catalog CSV (title, genres, year, director, cast, rating)
+    with rows movies drawn from a pool of people (default rows // 4 names).
+    Returns: path.
+    """
+    rng = random.Random(seed)
+    pool = sorted({person_name(rng) for _ in range(people or max(rows // 4, 10))})
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("title,genres,year,director,cast,rating\n")
+        for i in range(rows):
+            title = " ".join(rng.choices(TITLE_WORDS, k=rng.randint(1, 4))).title() + f" {i}"
+            genres = "|".join(rng.sample(GENRES, rng.randint(1, 3)))
+            cast = "|".join(rng.sample(pool, min(len(pool), rng.randint(2, 6))))
+            f.write(f'"{title}",{genres},{rng.randint(1920, 2025)},{rng.choice(pool)},"{cast}",'
+                    f"{rng.uniform(1, 10):.1f}\n")
+    return path
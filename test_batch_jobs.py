@@ -0,0 +1,215 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import batch_jobs
+from batch_jobs import JobScheduler, JobStore, QueueFull, load_result, run_job
+from streaming_batch import score_file_stream
+from synthetic_data import review_corpus, write_reviews_csv
+
+# A batch job killed mid-run resumes from its last checkpointed chunk and
+# ends with exactly the output and summary of an uninterrupted run. The
+# scheduler runs at most its worker count of jobs at once, bounds the
+# queue and cancels on request.
+
+RUN_JOB = "import sys; from batch_jobs import JobStore, run_job; run_job(JobStore(sys.argv[1]), sys.argv[2])"
+
+# Dies after the summary of chunk 3 is written but before job.json records the chunk
+CRASH_BEFORE_JOB_SAVE = """
+import os, signal, sys
+from batch_jobs import JobStore, run_job
+store = JobStore(sys.argv[1])
+save = store.save
+def crash(job):
+    if job["chunks_done"] == 3:
+        os.kill(os.getpid(), signal.SIGKILL)
+    save(job)
+store.save = crash
+run_job(store, sys.argv[2])
+"""
+
+
+def read(result):
+    return pd.read_csv(result["path"]) if result["format"] == "csv" else pd.read_parquet(result["path"])
+
+
+def wait_for(condition, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@contextmanager
+def app_jobs_dir(path):
+    # The app's JobStore (and its cached scheduler) use path instead of the user's BATCH_JOBS_DIR
+    default = batch_jobs.BATCH_JOBS_DIR
+    batch_jobs.BATCH_JOBS_DIR = path
+    st.cache_resource.clear()
+    try:
+        yield
+    finally:
+        batch_jobs.BATCH_JOBS_DIR = default
+        st.cache_resource.clear()
+
+
+def test_killed_job_resumes_from_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), review_corpus(20000, seed=6) + [""] * 5)
+        store = JobStore(os.path.join(tmp, "jobs"))
+        for output_format in ("csv", "parquet"):
+            reference = score_file_stream(source, os.path.join(tmp, f"reference.{output_format}"),
+                                          output_format=output_format, chunk_size=250, use_cache=False)
+            job_id = store.create(source, name="reviews.csv", output_format=output_format, chunk_size=250)
+            worker = subprocess.Popen([sys.executable, "-c", RUN_JOB, store.root, job_id],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)))
+            wait_for(lambda: (store.get(job_id)["chunks_done"] >= 3) or worker.poll() is not None)
+            os.kill(worker.pid, signal.SIGKILL)
+            worker.wait()
+            killed = store.get(job_id)
+            assert killed["status"] == "running" and 3 <= killed["chunks_done"] < 81, killed["chunks_done"]
+
+            lock = store.lock(job_id)
+            assert run_job(store, job_id) is None  # someone else holds the job
+            lock.close()
+
+            scheduler = JobScheduler(store, workers=1)
+            assert scheduler.resume_unfinished() == [job_id]
+            scheduler.shutdown()
+            job = store.get(job_id)
+            assert job["status"] == "done" and job["rows"] == 20005 and job["chunks_done"] == 81
+            assert job["resumed_at"][0] >= killed["chunks_done"]
+            result = load_result(store, job_id)
+            assert read(result).equals(read(reference))
+            assert result["pages"].page(40, 100).equals(reference["pages"].page(40, 100))
+            for name, value in vars(reference["summary"]).items():
+                assert np.array_equal(getattr(result["summary"], name), value), name
+            assert not os.path.exists(store.path(job_id, "parts"))
+
+
+def test_crash_between_checkpoint_writes_counts_chunks_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), review_corpus(2000, seed=9))
+        reference = score_file_stream(source, os.path.join(tmp, "reference.csv"), chunk_size=250, use_cache=False)
+        store = JobStore(os.path.join(tmp, "jobs"))
+        job_id = store.create(source, chunk_size=250)
+        subprocess.run([sys.executable, "-c", CRASH_BEFORE_JOB_SAVE, store.root, job_id],
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert store.get(job_id)["chunks_done"] == 2
+        assert os.path.exists(store.path(job_id, "parts", "summary-000003.npz"))  # written, not recorded
+        job = run_job(store, job_id)
+        assert job["status"] == "done" and job["resumed_at"] == [2] and job["rows"] == 2000
+        result = load_result(store, job_id)
+        assert result["summary"].counts.sum() == 2000
+        for name, value in vars(reference["summary"]).items():
+            assert np.array_equal(getattr(result["summary"], name), value), name
+        assert read(result).equals(read(reference))
+
+
+def test_malformed_job_ids_are_rejected():
+    with tempfile.TemporaryDirectory() as tmp, app_jobs_dir(tmp):
+        store = JobStore(tmp)
+        for job_id in ("../..", "..", "/etc", "0123456789ab/../x", "0123456789AB", ""):
+            try:
+                store.path(job_id, "job.json")
+                assert False, job_id
+            except ValueError:
+                pass
+        for name in ("..", "../x", "/etc/passwd", ""):
+            try:
+                store.path("0123456789ab", name)
+                assert False, name
+            except ValueError:
+                pass
+        at = AppTest.from_file("app.py", default_timeout=120)
+        at.query_params["job"] = "../.."
+        at.run()
+        assert not at.exception, at.exception
+        assert "batch_job" not in at.session_state and "job" not in at.query_params
+
+
+def test_job_files_stay_in_the_job_directory():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), review_corpus(300, seed=10))
+        store = JobStore(os.path.join(tmp, "jobs"))
+        assert os.stat(store.root).st_mode & 0o777 == 0o700
+        job_id = store.create(source, chunk_size=100)
+        assert os.stat(store.path(job_id)).st_mode & 0o777 == 0o700
+        job = run_job(store, job_id)
+        assert job["status"] == "done" and "path" not in job["pages"]
+        # Paths planted in job.json are never followed
+        outside = os.path.join(tmp, "outside.csv")
+        write_reviews_csv(outside, review_corpus(10, seed=11))
+        job["pages"]["path"] = outside
+        store.save(job)
+        result = load_result(store, job_id)
+        assert result["path"] == store.path(job_id, "results.csv") and len(read(result)) == 300
+
+
+def test_scheduler_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), review_corpus(4000, seed=7))
+        store = JobStore(os.path.join(tmp, "jobs"))
+        scheduler = JobScheduler(store, workers=1, max_queued=3)
+        jobs = [scheduler.enqueue(source, chunk_size=200) for _ in range(3)]
+        try:
+            scheduler.enqueue(source)
+            assert False, "queue should be full"
+        except QueueFull:
+            pass
+        assert len(os.listdir(store.root)) == 3
+        scheduler.cancel(jobs[2])
+        running = []
+        while scheduler.pending():
+            running.append(sum(store.get(job_id)["status"] == "running" for job_id in jobs))
+            time.sleep(0.01)
+        scheduler.shutdown()
+        assert max(running) == 1
+        assert [store.get(job_id)["status"] for job_id in jobs] == ["done", "done", "cancelled"]
+        assert load_result(store, jobs[1])["rows"] == 4000
+
+        # A file without a text column fails the job instead of the scheduler
+        bad = os.path.join(tmp, "bad.csv")
+        pd.DataFrame({"review": ["fine"]}).to_csv(bad, index=False)
+        job_id = store.create(bad)
+        job = run_job(store, job_id)
+        assert job["status"] == "failed" and "text" in job["error"]
+
+
+def test_app_reattaches_job_from_url():
+    with tempfile.TemporaryDirectory() as tmp, app_jobs_dir(os.path.join(tmp, "jobs")):
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), review_corpus(300, seed=8))
+        store = JobStore()  # the app's store
+        job_id = store.create(source, name="reviews.csv", chunk_size=100)
+        run_job(store, job_id)
+        at = AppTest.from_file("app.py", default_timeout=120)
+        at.query_params["job"] = job_id
+        at.run()
+        assert not at.exception, at.exception
+        assert at.session_state["batch_result"]["job_id"] == job_id
+        assert any(caption.value.startswith("Rows 1-100 of 300") for caption in at.caption)
+        shutil.rmtree(store.path(job_id))
+        # An expired job is forgotten
+        at.run()
+        assert not at.exception, at.exception
+        assert "batch_job" not in at.session_state and "job" not in at.query_params
+
+
+if __name__ == "__main__":
+    test_killed_job_resumes_from_checkpoint()
+    test_crash_between_checkpoint_writes_counts_chunks_once()
+    test_malformed_job_ids_are_rejected()
+    test_job_files_stay_in_the_job_directory()
+    test_scheduler_is_bounded()
+    test_app_reattaches_job_from_url()
+    print("Batch jobs resume from their checkpoints and the scheduler stays bounded.")
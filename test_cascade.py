@@ -0,0 +1,87 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from long_documents import score_long_documents
+from sentiment_api import ScoringService
+from sentiment_backends import CASCADE_STAGES, CascadeBackend, CascadeRouter, TransformerBackend, VaderBackend
+from sentiment_cache import SentimentCache
+from streaming_batch import score_file_stream
+from synthetic_data import review_corpus, write_reviews_csv
+from tiny_models import tiny_classifier
+
+# The cascade keeps VADER's result for clear-cut texts and takes the
+# transformer's for ambiguous ones, and every path reports the stage
+# that decided each text.
+
+TEXTS = [
+    "An absolute masterpiece, I loved every minute of it.",   # clear: VADER
+    "The worst film I have seen in years. Total waste of time.",
+    "The film runs for two hours.",                           # neutral: in the band
+    "Great cast, terrible script.",                           # mixed
+    " ".join(["great"] + ["the plot"] * 100),                 # long
+]
+
+
+def load_cascade(**router):
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier = tiny_classifier(tmp)
+    return CascadeBackend(CascadeRouter(VaderBackend(), **router), TransformerBackend(classifier))
+
+
+def test_cascade_combines_stages():
+    cascade = load_cascade(band=0.25, max_words=128, mixed_ratio=0.67)
+    assert cascade.router.stages(TEXTS).tolist() == [0, 0, 1, 1, 1]
+
+    texts = TEXTS + review_corpus(300, seed=4)
+    escalate = cascade.router.stages(texts).astype(bool)
+    assert 0 < escalate.mean() < 1
+    polarity = cascade.polarity(texts)
+    vader_polarity = cascade.router.vader.polarity(texts)
+    model_polarity = cascade.transformer.long_polarity(texts)
+    assert np.allclose(polarity, np.where(escalate, model_polarity, vader_polarity), atol=1e-5)
+    # Texts that fit the model score as its truncating path scores them; longer ones are scored whole
+    transformer = cascade.transformer
+    fits = np.array([len(ids) <= transformer.max_length for ids in transformer.tokenizer(texts)["input_ids"]])
+    assert escalate[~fits].all() and 0 < fits[escalate].mean() < 1
+    assert np.allclose(polarity[fits & escalate], transformer.polarity(texts)[fits & escalate], atol=1e-5)
+    long_result = score_long_documents(transformer, [TEXTS[4]])[0]
+    assert long_result["windows"] > 1
+    positive = long_result["score"] if long_result["label"] == "POSITIVE" else 1 - long_result["score"]
+    assert abs(polarity[4] - (2 * positive - 1)) < 1e-5
+    for text in TEXTS:
+        codes, scores = cascade.analyze_batch([text])
+        result = cascade.analyze(text)
+        assert result == {"label": cascade.labels[codes[0]], "score": float(scores[0]),
+                          "stage": CASCADE_STAGES[cascade.router.stages([text])[0]]}
+    # A band of 0 with nothing long or mixed is plain VADER
+    assert not load_cascade(band=0, max_words=10**6, mixed_ratio=2).router.stages(texts).any()
+
+
+def test_stages_in_batch_and_api_results():
+    cascade = load_cascade()
+    texts = TEXTS + review_corpus(500, seed=5)
+    expected = cascade.router.stages(texts)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "reviews.csv"), texts)
+        result = score_file_stream(source, os.path.join(tmp, "out.csv"), chunk_size=128, backend=cascade,
+                                   use_cache=False)
+        output = pd.read_csv(result["path"])
+    assert output["stage"].tolist() == [CASCADE_STAGES[code] for code in expected]
+    assert result["stages"] == {"vader": int((expected == 0).sum()), "transformer": int((expected == 1).sum())}
+
+    service = ScoringService(cascade, cache=SentimentCache("cascade", "test", path=None))
+    try:
+        for _ in range(2):  # the second pass comes from the cache
+            results = service.analyze_batch(TEXTS)
+            assert [result["stage"] for result in results] == ["vader", "vader", "transformer", "transformer",
+                                                               "transformer"]
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    test_cascade_combines_stages()
+    test_stages_in_batch_and_api_results()
+    print("The cascade scores and reports its stages consistently.")
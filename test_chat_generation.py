@@ -0,0 +1,78 @@
+import tempfile
+
+import torch
+
+from chat_generation import GenerativeChatbot, load_chat_model
+from tiny_models import save_tiny_causal_lm
+
+# Replies built on the session's key/value cache must equal greedy
+# generation over the whole (trimmed) history, recomputed from scratch.
+
+MESSAGES = ["i love sci-fi movies !", "what about the acting ?", "the plot was so boring",
+            "who is your favorite director ?", "i hated the ending", "any good comedy ?"] * 4
+
+
+def reference_reply(tokenizer, model, prompt_ids, max_new_tokens):
+    inputs = torch.tensor([prompt_ids])
+    output = model.generate(inputs, attention_mask=torch.ones_like(inputs), max_new_tokens=max_new_tokens,
+                            do_sample=False, pad_token_id=tokenizer.eos_token_id)
+    return tokenizer.decode(output[0, inputs.shape[1]:], skip_special_tokens=True)
+
+
+def check_conversation(bot, tokenizer, model):
+    session, turns = bot.new_session(), []
+    for message in MESSAGES:
+        reply = bot.get_response(message, session)
+        stats = session.last_stats
+        turns.append(stats)
+        prompt_ids = session.token_ids[:-(stats["new_tokens"] + 1)]
+        assert reply == reference_reply(tokenizer, model, prompt_ids, bot.max_new_tokens), message
+        assert len(session.token_ids) <= bot.history_tokens + bot.max_new_tokens + 1
+        assert session.cached == len(session.token_ids) - 1 - (stats["new_tokens"] == bot.max_new_tokens)
+    return turns
+
+
+def load_tiny_model(seed=0):
+    # Loaded into memory, so the directory can go right away
+    with tempfile.TemporaryDirectory() as tmp:
+        return load_chat_model(save_tiny_causal_lm(tmp, seed=seed))
+
+
+def test_cached_turns_match_full_recompute():
+    tokenizer, model = load_tiny_model()
+    turns = check_conversation(GenerativeChatbot(tokenizer, model, max_new_tokens=24), tokenizer, model)
+    # Later turns only ran the new tokens through the model
+    assert all(stats["prompt_tokens"] < 16 for stats in turns[1:] if stats["cached_tokens"])
+    assert sum(stats["cached_tokens"] > 0 for stats in turns) > len(turns) // 2
+
+
+def test_history_is_trimmed_to_budget():
+    tokenizer, model = load_tiny_model(seed=1)
+    bot = GenerativeChatbot(tokenizer, model, max_new_tokens=16, history_tokens=200)
+    turns = check_conversation(bot, tokenizer, model)
+    # Trimming dropped the cache only now and then
+    assert 0 < sum(stats["cached_tokens"] == 0 for stats in turns[1:]) < len(turns) // 3
+
+
+def test_tokens_stream_and_stats():
+    tokenizer, model = load_tiny_model()
+    bot = GenerativeChatbot(tokenizer, model, max_new_tokens=24)
+    session = bot.new_session()
+    pieces = list(bot.stream_response(session, MESSAGES[0]))
+    assert len(pieces) == session.last_stats["new_tokens"] > 1
+    assert session.last_stats["ttft_s"] > 0 and session.last_stats["tokens_per_s"] > 0
+
+    # A reader that stops early leaves the session usable
+    stream = bot.stream_response(session, MESSAGES[1])
+    next(stream)
+    stream.close()
+    reply = bot.get_response(MESSAGES[2], session)
+    prompt_ids = session.token_ids[:-(session.last_stats["new_tokens"] + 1)]
+    assert reply == reference_reply(tokenizer, model, prompt_ids, bot.max_new_tokens)
+
+
+if __name__ == "__main__":
+    test_cached_turns_match_full_recompute()
+    test_history_is_trimmed_to_budget()
+    test_tokens_stream_and_stats()
+    print("KV-cached chat generation matches full recomputation.")
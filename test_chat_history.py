@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from chat_history import HistoryBuffer, chat_html
+
+# Histories stay bounded, spilled turns stay readable, and rerunning the
+# app costs the same with 10 or 10,000 chat turns in the session.
+
+
+def turns(count):
+    return [{"user": f"message {i} <b>", "bot": f"reply {i}"} for i in range(count)]
+
+
+def test_ring_buffer_and_spill():
+    dropped = HistoryBuffer(maxlen=10)
+    spilled = HistoryBuffer(maxlen=10, spill=True)
+    for entry in turns(1000):
+        dropped.append(entry)
+        spilled.append(entry)
+    assert len(dropped) == 10 and dropped.recent() == turns(1000)[-10:]
+    assert len(spilled) == 1000 and spilled.recent(3) == turns(1000)[-3:]
+    for start, stop in ((0, 7), (985, 1000), (993, 995), (500, 520), (995, 1200)):
+        assert spilled.entries(start, stop) == turns(1000)[start:stop]
+    assert spilled.page(0, 20) == (turns(1000)[980:], 980)
+    assert spilled.page(49, 20) == (turns(1000)[:20], 0)
+    assert spilled.pages(20) == 50
+    spilled.clear()
+    assert not spilled and spilled.pages(20) == 1
+    assert "&lt;b&gt;" in chat_html(turns(1))
+
+
+def rerun_seconds(count, runs=5):
+    at = AppTest.from_file("app.py", default_timeout=120)
+    history = HistoryBuffer(maxlen=200, spill=True)
+    for entry in turns(count):
+        history.append(entry)
+    at.session_state["chat_history"] = history
+    at.session_state["chat_page"] = 0
+    at.run()
+    assert not at.exception, at.exception
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def test_rerun_latency_is_flat():
+    small, large = rerun_seconds(10), rerun_seconds(10000)
+    print(f"rerun with 10 turns: {small * 1000:.0f} ms, with 10000 turns: {large * 1000:.0f} ms")
+    assert large < 1.5 * small + 0.05, (small, large)
+
+
+if __name__ == "__main__":
+    test_ring_buffer_and_spill()
+    test_rerun_latency_is_flat()
+    print("Chat history stays bounded and reruns stay flat.")
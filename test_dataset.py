@@ -1,12 +1,12 @@
 import pandas as pd
-from sentiment_analyzer import analyze_sentiment
+from sentiment_analyzer import analyze_long_sentiment
 
 # Load dataset
 df = pd.read_csv("IMDb.csv")  # Adjust path if needed
 sample_reviews = df["review"].head(5)  # First 5 reviews
 
-# Analyze sentiment
-for review in sample_reviews:
-    result = analyze_sentiment(review[:512])  # Limit to 512 tokens (model constraint)
+# Analyze sentiment of the full reviews (scored in overlapping token windows)
+for result in analyze_long_sentiment(sample_reviews):
+    review = result["text"]
     print(f"Review: {review[:100]}...")  # Print first 100 chars
-    print(f"Sentiment: {result['label']}, Confidence: {result['score']:.3f}\n")
\ No newline at end of file
+    print(f"Sentiment: {result['label']}, Confidence: {result['score']:.3f}, Windows: {result['windows']}\n")
\ No newline at end of file
@@ -1,14 +1,15 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
-import torch
+from chat_generation import GenerativeChatbot, load_chat_model
 
 # Load model and tokenizer
-tokenizer = AutoTokenizer.from_pretrained("microsoft/DialoGPT-small")
-model = AutoModelForCausalLM.from_pretrained("microsoft/DialoGPT-small")
+tokenizer, model = load_chat_model("microsoft/DialoGPT-small")
+chatbot = GenerativeChatbot(tokenizer, model)
+session = chatbot.new_session()
 
-# Test conversation
-user_input = "I love sci-fi movies!"
-inputs = tokenizer.encode(user_input + tokenizer.eos_token, return_tensors="pt")
-reply_ids = model.generate(inputs, max_length=1000, pad_token_id=tokenizer.eos_token_id)
-reply = tokenizer.decode(reply_ids[:, inputs.shape[-1]:][0], skip_special_tokens=True)
-print(f"User: {user_input}")
-print(f"Bot: {reply}")
\ No newline at end of file
+# Test conversation: each turn reuses the session's key/value cache
+for user_input in ["I love sci-fi movies!", "What should I watch tonight?"]:
+    print(f"User: {user_input}")
+    print("Bot: ", end="", flush=True)
+    for piece in chatbot.stream_response(session, user_input):
+        print(piece, end="", flush=True)
+    stats = session.last_stats
+    print(f"\n  (first token {stats['ttft_s'] * 1000:.0f} ms, {stats['tokens_per_s']:.1f} tokens/s)")
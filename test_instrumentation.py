@@ -0,0 +1,63 @@
+import time
+import timeit
+
+import instrumentation
+from instrumentation import REGISTRY, SessionLog, stage, timed, use_session_log
+
+# Stage timings land in the histograms, the session log and the
+# Prometheus output, and cost next to nothing when disabled.
+
+
+def test_stages_are_recorded():
+    REGISTRY.reset()
+    log = SessionLog()
+    use_session_log(log)
+
+    @timed("unit_test_function")
+    def slow():
+        time.sleep(0.002)
+        return 42
+
+    assert slow() == 42
+    for _ in range(3):
+        with stage("unit_test_block"):
+            pass
+    instrumentation.count("unit_test_items_total", 5)
+
+    summary = log.summary()
+    assert summary["unit_test_block"]["calls"] == 3
+    assert summary["unit_test_function"]["last_ms"] >= 2
+    # A sleep may overrun by any amount, so percentiles are checked on fixed durations
+    assert REGISTRY.summary()["unit_test_function"]["p50_ms"] >= 2.5
+    for seconds in (0.002, 0.002, 0.004, 0.03):
+        REGISTRY.observe("unit_test_fixed", seconds)
+    summary = REGISTRY.summary()["unit_test_fixed"]
+    assert summary["p50_ms"] == 2.5 and summary["p95_ms"] == 50 and summary["calls"] == 4
+
+    text = REGISTRY.prometheus()
+    assert 'app_stage_seconds_bucket{stage="unit_test_function",le="0.001"} 0' in text
+    assert 'app_stage_seconds_bucket{stage="unit_test_function",le="+Inf"} 1' in text
+    assert 'app_stage_seconds_count{stage="unit_test_block"} 3' in text
+    assert "app_unit_test_items_total 5" in text
+    use_session_log(None)
+
+
+def test_disabled_overhead_is_negligible():
+    instrumentation.ENABLED = False
+    try:
+        def block():
+            with stage("disabled"):
+                pass
+
+        per_call = min(timeit.repeat(block, number=100000, repeat=3)) / 100000
+        assert "disabled" not in REGISTRY.histograms
+    finally:
+        instrumentation.ENABLED = True
+    print(f"disabled stage(): {per_call * 1e9:.0f} ns per call")
+    assert per_call < 2e-6
+
+
+if __name__ == "__main__":
+    test_stages_are_recorded()
+    test_disabled_overhead_is_negligible()
+    print("Instrumentation records stages and is cheap when disabled.")
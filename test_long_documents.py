@@ -0,0 +1,71 @@
+import tempfile
+
+import numpy as np
+import torch
+
+from long_documents import score_long_documents
+from tiny_models import WORDS, tiny_classifier
+
+# Documents that fit one window score exactly as the pipeline scores
+# them; longer ones average their windows' logits, weighted by window
+# length, whatever order and batches the windows ran in.
+
+rng = np.random.default_rng(1)
+
+
+def document(words):
+    return " ".join(rng.choice(WORDS, size=words))
+
+
+def load_classifier():
+    # The pipeline holds the weights in memory, so the directory can go once it is loaded
+    with tempfile.TemporaryDirectory() as tmp:
+        return tiny_classifier(tmp, max_length=64)
+
+
+def test_single_window_matches_pipeline():
+    classifier = load_classifier()
+    texts = [document(n) for n in (3, 10, 40, 60)]
+    results = score_long_documents(classifier, texts, batch_size=3)
+    for result, expected in zip(results, classifier(texts)):
+        assert result["windows"] == 1 and result["label"] == expected["label"]
+        assert abs(result["score"] - expected["score"]) < 1e-5
+
+
+def test_windows_are_averaged_by_length():
+    classifier = load_classifier()
+    tokenizer, model = classifier.tokenizer, classifier.model
+    texts = [document(300), document(20), document(130)]
+    results = score_long_documents(classifier, texts, stride=16, batch_size=4)
+    assert results[1]["windows"] == 1 and results[0]["windows"] > 3
+
+    # Reference: every window on its own, unpadded
+    for text, result in zip(texts, results):
+        windows = tokenizer(text, truncation=True, max_length=64, stride=16,
+                            return_overflowing_tokens=True)["input_ids"]
+        assert len(windows) == result["windows"]
+        with torch.inference_mode():
+            logits = torch.stack([model(input_ids=torch.tensor([ids])).logits[0] for ids in windows])
+        weights = torch.tensor([len(ids) for ids in windows], dtype=torch.float)
+        probabilities = torch.softmax((logits * weights[:, None]).sum(0) / weights.sum(), dim=-1)
+        score, label_id = probabilities.max(dim=-1)
+        assert result["label"] == model.config.id2label[label_id.item()]
+        assert abs(result["score"] - score.item()) < 1e-5
+
+
+def test_stride_is_checked():
+    classifier = load_classifier()
+    assert score_long_documents(classifier, [document(200)], stride=0)[0]["windows"] > 1
+    for stride in (-1, 62, 64, 500):
+        try:
+            score_long_documents(classifier, [document(200)], stride=stride)
+            assert False, stride
+        except ValueError as e:
+            assert "stride" in str(e)
+
+
+if __name__ == "__main__":
+    test_single_window_matches_pipeline()
+    test_windows_are_averaged_by_length()
+    test_stride_is_checked()
+    print("Long documents are scored window by window and aggregated correctly.")
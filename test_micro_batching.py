@@ -0,0 +1,87 @@
+import tempfile
+import threading
+
+from micro_batching import MicroBatcher
+from tiny_models import tiny_classifier
+
+# The micro-batcher coalesces queued requests into shared forward passes,
+# returns what the pipeline returns for each text, and a request that
+# fails only fails itself.
+
+TEXTS = [
+    "a great movie",
+    "the plot was boring and the acting was terrible",
+    "i loved this film",
+    "not very good but the ending was fun",
+    "worst film ever",
+    "the director and the actress were brilliant",
+] * 4
+
+
+def test_coalesces_and_matches_pipeline():
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier = tiny_classifier(tmp)
+    batcher = MicroBatcher(classifier, max_batch_size=8, max_wait_ms=200)
+    batches = []
+    process = batcher._process
+    batcher._process = lambda batch: (batches.append(len(batch)), process(batch))
+    try:
+        futures = [batcher.submit(text) for text in TEXTS]
+        results = [future.result(timeout=60) for future in futures]
+    finally:
+        batcher.close()
+    assert sum(batches) == len(TEXTS) and max(batches) == 8 and len(batches) < len(TEXTS), batches
+    for result, expected in zip(results, classifier(TEXTS)):
+        assert result["label"] == expected["label"]
+        assert abs(result["score"] - expected["score"]) < 1e-5
+
+
+class FailingTokenizer:
+    """Delegates to a tokenizer but raises for any call that includes "BOOM"."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def __call__(self, texts, **kwargs):
+        if any("BOOM" in text for text in texts):
+            raise ValueError("cannot tokenize")
+        return self.tokenizer(texts, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.tokenizer, name)
+
+
+def test_bad_request_fails_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier = tiny_classifier(tmp)
+    batcher = MicroBatcher(classifier, max_batch_size=8, max_wait_ms=200)
+    batcher.tokenizer = FailingTokenizer(batcher.tokenizer)
+    try:
+        try:
+            batcher.submit(None)
+            assert False, "non-str input should be rejected"
+        except TypeError:
+            pass
+        good, bad, other = (batcher.submit(text) for text in ("good movie", "BOOM", "bad movie"))
+        assert good.result(timeout=60)["label"] == classifier("good movie")[0]["label"]
+        assert other.result(timeout=60)["label"] == classifier("bad movie")[0]["label"]
+        assert isinstance(bad.exception(timeout=60), ValueError)
+
+        # Concurrent callers sharing a batch with the bad one still get their results
+        results = {}
+        threads = [threading.Thread(target=lambda i=i: results.setdefault(i, batcher.submit(TEXTS[i]).result()))
+                   for i in range(6)]
+        bad = batcher.submit("BOOM again")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 6 and isinstance(bad.exception(timeout=60), ValueError)
+    finally:
+        batcher.close()
+
+
+if __name__ == "__main__":
+    test_coalesces_and_matches_pipeline()
+    test_bad_request_fails_alone()
+    print("The micro-batcher coalesces requests, matches the pipeline and isolates failures.")
@@ -0,0 +1,60 @@
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+from movie_catalog import INDEX_SUFFIX, MovieCatalog, load_catalog, split_values
+from movie_chatbot import MovieChatbot
+from synthetic_data import write_movie_catalog
+
+# Indexed lookups must return what a full scan of the source file finds,
+# best-rated first, whether the catalog is built or memory-mapped.
+
+
+def scan(frame, column, value):
+    hits = frame[[value.casefold() in {v.casefold() for v in split_values(cell)} for cell in frame[column]]]
+    return hits.sort_values("rating", ascending=False, kind="stable")["title"].tolist()
+
+
+def test_indexes_match_scans():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_movie_catalog(os.path.join(tmp, "movies.csv"), 5000)
+        frame = pd.read_csv(source)
+        catalog = load_catalog(source)
+        assert os.path.exists(os.path.join(tmp, "movies" + INDEX_SUFFIX))
+        rng = random.Random(0)
+        for loaded in (catalog, MovieCatalog.from_file(source), load_catalog(source)):
+            assert len(loaded) == len(frame)
+            for genre in ("action", "sci-fi", "Science Fiction", "western"):
+                titles = [loaded.titles[i] for i in loaded.by_genre(genre)]
+                assert titles == scan(frame, "genres", "sci-fi" if genre == "Science Fiction" else genre)
+            for _ in range(50):
+                name = rng.choice(split_values(rng.choice(frame["cast"].tolist())))
+                assert [loaded.titles[i] for i in loaded.by_actor(name.upper())] == scan(frame, "cast", name)
+                assert [loaded.titles[i] for i in loaded.by_director(name)] == scan(frame, "director", name)
+            best = frame.sort_values("rating", ascending=False, kind="stable").iloc[0]
+            movie = loaded.movie(0)
+            assert (movie["title"], movie["year"], movie["directors"]) == (best["title"], best["year"], [best["director"]])
+            assert loaded.people.index("nobody at all") == -1
+
+
+def test_chatbot_answers_from_catalog():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_movie_catalog(os.path.join(tmp, "movies.csv"), 2000)
+        frame = pd.read_csv(source)
+        bot = MovieChatbot(catalog=load_catalog(source))
+        best_comedy = scan(frame, "genres", "comedy")[0]
+        assert bot.get_response("What is the best comedy?") == f"For comedy, '{best_comedy}' is widely considered one of the best!"
+        director = frame["director"].iloc[0]
+        reply = bot.get_response(f"Do you know the director {director}?")
+        assert reply.startswith(director) and f"'{scan(frame, 'director', director)[0]}'" in reply
+        top_horror = scan(frame, "genres", "horror")[:20]
+        reply = bot.get_response("Recommend a horror movie")
+        assert reply.split("recommend '")[1].split("'. ")[0] in top_horror
+
+
+if __name__ == "__main__":
+    test_indexes_match_scans()
+    test_chatbot_answers_from_catalog()
+    print("Catalog indexes agree with full scans.")
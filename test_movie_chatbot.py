@@ -0,0 +1,61 @@
+import random
+import re
+
+from intent_matching import EntityAutomaton
+from movie_chatbot import INTENT_ORDER, MovieChatbot
+
+# The compiled matchers must pick the same intent, genre and name as
+# checking each pattern and name in turn.
+
+
+def sequential_intent(bot, text):
+    for intent in INTENT_ORDER:
+        if re.search(bot.patterns[intent], text):
+            return intent
+    return None
+
+
+def messages(bot, count=5000, seed=0):
+    rng = random.Random(seed)
+    keywords = []
+    for intent, pattern in bot.patterns.items():
+        keywords += re.sub(r"^\(\?i\)\(|\)$|\\b|\(\?:|\)", "", pattern).split("|")
+    words = keywords + bot.famous_directors + bot.famous_actors + [
+        "the", "movie", "was", "start", "badge", "stop", "nolan", "TOM HANKS", "xyz", "?", "!",
+    ]
+    for _ in range(count):
+        yield " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+
+
+def test_same_intents_as_sequential_search():
+    bot = MovieChatbot()
+    for text in messages(bot):
+        assert bot.intent_matcher.match(text) == sequential_intent(bot, text), text
+        found = bot.intent_matcher.intents(text)
+        assert (found[0] if found else None) == sequential_intent(bot, text), text
+
+
+def test_entity_automaton_matches_substring_search():
+    names = ["he", "she", "his", "hers", "Tom Hanks", "Tom", "anks", "hers"]
+    automaton = EntityAutomaton(names)
+    rng = random.Random(1)
+    for _ in range(5000):
+        text = "".join(rng.choice("hesirTom Hanks") for _ in range(rng.randint(0, 20)))
+        expected = {i for i, name in enumerate(names) if name.lower() in text.lower() and name not in names[:i]}
+        assert automaton.find(text) == expected, text
+        first = next((name for name in names if name.lower() in text.lower()), None)
+        assert automaton.first(text) == first, text
+
+
+def test_named_entities_in_responses():
+    bot = MovieChatbot()
+    assert bot.get_response("Which director made by Quentin Tarantino?").startswith("Quentin Tarantino")
+    assert bot.get_response("is meryl streep a great actress").startswith("Meryl Streep")
+    assert "'Die Hard'" in bot.get_response("What is the top action film?")
+
+
+if __name__ == "__main__":
+    test_same_intents_as_sequential_search()
+    test_entity_automaton_matches_substring_search()
+    test_named_entities_in_responses()
+    print("Compiled chatbot matchers agree with sequential search.")
@@ -0,0 +1,55 @@
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from parallel_batch import analyze_sentiment_parallel, clean_texts, score_shard
+from synthetic_data import review_corpus
+from vader_batch import BatchSentimentScorer, analyze_sentiment_batch, label_polarity
+
+# Parallel scoring puts every shard's results back in input order, a row
+# that raises only loses itself, and missing texts (empty CSV cells) score
+# NEUTRAL like "" instead of going through error isolation.
+
+
+def test_shards_match_single_process():
+    texts = review_corpus(2000, seed=10)
+    labels, scores, errors = analyze_sentiment_parallel(texts, workers=2, chunk_size=97, use_cache=False)
+    expected_labels, expected_scores = analyze_sentiment_batch(texts)
+    assert errors == []
+    assert list(labels) == list(expected_labels)
+    assert np.allclose(scores, expected_scores)
+
+
+def test_failing_rows_are_isolated():
+    texts = review_corpus(50, seed=11)
+    bad = {7, 31}
+    scorer = BatchSentimentScorer(SentimentIntensityAnalyzer())
+
+    def score(shard):
+        if any(text.startswith("BAD") for text in shard):
+            raise ValueError("bad row")
+        return label_polarity(scorer.polarity_compound(shard))
+
+    marked = [f"BAD {text}" if i in bad else text for i, text in enumerate(texts)]
+    start, codes, scores, errors = score_shard(100, marked, score)
+    expected_codes, expected_scores = score(texts)
+    good = np.array([i not in bad for i in range(len(texts))])
+    assert start == 100 and errors == [(107, "ValueError: bad row"), (131, "ValueError: bad row")]
+    assert np.array_equal(codes[good], expected_codes[good]) and (codes[~good] == -1).all()
+    assert np.allclose(scores[good], expected_scores[good]) and np.isnan(scores[~good]).all()
+
+
+def test_missing_texts_score_neutral():
+    texts = ["A wonderful film.", None, float("nan"), "", "Dreadful acting."]
+    assert clean_texts(texts) == ["A wonderful film.", "", "", "", "Dreadful acting."]
+    labels, scores, errors = analyze_sentiment_parallel(texts, workers=2, chunk_size=2, use_cache=False)
+    expected_labels, expected_scores = analyze_sentiment_batch(clean_texts(texts))
+    assert errors == []
+    assert list(labels) == list(expected_labels) and labels[1] == labels[2] == labels[3] == "NEUTRAL"
+    assert np.allclose(scores, expected_scores)
+
+
+if __name__ == "__main__":
+    test_shards_match_single_process()
+    test_failing_rows_are_isolated()
+    test_missing_texts_score_neutral()
+    print("Parallel scoring keeps order, isolates failing rows and scores missing texts.")
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.netutil import bind_sockets
+
+from sentiment_api import MAX_BATCH_TEXTS, ScoringService, make_server
+from sentiment_backends import VaderBackend, make_backend
+from sentiment_cache import SentimentCache
+from synthetic_data import review_corpus
+
+# The HTTP API returns what the app's analyze_sentiment returns, coalesces
+# concurrent single-text requests, and answers 429 instead of queueing
+# without bound.
+
+
+class SlowVader(VaderBackend):
+    def polarity(self, texts):
+        time.sleep(0.2)
+        return super().polarity(texts)
+
+
+async def with_server(service, test):
+    sockets = bind_sockets(0, "127.0.0.1")
+    server = make_server(service)
+    server.add_sockets(sockets)
+    url = f"http://127.0.0.1:{sockets[0].getsockname()[1]}"
+    try:
+        await test(url, AsyncHTTPClient())
+    finally:
+        server.stop()
+        service.close()
+
+
+async def post(client, url, body):
+    try:
+        response = await client.fetch(url, method="POST", body=json.dumps(body))
+    except HTTPClientError as e:
+        response = e.response
+    return response.code, json.loads(response.body), response.headers
+
+
+def test_matches_app_scoring():
+    backend = make_backend("vader")
+    texts = review_corpus(300, seed=1) + ["", "I love this movie!", "I love this movie!"]
+    expected = [backend.analyze(text) for text in texts]
+
+    async def test(url, client):
+        singles = await asyncio.gather(*(post(client, url + "/analyze", {"text": text}) for text in texts))
+        assert [code for code, _, _ in singles] == [200] * len(texts)
+        for (_, body, _), want in zip(singles, expected):
+            assert body["label"] == want["label"] and abs(body["score"] - want["score"]) < 1e-12
+        code, body, _ = await post(client, url + "/analyze/batch", {"texts": texts})
+        assert code == 200 and body["results"] == [result for _, result, _ in singles]
+
+        assert (await post(client, url + "/analyze", {"txt": "hi"}))[0] == 400
+        assert (await post(client, url + "/analyze/batch", {"texts": "hi"}))[0] == 400
+        assert (await post(client, url + "/analyze/batch", {"texts": ["a"] * (MAX_BATCH_TEXTS + 1)}))[0] == 413
+        health = json.loads((await client.fetch(url + "/health")).body)
+        assert health["status"] == "ok" and health["backend"] == "vader" and health["pending"] == 0
+        metrics = (await client.fetch(url + "/metrics")).body.decode()
+        assert 'stage="api_request"' in metrics and 'stage="analyze_batch"' in metrics
+
+    asyncio.run(with_server(ScoringService(backend, cache=SentimentCache("vader", "test", path=None)), test))
+
+
+def test_backpressure():
+    service = ScoringService(SlowVader(), workers=1, max_pending=4, max_batch_size=1,
+                             cache=SentimentCache("vader", "slow", path=None))
+
+    async def test(url, client):
+        responses = await asyncio.gather(*(post(client, url + "/analyze", {"text": f"text {i}"}) for i in range(10)))
+        codes = sorted(code for code, _, _ in responses)
+        assert codes == [200] * 4 + [429] * 6, codes
+        assert all(headers["Retry-After"] == "1" for code, _, headers in responses if code == 429)
+        # Health stays responsive while the scoring thread is busy
+        busy = asyncio.gather(*(post(client, url + "/analyze", {"text": f"more {i}"}) for i in range(4)))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        health = json.loads((await client.fetch(url + "/health")).body)
+        assert health["pending"] == 4 and time.perf_counter() - start < 0.1
+        await busy
+
+    asyncio.run(with_server(service, test))
+
+
+if __name__ == "__main__":
+    test_matches_app_scoring()
+    test_backpressure()
+    print("The sentiment API matches the app and sheds load with 429s.")
@@ -0,0 +1,64 @@
+import tempfile
+
+import numpy as np
+
+from sentiment_backends import QuantizedTransformerBackend, TorchScriptBackend, TransformerBackend, VaderBackend
+from synthetic_data import review_corpus
+from tiny_models import WORDS, tiny_classifier
+
+# The transformer backends map the model's own label ids (whatever their
+# order or case) to POSITIVE / NEGATIVE and agree with the float pipeline
+# they are built from; VADER's single-text path matches its batch path.
+
+rng = np.random.default_rng(0)
+TEXTS = [" ".join(rng.choice(WORDS, size=rng.integers(2, 40))) for _ in range(200)]
+
+
+def pipeline_agreement(backend, classifier):
+    """Returns: (share of labels equal to the pipeline's, score differences) over non-NEUTRAL rows."""
+    codes, scores = backend.analyze_batch(TEXTS)
+    expected = classifier(TEXTS)
+    labels = [backend.labels[code] for code in codes]
+    decided = [i for i, label in enumerate(labels) if label != "NEUTRAL"]
+    assert len(decided) > len(TEXTS) // 2
+    agree = np.mean([labels[i] == expected[i]["label"].upper() for i in decided])
+    return agree, np.array([abs(scores[i] - expected[i]["score"]) for i in decided])
+
+
+def test_transformer_backends_match_pipeline():
+    # Same weights, then label ids in the other order and lower case
+    for labels in (("NEGATIVE", "POSITIVE"), ("positive", "negative")):
+        # TorchScriptBackend reloads the weights from the classifier's directory
+        with tempfile.TemporaryDirectory() as tmp:
+            classifier = tiny_classifier(tmp, labels=labels)
+            agree, difference = pipeline_agreement(TransformerBackend(classifier), classifier)
+            assert agree == 1 and difference.max() < 1e-5, (labels, agree, difference.max())
+            agree, difference = pipeline_agreement(TorchScriptBackend(classifier), classifier)
+            assert agree == 1 and difference.max() < 1e-4, (labels, agree, difference.max())
+            # int8 rounding moves scores of this random model noticeably, but rarely across the decision line
+            agree, difference = pipeline_agreement(QuantizedTransformerBackend(classifier), classifier)
+            assert agree >= 0.9 and np.median(difference) < 0.05, (labels, agree, np.median(difference))
+
+
+def test_int8_and_torchscript_leave_the_pipeline_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier = tiny_classifier(tmp)
+        before = classifier(TEXTS[:20])
+        QuantizedTransformerBackend(classifier)
+        TorchScriptBackend(classifier)
+        assert classifier(TEXTS[:20]) == before
+
+
+def test_vader_single_text_matches_batch():
+    backend = VaderBackend()
+    texts = review_corpus(500, seed=12) + ["", "OK.", "Not bad at all!", "meh :("]
+    codes, scores = backend.analyze_batch(texts)
+    for text, code, score in zip(texts, codes, scores):
+        assert backend.analyze(text) == {"label": backend.labels[code], "score": float(score)}
+
+
+if __name__ == "__main__":
+    test_transformer_backends_match_pipeline()
+    test_int8_and_torchscript_leave_the_pipeline_alone()
+    test_vader_single_text_matches_batch()
+    print("The sentiment backends agree with their reference models.")
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from sentiment_cache import SentimentCache, normalize_text
+from vader_batch import SENTIMENT_LABELS
+
+# The result cache counts memory hits, disk hits and misses, scores each
+# distinct (whitespace-normalized) text of a batch once and broadcasts it
+# back to every row, and its SQLite tier persists across instances while
+# staying within its age and row bounds.
+
+
+class CountingScorer:
+    """Scores by text length and records every batch it is asked to score."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        codes = np.array([len(text) % 3 for text in texts], dtype=np.int8)
+        return codes, np.array([len(text) / 100 for text in texts])
+
+
+def test_counters_and_batch_dedupe():
+    cache = SentimentCache("vader", "test", path=None)
+    score = CountingScorer()
+    texts = ["good film", "bad  film", "good film", "bad film", "  good film ", "meh"]
+    codes, scores = cache.analyze_batch(texts, score, SENTIMENT_LABELS)
+    assert score.calls == [["good film", "bad  film", "meh"]]
+    expected_codes, expected_scores = score(["good film", "bad  film", "good film", "bad  film", "good film", "meh"])
+    assert np.array_equal(codes, expected_codes) and np.allclose(scores, expected_scores)
+    assert cache.stats() == {"memory_hits": 0, "disk_hits": 0, "misses": 3, "hit_rate": 0.0, "memory_size": 3}
+
+    codes_again, _ = cache.analyze_batch(["meh", "good film", "new one"], score, SENTIMENT_LABELS)
+    assert score.calls[-1] == ["new one"] and codes_again[0] == codes[-1]
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2 and stats["misses"] == 4 and stats["hit_rate"] == 2 / 6
+
+    computed = []
+    result = cache.get_or_compute("meh", lambda text: computed.append(text) or {"label": "x", "score": 0})
+    assert computed == [] and result == {"label": SENTIMENT_LABELS[len("meh") % 3], "score": 0.03}
+
+
+def test_disk_tier_persists_and_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache", "results.sqlite")
+        first = SentimentCache("vader", "r1", path=path)
+        first.analyze_batch(["one", "two", "three"], CountingScorer(), SENTIMENT_LABELS)
+
+        second = SentimentCache("vader", "r1", path=path)
+        score = CountingScorer()
+        second.analyze_batch(["one", "two", "four"], score, SENTIMENT_LABELS)
+        assert score.calls == [["four"]] and second.stats()["disk_hits"] == 2
+
+        # Another model revision never sees these results
+        other = SentimentCache("vader", "r2", path=path)
+        other.analyze_batch(["one"], score, SENTIMENT_LABELS)
+        assert other.stats()["disk_hits"] == 0
+
+        # Expired rows are neither returned nor kept
+        with sqlite3.connect(path) as db:
+            db.execute("UPDATE results SET created = ?", (time.time() - 2 * 86400,))
+        expiring = SentimentCache("vader", "r1", path=path, disk_ttl_days=1)
+        assert expiring.lookup([expiring.key("one")]) == {}
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+
+        # Only the newest disk_max_rows rows are kept
+        capped = SentimentCache("vader", "r1", path=path, disk_max_rows=5)
+        for i in range(8):
+            capped.store([(capped.key(f"text {i}"), ("NEUTRAL", 0.5))])
+            time.sleep(0.001)
+        capped.prune()
+        fresh = SentimentCache("vader", "r1", path=path, disk_max_rows=5)
+        assert sorted(fresh.lookup([fresh.key(f"text {i}") for i in range(8)])) == \
+            sorted(fresh.key(f"text {i}") for i in range(3, 8))
+
+        # A file from before the bounds is migrated, and its rows count as expired
+        old = os.path.join(tmp, "old.sqlite")
+        with sqlite3.connect(old) as db:
+            db.execute("CREATE TABLE results (key BLOB PRIMARY KEY, label TEXT, score REAL)")
+            db.execute("INSERT INTO results VALUES (?, 'NEUTRAL', 0.5)", (fresh.key("old"),))
+        migrated = SentimentCache("vader", "r1", path=old)
+        assert migrated.lookup([migrated.key("old")]) == {}
+
+
+def test_non_str_keys_are_rejected():
+    assert normalize_text("  a \n b ") == "a b"
+    for value in (None, float("nan"), 3):
+        try:
+            normalize_text(value)
+            assert False, value
+        except TypeError:
+            pass
+
+
+if __name__ == "__main__":
+    test_counters_and_batch_dedupe()
+    test_disk_tier_persists_and_is_bounded()
+    test_non_str_keys_are_rejected()
+    print("The result cache counts, deduplicates, persists and stays bounded.")
@@ -0,0 +1,111 @@
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from streaming_batch import ResultSummary, ResultWriter, _add_results, score_file_stream
+from synthetic_data import review_corpus, write_reviews_csv
+
+# Peak memory of the streaming batch pipeline should depend on the chunk
+# size, not on how many rows the input file has. The result cache is
+# switched off because its in-memory tier fills up to its own fixed size.
+# The incremental summary and the result pages match the full output, and
+# rerunning the results view costs the same for small and huge results.
+
+
+def peak_memory(rows, output_format, chunk_size=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Fixed-length rows, so every chunk needs about the same memory
+        source = write_reviews_csv(os.path.join(tmp, "input.csv"),
+                                   review_corpus(rows, length="fixed", mean_words=12, seed=0))
+        tracemalloc.start()
+        result = score_file_stream(source, os.path.join(tmp, f"output.{output_format}"),
+                                   output_format=output_format, chunk_size=chunk_size, use_cache=False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert result["rows"] == rows
+        assert sum(result["counts"].values()) == rows
+    return peak
+
+
+def test_memory_stays_flat():
+    for output_format in ("csv", "parquet"):
+        peaks = {rows: peak_memory(rows, output_format) for rows in (10000, 40000, 160000)}
+        for rows, peak in peaks.items():
+            print(f"{output_format}: {rows:7d} rows -> peak {peak / 1e6:6.1f} MB")
+        # 16x more rows must not mean meaningfully more memory
+        assert peaks[160000] < 1.5 * peaks[10000], peaks
+
+
+def test_summary_and_pages_match_output():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_reviews_csv(os.path.join(tmp, "input.csv"), review_corpus(12345, seed=3))
+        for output_format in ("csv", "parquet"):
+            result = score_file_stream(source, os.path.join(tmp, f"output.{output_format}"),
+                                       output_format=output_format, chunk_size=1000, use_cache=False)
+            path = result["path"]
+            full = pd.read_csv(path) if output_format == "csv" else pd.read_parquet(path)
+            summary, pages = result["summary"], result["pages"]
+            assert summary.rows == len(full) and pages.count(100) == 124
+            counts = full["sentiment"].value_counts()
+            assert summary.label_frame().set_index("Sentiment")["Count"].to_dict() == counts.to_dict()
+            assert summary.confidence_frame()["Count"].sum() == len(full)
+            lengths = full["text"].str.len()
+            assert summary.bucket_frame()["Rows"].tolist() == [
+                count for count in pd.cut(lengths, [0, 50, 100, 200, 500, 1000, 2000, np.inf], right=False)
+                .value_counts(sort=False).tolist() if count]
+            for number, size in ((0, 100), (123, 100), (7, 999), (12, 1000), (200, 100)):
+                page = pages.page(number, size)
+                expected = full.iloc[number * size:(number + 1) * size]
+                assert page.index.equals(expected.index)
+                assert page["text"].tolist() == expected["text"].tolist()
+                assert np.allclose(page["confidence"], expected["confidence"])
+
+
+def fake_result(tmp, rows, chunk_size=50000):
+    """A written result and its summary, without scoring, for timing the results view."""
+    rng = np.random.default_rng(0)
+    summary = ResultSummary()
+    path = os.path.join(tmp, f"result_{rows}.csv")
+    with ResultWriter(path) as writer:
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            codes, scores = rng.integers(0, 3, size).astype(np.int8), rng.random(size)
+            chunk = pd.DataFrame({"id": np.arange(start, start + size), "text": "some review text"})
+            summary.update(np.full(size, 16), codes, scores)
+            writer.write(_add_results(chunk, codes, scores))
+    return {"path": path, "format": "csv", "rows": rows, "summary": summary, "pages": writer.pages(), "errors": []}
+
+
+def results_view_seconds(result, runs=5):
+    at = AppTest.from_file("app.py", default_timeout=120)
+    at.session_state["batch_result"] = result
+    at.session_state["batch_page_number"] = 1
+    at.run()
+    assert not at.exception, at.exception
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def test_results_view_is_flat():
+    with tempfile.TemporaryDirectory() as tmp:
+        small = results_view_seconds(fake_result(tmp, 1000))
+        large = results_view_seconds(fake_result(tmp, 1000000))
+    print(f"results view with 1000 rows: {small * 1000:.0f} ms, with 1000000 rows: {large * 1000:.0f} ms")
+    assert large < 1.5 * small + 0.05, (small, large)
+
+
+if __name__ == "__main__":
+    test_memory_stays_flat()
+    test_summary_and_pages_match_output()
+    test_results_view_is_flat()
+    print("Streaming batch memory stays flat and the results view does not grow with the row count.")
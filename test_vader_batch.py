@@ -0,0 +1,78 @@
+import random
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from synthetic_data import review_corpus
+from vader_batch import BatchSentimentScorer, analyze_sentiment_batch
+
+# The vectorized scorer must give exactly the compound score of
+# SentimentIntensityAnalyzer.polarity_scores, including VADER's special
+# cases: negation, "but", idioms, ALL CAPS, "!"/"?" emphasis, emoticons
+# and emoji.
+
+SPECIAL_CASES = [
+    "The movie was good.",
+    "The movie was not good.",
+    "The movie wasn't good at all.",
+    "It isn't really bad, never so bad.",
+    "Without a doubt the best film this year.",
+    "The acting was great, but the plot was awful.",
+    "The plot was awful but the acting was GREAT!",
+    "I liked it but... it was way too long",
+    "That ending was the bomb.",
+    "The sequel was the kiss of death for the franchise.",
+    "It doesn't cut the mustard.",
+    "Yeah right, as if that was funny.",
+    "He is a bad ass actor.",
+    "It was kind of good, sort of boring.",
+    "At least the music was nice.",
+    "GREAT movie!!!",
+    "Great movie!!!!!!",
+    "Is it good???",
+    "Is it good?",
+    "THE WORST. FILM. EVER.",
+    "SO GOOD, so very good",
+    "Extremely boring, hardly funny, barely watchable.",
+    "I loved it :) :D <3",
+    "Awful :( :-( </3",
+    "Loved it 😍🔥 but the ending 😢",
+    "👍",
+    "",
+    "   ",
+    "!!!",
+    "no",
+    "No no no, not this again.",
+    "\"Great\" 'acting', (terrible) plot... really?!",
+    "It was okay-ish; not great, not terrible.",
+]
+
+
+def test_matches_polarity_scores():
+    analyzer = SentimentIntensityAnalyzer()
+    scorer = BatchSentimentScorer(analyzer)
+    rng = random.Random(13)
+    # Special cases alone and glued into reviews, so they also meet each other's context
+    texts = SPECIAL_CASES + [" ".join(rng.sample(SPECIAL_CASES, 3)) for _ in range(300)]
+    texts += review_corpus(1000, seed=13)
+    expected = [analyzer.polarity_scores(text)["compound"] for text in texts]
+    compound = scorer.polarity_compound(texts)
+    mismatches = [(text, got, want) for text, got, want in zip(texts, compound.tolist(), expected) if got != want]
+    assert not mismatches, mismatches[:5]
+    # Scoring one at a time, or in another order, gives the same scores
+    assert scorer.polarity_compound(texts[::-1]).tolist() == expected[::-1]
+    assert [scorer.polarity_compound([text])[0] for text in SPECIAL_CASES] == expected[:len(SPECIAL_CASES)]
+
+
+def test_missing_texts_score_as_empty():
+    scorer = BatchSentimentScorer(SentimentIntensityAnalyzer())
+    compound, positive, negative = scorer.polarity_details(["Great!", None, float("nan"), "", 42])
+    assert compound.tolist()[1:4] == [0.0, 0.0, 0.0] and positive[1] == negative[2] == 0
+    assert compound[4] == scorer.polarity_compound(["42"])[0]
+    labels, _ = analyze_sentiment_batch([None, float("nan")])
+    assert list(labels) == ["NEUTRAL", "NEUTRAL"]
+
+
+if __name__ == "__main__":
+    test_matches_polarity_scores()
+    test_missing_texts_score_as_empty()
+    print("Batch VADER scores match polarity_scores exactly.")
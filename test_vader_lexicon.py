@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from sentiment_backends import VaderBackend
+from synthetic_data import review_corpus
+from vader_batch import BatchSentimentScorer, lexicon_revision
+from sentiment_cache import CACHE_DIR
+from vader_lexicon import VADER_LEXICON_PATH, MappedSentimentIntensityAnalyzer, compile_lexicon, load_analyzer
+
+# The memory-mapped lexicon holds exactly NLTK's lexicon, boosters and
+# negations, so every score and cache key matches the stock analyzer. A
+# compiled file from another lexicon text, or one other users could have
+# written, is never mapped.
+
+
+def test_mapped_analyzer_matches_nltk():
+    stock = SentimentIntensityAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vader.lexicon")
+        compile_lexicon(path, stock)
+        mapped = MappedSentimentIntensityAnalyzer(path)
+
+        assert len(mapped.lexicon) == len(stock.lexicon) and set(mapped.lexicon) == set(stock.lexicon)
+        assert all(mapped.lexicon[word] == valence for word, valence in stock.lexicon.items())
+        assert mapped.constants.BOOSTER_DICT == stock.constants.BOOSTER_DICT
+        assert mapped.constants.NEGATE == stock.constants.NEGATE
+        longest = max(stock.lexicon, key=len)
+        for word in ("", "nope", longest + "s", longest[:-1], "good\0", ":D", ":d", "naïve"):
+            assert (word in mapped.lexicon) == (word in stock.lexicon), word
+            assert mapped.lexicon.get(word) == stock.lexicon.get(word), word
+
+        rng = random.Random(0)
+        words = list(stock.lexicon) + "not very NEVER so kind of the least but GREAT :) !!".split()
+        texts = review_corpus(2000, seed=2) + [" ".join(rng.choices(words, k=rng.randint(1, 40))) for _ in range(2000)]
+        texts += ["", "I LOVE this movie!!!", "It was not the least bit good, but the cast was great?!"]
+        for text in texts:
+            assert mapped.polarity_scores(text) == stock.polarity_scores(text), text
+        expected = BatchSentimentScorer(stock).polarity_compound(texts)
+        assert (BatchSentimentScorer(mapped).polarity_compound(texts) == expected).all()
+        assert lexicon_revision(mapped) == lexicon_revision(stock)
+
+
+def test_load_analyzer_compiles_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vader.lexicon")
+        assert isinstance(load_analyzer(path), MappedSentimentIntensityAnalyzer) and os.path.exists(path)
+        built = os.path.getmtime(path)
+        assert isinstance(load_analyzer(path), MappedSentimentIntensityAnalyzer)
+        assert os.path.getmtime(path) == built
+        assert type(load_analyzer("")) is SentimentIntensityAnalyzer
+        assert VaderBackend(load_analyzer(path)).revision == VaderBackend(SentimentIntensityAnalyzer()).revision
+
+
+def test_foreign_lexicons_are_not_mapped():
+    assert os.path.dirname(VADER_LEXICON_PATH) == CACHE_DIR or "VADER_LEXICON_PATH" in os.environ
+    stock = SentimentIntensityAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Valences changed along with the text they claim to come from
+        path = os.path.join(tmp, "vader.lexicon")
+        poisoned = SentimentIntensityAnalyzer()
+        poisoned.lexicon = {word: -valence for word, valence in poisoned.lexicon.items()}
+        poisoned.lexicon_file += "\nextra\t1.0\t0.0\t[1]"
+        compile_lexicon(path, poisoned)
+        try:
+            MappedSentimentIntensityAnalyzer(path)
+            assert False, "a lexicon compiled from another text must be rejected"
+        except ValueError:
+            pass
+        # load_analyzer compiles NLTK's lexicon over it instead
+        analyzer = load_analyzer(path)
+        assert isinstance(analyzer, MappedSentimentIntensityAnalyzer)
+        assert analyzer.polarity_scores("great fun") == stock.polarity_scores("great fun")
+
+        # A file others could write is not mapped at all
+        os.chmod(path, 0o666)
+        assert type(load_analyzer(path)) is SentimentIntensityAnalyzer
+        os.chmod(path, 0o644)
+        os.chmod(tmp, 0o777)
+        assert type(load_analyzer(path)) is SentimentIntensityAnalyzer
+        os.chmod(tmp, 0o700)
+
+
+if __name__ == "__main__":
+    test_mapped_analyzer_matches_nltk()
+    test_load_analyzer_compiles_once()
+    test_foreign_lexicons_are_not_mapped()
+    print("The compiled VADER lexicon scores exactly like NLTK's.")
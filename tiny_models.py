@@ -0,0 +1,119 @@
+import torch
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+from transformers import (
+    DistilBertConfig,
+    DistilBertForSequenceClassification,
+    GPT2Config,
+    GPT2LMHeadModel,
+    PreTrainedTokenizerFast,
+    pipeline,
+)
+
+# Small randomly initialized models for exercising the transformer code
+# paths offline. Their predictions are meaningless but deterministic.
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+WORDS = (
+    "the a an and or but not no never very really so too quite this that it is was were be been "
+    "i you he she we they my your movie film plot story acting actor actress director scene ending "
+    "good great amazing excellent brilliant fantastic love loved like enjoyed fun funny beautiful best "
+    "bad terrible awful boring hate hated worst poor dull weak slow disappointing waste mess "
+    "of to in on at for with from by about as than then just only also even still "
+    "! ? . , ' \""
+).split()
+
+
+def build_tokenizer(max_length=128):
+    """WordPiece-free word-level tokenizer with BERT-style special tokens."""
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.Lowercase()
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B [SEP]",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])],
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        unk_token="[UNK]",
+        pad_token="[PAD]",
+        cls_token="[CLS]",
+        sep_token="[SEP]",
+        mask_token="[MASK]",
+        model_max_length=max_length,
+        model_input_names=["input_ids", "attention_mask"],
+    )
+
+
+def save_tiny_classifier(path, dim=64, layers=2, max_length=128, seed=0, labels=("NEGATIVE", "POSITIVE")):
+    """
+    Save a tiny DistilBERT sentiment classifier with the same label names
+    as the default sentiment-analysis pipeline model (labels, by label id).
+    Returns: path, ready for pipeline("sentiment-analysis", model=path).
+    """
+    torch.manual_seed(seed)
+    tokenizer = build_tokenizer(max_length)
+    config = DistilBertConfig(
+        vocab_size=len(tokenizer),
+        dim=dim,
+        hidden_dim=4 * dim,
+        n_layers=layers,
+        n_heads=4,
+        max_position_embeddings=max_length,
+        pad_token_id=tokenizer.pad_token_id,
+        initializer_range=0.3,
+        id2label=dict(enumerate(labels)),
+        label2id={label: i for i, label in enumerate(labels)},
+    )
+    model = DistilBertForSequenceClassification(config).eval()
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+def tiny_classifier(path, **kwargs):
+    """
+    Save a tiny classifier into path (kwargs as for save_tiny_classifier) and load it.
+    Returns: A sentiment-analysis pipeline. Some backends reload its weights, so path must outlive it.
+    """
+    return pipeline("sentiment-analysis", model=save_tiny_classifier(path, **kwargs))
+
+
+def build_chat_tokenizer(max_length=256):
+    """Word-level tokenizer whose only special token is a DialoGPT-style EOS."""
+    eos = "<|endoftext|>"
+    vocab = {token: i for i, token in enumerate([eos, "[UNK]"] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.Lowercase()
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer,
+        unk_token="[UNK]",
+        eos_token=eos,
+        bos_token=eos,
+        model_max_length=max_length,
+    )
+
+
+def save_tiny_causal_lm(path, dim=64, layers=2, max_length=256, seed=0):
+    """
+    Save a tiny GPT-2 causal LM laid out like DialoGPT (turns end with EOS).
+    Returns: path, ready for AutoModelForCausalLM.from_pretrained(path).
+    """
+    torch.manual_seed(seed)
+    tokenizer = build_chat_tokenizer(max_length)
+    config = GPT2Config(
+        vocab_size=len(tokenizer),
+        n_embd=dim,
+        n_layer=layers,
+        n_head=4,
+        n_positions=max_length,
+        initializer_range=0.3,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    model = GPT2LMHeadModel(config).eval()
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
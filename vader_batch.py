@@ -0,0 +1,358 @@
+import hashlib
+import string
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from instrumentation import stage
+
+# Label order used for the categorical sentiment column
+SENTIMENT_LABELS = ["POSITIVE", "NEUTRAL", "NEGATIVE"]
+
+# Polarity within this distance of zero is labelled NEUTRAL
+NEUTRAL_BAND = 0.05
+
+_PUNCTUATION = set(string.punctuation)
+
+
+def _as_text(text):
+    # Missing values (None, NaN, as empty CSV cells read) score as "", anything else as its str
+    if isinstance(text, str):
+        return text
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+    return str(text)
+
+
+def _strip_punctuation(token, punc_list):
+    """
+    Apply SentiText's punctuation rule to a single token.
+    Returns the cleaned token, or None if VADER would drop it.
+    """
+    if len(token) <= 1:
+        return None
+    # Leading punctuation, e.g. '"great' -> 'great'
+    i = 0
+    while i < len(token) and token[i] in _PUNCTUATION:
+        i += 1
+    if 0 < i < len(token):
+        rest = token[i:]
+        if token[:i] in punc_list and len(rest) > 1 and not _PUNCTUATION.intersection(rest):
+            return rest
+    # Trailing punctuation, e.g. 'great!!' -> 'great'
+    j = len(token)
+    while j > 0 and token[j - 1] in _PUNCTUATION:
+        j -= 1
+    if 0 < j < len(token):
+        rest = token[:j]
+        if token[j:] in punc_list and len(rest) > 1 and not _PUNCTUATION.intersection(rest):
+            return rest
+    return token
+
+
+class BatchSentimentScorer:
+    """
+    Vectorized VADER scoring for many texts at once.
+
+    Texts are tokenized once, every distinct token is looked up in the lexicon
+    a single time, and the booster, negation, idiom, "least", "but", caps and
+    punctuation rules run as array operations over all tokens of the batch.
+    Compound scores match SentimentIntensityAnalyzer.polarity_scores.
+    """
+
+    def __init__(self, analyzer=None):
+        self.analyzer = analyzer if analyzer is not None else SentimentIntensityAnalyzer()
+        self.lexicon = self.analyzer.lexicon
+        self.constants = self.analyzer.constants
+        self.punc_list = set(self.constants.PUNC_LIST)
+
+    def _tokenize(self, texts):
+        """
+        Split every text once and intern the tokens.
+        Returns: (token codes, distinct cleaned tokens, document index per token).
+        """
+        split = [text.split() for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in split), dtype=np.int64, count=len(split))
+        flat = np.empty(int(lengths.sum()), dtype=object)
+        flat[:] = [token for tokens in split for token in tokens]
+        doc = np.repeat(np.arange(len(split)), lengths)
+
+        # Punctuation stripping only depends on the token itself,
+        # so it runs once per distinct raw token
+        raw_codes, raw_uniques = pd.factorize(flat)
+        cleaned = [_strip_punctuation(token, self.punc_list) for token in raw_uniques]
+        keep = np.array([c is not None for c in cleaned], dtype=bool)
+        clean_codes, uniques = pd.factorize(np.array([c or "" for c in cleaned], dtype=object))
+
+        kept = keep[raw_codes]
+        return clean_codes[raw_codes[kept]], list(uniques), doc[kept]
+
+    def _token_features(self, uniques):
+        """Per-distinct-token lookups; everything else indexes into these."""
+        c = self.constants
+        lowers = [u.lower() for u in uniques]
+        if hasattr(self.lexicon, "lookup"):
+            # A compiled lexicon looks up all tokens in one vectorized search
+            valence, in_lex = self.lexicon.lookup(lowers)
+        else:
+            valence = np.array([self.lexicon.get(w, 0.0) for w in lowers], dtype=np.float64)
+            in_lex = np.array([w in self.lexicon for w in lowers], dtype=bool)
+        booster = np.array([c.BOOSTER_DICT.get(w, 0.0) for w in lowers], dtype=np.float64)
+        is_booster = np.array([w in c.BOOSTER_DICT for w in lowers], dtype=bool)
+        negated = np.array([w in c.NEGATE or "n't" in w for w in lowers], dtype=bool)
+        is_upper = np.array([u.isupper() for u in uniques], dtype=bool)
+
+        def lower_is(*words):
+            return np.array([w in words for w in lowers], dtype=bool)
+
+        def raw_is(*words):
+            return np.array([u in words for u in uniques], dtype=bool)
+
+        return {
+            "valence": valence,
+            "in_lex": in_lex,
+            "booster": booster,
+            "is_booster": is_booster,
+            "negated": negated,
+            "is_upper": is_upper,
+            "kind": lower_is("kind"),
+            "of": lower_is("of"),
+            "least": lower_is("least"),
+            "at_very": lower_is("at", "very"),
+            "but": lower_is("but"),
+            "never": raw_is("never"),
+            "so_this": raw_is("so", "this"),
+        }
+
+    def _idioms(self, valence, sel, codes, pos, n_doc, code_of):
+        """Vectorized _idioms_check for the token positions in sel."""
+        c = self.constants
+        last = len(codes) - 1
+        v = valence[sel]
+        back = pos[sel] > 2
+        ahead_one = n_doc[sel] - 1 > pos[sel]
+        ahead_two = n_doc[sel] - 1 > pos[sel] + 1
+
+        def phrase_match(phrase, offsets, valid):
+            words = phrase.split(" ")
+            ids = [code_of.get(w) for w in words]
+            if len(words) != len(offsets) or None in ids:
+                return None
+            hit = valid.copy()
+            for word_id, offset in zip(ids, offsets):
+                hit &= codes[np.clip(sel + offset, 0, last)] == word_id
+            return hit
+
+        # Lowest precedence first, so earlier sequences overwrite later ones
+        sequences = [
+            ((-3, -2), back),
+            ((-3, -2, -1), back),
+            ((-2, -1), back),
+            ((-2, -1, 0), back),
+            ((-1, 0), back),
+            ((0, 1), ahead_one),
+            ((0, 1, 2), ahead_two),
+        ]
+        for offsets, valid in sequences:
+            for idiom, value in c.SPECIAL_CASE_IDIOMS.items():
+                hit = phrase_match(idiom, offsets, valid)
+                if hit is not None:
+                    v = np.where(hit, float(value), v)
+
+        # Booster/dampener bi-grams such as 'sort of' or 'kind of'
+        bigram = np.zeros(len(sel), dtype=bool)
+        for phrase in c.BOOSTER_DICT:
+            for offsets in ((-3, -2), (-2, -1)):
+                hit = phrase_match(phrase, offsets, back)
+                if hit is not None:
+                    bigram |= hit
+        valence = valence.copy()
+        valence[sel] = np.where(bigram, v + c.B_DECR, v)
+        return valence
+
+    def _token_valences(self, codes, uniques, doc, n_docs, f):
+        """Valence of every token position, as sentiment_valence computes it."""
+        c = self.constants
+        total = len(codes)
+        n_per_doc = np.bincount(doc, minlength=n_docs)
+        starts = np.concatenate(([0], np.cumsum(n_per_doc)[:-1]))
+        pos = np.arange(total) - starts[doc]
+        n_doc = n_per_doc[doc]
+
+        caps = np.bincount(doc, weights=f["is_upper"][codes], minlength=n_docs)
+        cap_differential = n_per_doc - caps
+        is_cap_diff = ((cap_differential > 0) & (cap_differential < n_per_doc))[doc]
+
+        # Codes of the tokens 1-3 places back (only meaningful where pos >= k)
+        idx = np.arange(total)
+        back_codes = {k: codes[np.maximum(idx - k, 0)] for k in (1, 2, 3)}
+
+        def prev(feature, k):
+            return feature[back_codes[k]]
+
+        lower_next_of = f["of"][codes[np.minimum(idx + 1, max(total - 1, 0))]]
+        skipped = ((pos < n_doc - 1) & f["kind"][codes] & lower_next_of) | f["is_booster"][codes]
+        scored = f["in_lex"][codes] & ~skipped
+
+        valence = f["valence"][codes].copy()
+        upper_here = f["is_upper"][codes] & is_cap_diff
+        valence = np.where(upper_here & (valence > 0), valence + c.C_INCR, valence)
+        valence = np.where(upper_here & ~(valence > 0) & f["in_lex"][codes], valence - c.C_INCR, valence)
+
+        code_of = {u: i for i, u in enumerate(uniques)}
+        for start_i in range(3):
+            k = start_i + 1
+            mask = scored & (pos > start_i) & ~prev(f["in_lex"], k)
+
+            # scalar_inc_dec of the preceding word
+            s = prev(f["booster"], k)
+            s = np.where(valence < 0, s * -1, s)
+            cap_boost = prev(f["is_booster"], k) & prev(f["is_upper"], k) & is_cap_diff
+            s = np.where(cap_boost & (valence > 0), s + c.C_INCR, s)
+            s = np.where(cap_boost & ~(valence > 0), s - c.C_INCR, s)
+            if start_i == 1:
+                s = np.where(s != 0, s * 0.95, s)
+            if start_i == 2:
+                s = np.where(s != 0, s * 0.9, s)
+            valence = np.where(mask, valence + s, valence)
+
+            # _never_check
+            if start_i == 0:
+                factor = np.where(prev(f["negated"], 1), c.N_SCALAR, 1.0)
+                apply = mask & prev(f["negated"], 1)
+            elif start_i == 1:
+                never_so = prev(f["never"], 2) & prev(f["so_this"], 1)
+                neg = ~never_so & prev(f["negated"], 2)
+                factor = np.where(never_so, 1.5, c.N_SCALAR)
+                apply = mask & (never_so | neg)
+            else:
+                never_so = (prev(f["never"], 3) & prev(f["so_this"], 2)) | prev(f["so_this"], 1)
+                neg = ~never_so & prev(f["negated"], 3)
+                factor = np.where(never_so, 1.25, c.N_SCALAR)
+                apply = mask & (never_so | neg)
+            valence = np.where(apply, valence * factor, valence)
+
+            if start_i == 2:
+                sel = np.flatnonzero(mask)
+                if len(sel):
+                    valence = self._idioms(valence, sel, codes, pos, n_doc, code_of)
+
+        # _least_check
+        least = scored & (pos > 0) & ~prev(f["in_lex"], 1) & prev(f["least"], 1)
+        least &= (pos == 1) | ~prev(f["at_very"], 2)
+        valence = np.where(least, valence * c.N_SCALAR, valence)
+
+        valence = np.where(scored, valence, 0.0)
+        return valence, pos, n_per_doc
+
+    def polarity_compound(self, texts):
+        """
+        Compound score for each text, equal to
+        polarity_scores(text)["compound"] for the same analyzer.
+        """
+        return self.polarity_details(texts)[0]
+
+    def polarity_details(self, texts):
+        """
+        Compound score plus the positive and negative sentiment sums that
+        polarity_scores splits into pos and neg (before punctuation emphasis).
+        Returns: (compound, positive sums, negative sums) as numpy arrays.
+        """
+        texts = [_as_text(text) for text in texts]
+        n_docs = len(texts)
+        with stage("tokenize"):
+            codes, uniques, doc = self._tokenize(texts)
+        f = self._token_features(uniques)
+
+        valence, pos, n_per_doc = self._token_valences(codes, uniques, doc, n_docs, f)
+
+        # polarity_scores scores each token at the index of its first occurrence
+        key = doc.astype(np.int64) * len(uniques) + codes
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        sentiments = valence[first[inverse.ravel()]]
+
+        # _but_check: halve before the first "but", boost after it
+        is_but = f["but"][codes]
+        but_pos = np.full(n_docs, n_per_doc.max(initial=0))
+        np.minimum.at(but_pos, doc[is_but], pos[is_but])
+        has_but = np.zeros(n_docs, dtype=bool)
+        has_but[doc[is_but]] = True
+        bi = but_pos[doc]
+        has_but = has_but[doc]
+        sentiments = np.where(has_but & (pos < bi), sentiments * 0.5, sentiments)
+        sentiments = np.where(has_but & (pos > bi), sentiments * 1.5, sentiments)
+
+        # score_valence
+        sum_s = np.bincount(doc, weights=sentiments, minlength=n_docs)
+        positive = np.bincount(doc, weights=np.where(sentiments > 0, sentiments + 1, 0.0), minlength=n_docs)
+        negative = np.bincount(doc, weights=np.where(sentiments < 0, sentiments - 1, 0.0), minlength=n_docs)
+        ep = np.minimum(np.fromiter((t.count("!") for t in texts), dtype=np.int64, count=n_docs), 4) * 0.292
+        qm_count = np.fromiter((t.count("?") for t in texts), dtype=np.int64, count=n_docs)
+        qm = np.where(qm_count > 1, np.where(qm_count <= 3, qm_count * 0.18, 0.96), 0)
+        amplifier = ep + qm
+        sum_s = np.where(sum_s > 0, sum_s + amplifier, np.where(sum_s < 0, sum_s - amplifier, sum_s))
+        compound = sum_s / np.sqrt((sum_s * sum_s) + 15)
+        # Python's round() so ties resolve exactly like polarity_scores
+        return np.array([round(x, 4) for x in compound.tolist()], dtype=np.float64), positive, negative
+
+    def analyze(self, texts):
+        """
+        Label and confidence for each text, using the same thresholds
+        and 0-1 scaling as analyze_sentiment in app.py.
+        Returns: (labels as pandas.Categorical, scores as numpy array).
+        """
+        codes, scores = label_polarity(self.polarity_compound(texts))
+        labels = pd.Categorical.from_codes(codes, categories=SENTIMENT_LABELS)
+        return labels, scores
+
+
+def label_polarity(polarity, band=NEUTRAL_BAND):
+    """
+    Map polarity in [-1, 1] (e.g. VADER compound) to label codes into
+    SENTIMENT_LABELS and 0-1 confidence, as analyze_sentiment in app.py does.
+    Returns: (label codes, scores) as numpy arrays.
+    """
+    polarity = np.asarray(polarity, dtype=np.float64)
+    positive = polarity >= band
+    negative = polarity <= -band
+    codes = np.where(positive, 0, np.where(negative, 2, 1)).astype(np.int8)
+    scores = np.where(positive, (polarity + 1) / 2, np.where(negative, (1 - polarity) / 2, 0.5))
+    return codes, scores
+
+
+def label_polarity_one(polarity, band=NEUTRAL_BAND):
+    """Returns: (label, score) for one polarity, as label_polarity maps it."""
+    if polarity >= band:
+        return SENTIMENT_LABELS[0], (polarity + 1) / 2
+    if polarity <= -band:
+        return SENTIMENT_LABELS[2], (1 - polarity) / 2
+    return SENTIMENT_LABELS[1], 0.5
+
+
+def lexicon_revision(analyzer):
+    """Short fingerprint of the analyzer's lexicon, used in cache keys."""
+    # A compiled lexicon records the digest of the text it was built from
+    digest = getattr(analyzer, "lexicon_sha1", None) or hashlib.sha1(analyzer.lexicon_file.encode("utf-8")).hexdigest()
+    return "vader-" + digest[:12]
+
+
+@lru_cache(maxsize=None)
+def _scorer_for(analyzer):
+    return BatchSentimentScorer(analyzer)
+
+
+def analyze_sentiment_batch(texts, analyzer=None):
+    """
+    Analyze sentiment of many texts in one call.
+    Returns: (labels, scores) columns ready to assign to a DataFrame.
+    """
+    if analyzer is None:
+        analyzer = _default_analyzer()
+    return _scorer_for(analyzer).analyze(list(texts))
+
+
+@lru_cache(maxsize=1)
+def _default_analyzer():
+    return SentimentIntensityAnalyzer()
@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import os
+import stat
+import zipfile
+from collections.abc import Mapping
+from functools import lru_cache
+
+import nltk
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+from movie_catalog import map_index, write_index
+from sentiment_cache import CACHE_DIR
+
+# Precompiled VADER lexicon.
+#
+# SentimentIntensityAnalyzer() reads vader_lexicon.txt out of NLTK's zip
+# and parses its 7,500 lines into a dict, in every process. compile_lexicon
+# does that once and writes the lexicon, booster words and negations as
+# sorted fixed-width UTF-8 keys with float64 values, in the memory-mapped
+# index format of movie_catalog. MappedSentimentIntensityAnalyzer maps the
+# file instead of parsing, so it starts almost instantly and every process
+# on the host shares the same pages. Valences stay float64 so every score
+# is identical to NLTK's.
+#
+# The file decides scores that go into the shared result cache, so it is
+# only mapped from a location no other user can write, and only if it was
+# compiled from the vader_lexicon.txt NLTK has now (the digest is
+# recomputed from the text, not taken from the file).
+
+LEXICON_MAGIC = b"VADERLEXICON1\n"
+LEXICON_SOURCE = "sentiment/vader_lexicon.zip"
+LEXICON_TEXT = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+
+# Compiled lexicon used by the vader backend, built on first use in the
+# per-user cache directory; empty to parse NLTK's text file instead
+VADER_LEXICON_PATH = os.environ.get("VADER_LEXICON_PATH", os.path.join(CACHE_DIR, "vader_lexicon.lexicon"))
+
+# Distinct words whose single-word lookups (as polarity_scores makes them) are memoized per lexicon
+LOOKUP_CACHE_SIZE = 65536
+
+
+def _keys(words):
+    """Returns: (sorted fixed-width UTF-8 key array, order of words in it)."""
+    keys = np.array([word.encode("utf-8") for word in words], dtype=bytes)
+    order = np.argsort(keys, kind="stable")
+    return keys[order], order
+
+
+def _strings(keys):
+    return [key.decode("utf-8") for key in keys.tolist()]
+
+
+class MappedLexicon(Mapping):
+    """Read-only word -> valence mapping, binary searched in sorted keys."""
+
+    def __init__(self, keys, values):
+        self.keys_array = keys
+        self.values_array = values
+        self._find = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._search)
+
+    def _search(self, word):
+        """Returns: Valence of word, or None."""
+        key = word.encode("utf-8")
+        if len(key) > self.keys_array.dtype.itemsize or key.endswith(b"\0"):
+            return None
+        i = int(self.keys_array.searchsorted(key))
+        if i < len(self.keys_array) and self.keys_array[i] == key:
+            return float(self.values_array[i])
+        return None
+
+    def lookup(self, words):
+        """Returns: (valences, found) arrays for words; valence is 0.0 where not found."""
+        encoded = [word.encode("utf-8") for word in words]
+        width = self.keys_array.dtype.itemsize
+        # Longer words are truncated by the cast, and trailing NULs dropped, so neither can count as a match
+        fits = np.fromiter((len(e) <= width and not e.endswith(b"\0") for e in encoded),
+                           dtype=bool, count=len(encoded))
+        keys = np.array(encoded, dtype=self.keys_array.dtype)
+        i = np.minimum(np.searchsorted(self.keys_array, keys), len(self.keys_array) - 1)
+        found = fits & (self.keys_array[i] == keys)
+        return np.where(found, self.values_array[i], 0.0), found
+
+    def __getitem__(self, word):
+        valence = self._find(word) if isinstance(word, str) else None
+        if valence is None:
+            raise KeyError(word)
+        return valence
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self._find(word) is not None
+
+    def __iter__(self):
+        return iter(_strings(self.keys_array))
+
+    def __len__(self):
+        return len(self.keys_array)
+
+
+class MappedSentimentIntensityAnalyzer(SentimentIntensityAnalyzer):
+    """SentimentIntensityAnalyzer whose lexicon and constants come from a compile_lexicon file."""
+
+    def __init__(self, path):
+        """Raises: ValueError if the file was not compiled from NLTK's current lexicon text."""
+        arrays = map_index(path, LEXICON_MAGIC, "compiled VADER lexicon")
+        self.lexicon_path = path
+        # Digest of the source text, so cache keys match the stock analyzer's. The file's own
+        # record is only trusted where there is no text to check it against.
+        compiled_from = arrays["source_sha1"][0].decode("ascii")
+        source = source_sha1()
+        if source is not None and compiled_from != source:
+            raise ValueError(f"{path} was not compiled from NLTK's current vader_lexicon.txt")
+        self.lexicon_sha1 = source or compiled_from
+        self.lexicon = MappedLexicon(arrays["words"], arrays["valences"])
+        self.constants = VaderConstants()
+        self.constants.BOOSTER_DICT = dict(zip(_strings(arrays["booster_words"]), arrays["booster_values"].tolist()))
+        self.constants.NEGATE = set(_strings(arrays["negations"]))
+
+
+@lru_cache(maxsize=1)
+def source_sha1():
+    """Returns: SHA-1 of NLTK's vader_lexicon.txt, or None if only a compiled lexicon is installed."""
+    try:
+        pointer = nltk.data.find(LEXICON_TEXT)
+    except LookupError:
+        return None
+    # Streamed, so the text is not kept in memory; the UTF-8 bytes hash like the decoded text re-encoded
+    digest = hashlib.sha1()
+    if hasattr(pointer, "zipfile"):
+        # NLTK's own open() reads the whole member into memory first
+        with zipfile.ZipFile(pointer.zipfile.filename) as archive, archive.open(pointer.entry) as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    else:
+        with open(pointer.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _private(path):
+    # Owned by this user (or root) and not writable by anyone else, as is its directory
+    for checked in (path, os.path.dirname(os.path.abspath(path))):
+        info = os.stat(checked)
+        if info.st_uid not in (os.getuid(), 0) or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return False
+    return True
+
+
+def compile_lexicon(path, analyzer=None):
+    """Write the lexicon, booster words and negations of analyzer (default: NLTK's) to path."""
+    analyzer = analyzer if analyzer is not None else SentimentIntensityAnalyzer()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    words, order = _keys(list(analyzer.lexicon))
+    booster_words, booster_order = _keys(list(analyzer.constants.BOOSTER_DICT))
+    negations, _ = _keys(sorted(analyzer.constants.NEGATE))
+    write_index(path, LEXICON_MAGIC, {
+        "source_sha1": np.array([hashlib.sha1(analyzer.lexicon_file.encode("utf-8")).hexdigest().encode("ascii")]),
+        "words": words,
+        "valences": np.array(list(analyzer.lexicon.values()), dtype=np.float64)[order],
+        "booster_words": booster_words,
+        "booster_values": np.array(list(analyzer.constants.BOOSTER_DICT.values()), dtype=np.float64)[booster_order],
+        "negations": negations,
+    })
+
+
+def _source_mtime():
+    try:
+        pointer = nltk.data.find(LEXICON_SOURCE)
+    except LookupError:
+        return 0.0  # only the compiled lexicon is installed
+    return os.path.getmtime(pointer.zipfile.filename if hasattr(pointer, "zipfile") else pointer.path)
+
+
+def load_analyzer(path=None):
+    """
+    Memory-map the compiled lexicon at path (default VADER_LEXICON_PATH),
+    compiling it first if it is missing, older than NLTK's lexicon or
+    compiled from another lexicon text.
+    Returns: MappedSentimentIntensityAnalyzer, or the stock analyzer when
+    path is empty, cannot be written, or could be written by other users.
+    """
+    path = VADER_LEXICON_PATH if path is None else path
+    if not path:
+        return SentimentIntensityAnalyzer()
+    for attempt in range(2):
+        if attempt or not (os.path.exists(path) and os.path.getmtime(path) >= _source_mtime()):
+            try:
+                compile_lexicon(path)
+            except OSError:
+                return SentimentIntensityAnalyzer()  # read-only location
+        if not _private(path):
+            return SentimentIntensityAnalyzer()
+        try:
+            return MappedSentimentIntensityAnalyzer(path)
+        except ValueError:
+            pass  # compiled from another lexicon text: compile again
+    return SentimentIntensityAnalyzer()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile NLTK's VADER lexicon for memory-mapped loading.")
+    parser.add_argument("--output", default=VADER_LEXICON_PATH, help="compiled lexicon path (default: %(default)s)")
+    args = parser.parse_args()
+    compile_lexicon(args.output)
+    print(f"Compiled VADER lexicon written to {args.output}")